@@ -1,26 +1,46 @@
+import asyncio
+import functools
 import os
-from typing import TypedDict, Annotated, List, Dict
-from langgraph.graph import StateGraph, END
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TypedDict, Annotated, AsyncIterator, List, Dict, Tuple
+from langgraph.graph import StateGraph, START, END
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_groq import ChatGroq
 
 from app.privacy import PrivacyManager
 from app.context import ContextManager
 from app.rag import RAGManager
+from app.router import IntentRouter, detect_intents
+from app.packing import ContextPacker
+from app.cache import SemanticCache
+from app.logs import get_logger
+from app.metrics import REQUEST_SECONDS, SPAN_SECONDS, STAGE_SECONDS
+from app.prompts import PromptRegistry
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Rendered contexts are logged at DEBUG, and only a LOG_SAMPLE_RATE sample of them.
+log = get_logger(__name__, sampled=True)
+
+def merge_timings(left: Dict[str, float], right: Dict[str, float]) -> Dict[str, float]:
+    return {**(left or {}), **(right or {})}
+
 class AgentState(TypedDict):
     user_id: str
     query: str
     lat: float
     lon: float
+    intent: str
     masked_query: str
     context_str: str
+    rag_hits: List[Tuple[str, float]]
     rag_str: str
     response: str
+    prompt_tokens: int
     is_login_event: bool
+    timings: Annotated[Dict[str, float], merge_timings]
 
 class SupportAgent:
     def __init__(self):
@@ -28,12 +48,22 @@ class SupportAgent:
         self.context = ContextManager()
         self.rag = RAGManager()
         
+        knowledge_base = os.getenv("KNOWLEDGE_BASE_PATH", "data/store_policies.pdf")
         try:
             print("Ingesting knowledge base...")
-            self.rag.ingest_pdf("data/store_policies.pdf")
+            self.rag.ingest(knowledge_base)
             print("Knowledge base ready.")
         except Exception as e:
             print(f"Error ingesting PDF: {e}")
+
+        # Price, stock and hours questions are answered from structured data without the LLM; the
+        # price list is parsed from the manual's chunks during ingestion and kept in the manifest.
+        self.router = None
+        if os.getenv("INTENT_ROUTER", "1") != "0":
+            try:
+                self.router = IntentRouter(self.context, self.rag.price_list())
+            except Exception as e:
+                print(f"Error loading price list, intent routing disabled: {e}")
         
         api_key = os.getenv("GROQ_API_KEY")
         if not api_key:
@@ -46,99 +76,229 @@ class SupportAgent:
                 temperature=0.7
             )
 
+        # Templates are compiled once and re-read only when their files change; PROMPT_VERSION
+        # pins the support prompt to a version instead of the latest one.
+        version = os.getenv("PROMPT_VERSION")
+        self.prompts = PromptRegistry(
+            reload_interval=float(os.getenv("PROMPT_RELOAD_INTERVAL", "2")),
+            pins={"support": int(version)} if version else None,
+            defaults={"support": "Context: {context_str}. Info: {rag_str}"},
+        )
+
+        # User context + RAG chunks are packed into CONTEXT_TOKEN_BUDGET tokens (0: no limit).
+        self.packer = ContextPacker(budget=int(os.getenv("CONTEXT_TOKEN_BUDGET", "512")))
+
+        # Near-identical questions under the same context/RAG inputs reuse the previous LLM answer.
+        ttl = os.getenv("SEMANTIC_CACHE_TTL", "3600")
+        self.response_cache = SemanticCache(
+            maxsize=int(os.getenv("SEMANTIC_CACHE_SIZE", "512")),
+            threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95")),
+            ttl=float(ttl) if ttl else None,
+        )
+
+        # Presidio, FastEmbed and the embedded Qdrant client are blocking CPU work; they run on a
+        # bounded pool so the event loop keeps serving other requests while they execute.
+        self.executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("AGENT_CPU_WORKERS", str(min(4, os.cpu_count() or 1)))),
+            thread_name_prefix="agent-cpu",
+        )
+
         self.graph = self._build_graph()
 
     def _build_graph(self):
         workflow = StateGraph(AgentState)
 
-        workflow.add_node("anonymize", self.anonymize_node)
-        workflow.add_node("retrieve_context", self.retrieve_context)
-        workflow.add_node("retrieve_rag", self.rag_node)
-        workflow.add_node("generate", self.generate_node)
+        workflow.add_node("route", self._timed("route", self.route_node))
+        workflow.add_node("anonymize", self._timed("anonymize", self.anonymize_node))
+        workflow.add_node("retrieve_context", self._timed("retrieve_context", self.retrieve_context))
+        workflow.add_node("retrieve_rag", self._timed("retrieve_rag", self.rag_node))
+        workflow.add_node("pack", self._timed("pack", self.pack_node))
+        workflow.add_node("generate", self._timed("generate", self.generate_node))
 
-        workflow.set_entry_point("anonymize")
-        workflow.add_edge("anonymize", "retrieve_context")
-        workflow.add_edge("retrieve_context", "retrieve_rag")
-        workflow.add_edge("retrieve_rag", "generate")
+        # Routed intents end right after route. Otherwise context building reads the raw query and
+        # the profile store only, so it runs alongside the anonymize -> retrieve_rag branch;
+        # pack waits for both branches, then generate.
+        workflow.add_edge(START, "route")
+        workflow.add_conditional_edges("route", self._after_route, ["anonymize", "retrieve_context", END])
+        workflow.add_edge("anonymize", "retrieve_rag")
+        workflow.add_edge(["retrieve_context", "retrieve_rag"], "pack")
+        workflow.add_edge("pack", "generate")
         workflow.add_edge("generate", END)
 
         return workflow.compile()
 
-    def anonymize_node(self, state: AgentState):
-        masked = self.privacy.anonymize(state["query"])
+    @staticmethod
+    def _timed(name: str, node):
+        """
+        Wraps a node so its wall time (seconds) is recorded under state["timings"][name] and in
+        the agent_stage_seconds histogram.
+        """
+        async def run(state: AgentState):
+            start = time.perf_counter()
+            update = await node(state)
+            elapsed = time.perf_counter() - start
+            STAGE_SECONDS.observe(elapsed, name)
+            return {**update, "timings": {name: elapsed}}
+        return run
+
+    async def _run_blocking(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+
+    async def route_node(self, state: AgentState):
+        if not self.router or state["is_login_event"]:
+            return {}
+        route = await self._run_blocking(self.router.route, state["query"], state["lat"], state["lon"])
+        if not route:
+            return {}
+        return {"intent": route.intent, "response": route.response}
+
+    @staticmethod
+    def _after_route(state: AgentState):
+        if state["response"]:
+            return END
+        return ["anonymize", "retrieve_context"]
+
+    async def anonymize_node(self, state: AgentState):
+        masked = await self._run_blocking(self.privacy.anonymize, state["query"])
         return {"masked_query": masked}
 
-    def retrieve_context(self, state: Dict): 
+    async def retrieve_context(self, state: Dict): 
         """
         Node: Retrieves user context and nearest store info.
         """
         include_loc = True
         
-        context_str = self.context.format_context(
+        context_str = await self._run_blocking(
+            self.context.format_context,
             user_id=state["user_id"],
             current_lat=state["lat"],
             current_lon=state["lon"],
             query=state["query"],
             include_location=include_loc
         )
-        print(f"DEBUG CONTEXT: {context_str}")
+        log.debug("Context for %s: %s", state["user_id"], context_str)
         return {"context_str": context_str}
 
-    def rag_node(self, state: AgentState):
-        rag_docs = self.rag.search(state["masked_query"])
-        rag_str = "\n".join([f"- {doc}" for doc in rag_docs])
-        return {"rag_str": rag_str}
+    async def rag_node(self, state: AgentState):
+        rag_hits = await self._run_blocking(self.rag.search_scored, state["masked_query"])
+        return {"rag_hits": rag_hits}
+
+    async def pack_node(self, state: AgentState):
+        packed = self.packer.pack(state["context_str"], state["rag_hits"], detect_intents(state["query"]))
+        return {"context_str": packed.context_str, "rag_str": packed.rag_str}
 
-    def generate_node(self, state: AgentState):
+    async def generate_node(self, state: AgentState):
         if not self.llm:
             return {"response": "Error: LLM not configured."}
 
-        try:
-            with open("app/prompt.txt", "r") as f:
-                prompt_template = f.read()
-        except FileNotFoundError:
-            prompt_template = "Context: {context_str}. Info: {rag_str}"
-        
-        system_prompt = prompt_template.format(
-            context_str=state["context_str"], 
-            rag_str=state["rag_str"]
-        )
+        prompt = self.prompts.render("support", context_str=state["context_str"], rag_str=state["rag_str"])
+
+        fingerprint = SemanticCache.fingerprint(f"{prompt.name}.v{prompt.version}", state["context_str"],
+                                                state["rag_str"], SemanticCache.literals(state["masked_query"]))
+        query_embedding = await self._run_blocking(self.rag.embed_query, state["masked_query"])
+        cached = self.response_cache.lookup(query_embedding, fingerprint)
+        if cached is not None:
+            return {"response": cached, "prompt_tokens": prompt.tokens}
 
         messages = [
-            SystemMessage(content=system_prompt),
+            SystemMessage(content=prompt.text),
             HumanMessage(content=state["masked_query"])
         ]
         
-        response = self.llm.invoke(messages)
-        return {"response": response.content}
+        start = time.perf_counter()
+        response = await self.llm.ainvoke(messages)
+        elapsed = time.perf_counter() - start
+        SPAN_SECONDS.observe(elapsed, "llm")
+        self.response_cache.store(query_embedding, fingerprint, response.content, elapsed)
+        return {"response": response.content, "prompt_tokens": prompt.tokens}
 
-    def process_query(self, user_id: str, query: str, lat: float, lon: float):
-        """
-        Invokes the graph.
-        """
+    def cache_stats(self) -> Dict:
+        return {"rag": self.rag.cache_stats(), "responses": self.response_cache.stats(),
+                "context": self.context.context_cache_stats()}
+
+    def prompt_stats(self) -> Dict:
+        return self.prompts.stats()
+
+    async def _initial_state(self, user_id: str, query: str, lat: float, lon: float) -> Dict:
         final_user_id = user_id
         is_login = False
         
         if user_id == "GUEST":
-            potential_id = self.context.find_user_id(query.strip())
+            potential_id = await self._run_blocking(self.context.find_user_id, query.strip())
             if potential_id:
                 final_user_id = potential_id
                 is_login = True
 
-        initial_state = {
+        return {
             "user_id": final_user_id,
             "query": query,
             "lat": lat,
             "lon": lon,
+            "intent": "",
             "masked_query": "",
             "context_str": "",
+            "rag_hits": [],
             "rag_str": "",
             "response": "",
-            "is_login_event": is_login
+            "prompt_tokens": 0,
+            "is_login_event": is_login,
+            "timings": {},
         }
+
+    async def arun(self, user_id: str, query: str, lat: float, lon: float) -> Dict:
+        """
+        Invokes the graph and returns the final state, including per-node timings.
+        """
+        initial_state = await self._initial_state(user_id, query, lat, lon)
         
-        result = self.graph.invoke(initial_state)
-        return result["response"], final_user_id
+        start = time.perf_counter()
+        result = await self.graph.ainvoke(initial_state)
+        result["timings"]["total"] = time.perf_counter() - start
+        self._observe_request(result)
+        return result
+
+    async def astream_query(self, user_id: str, query: str, lat: float, lon: float) -> AsyncIterator[Dict]:
+        """
+        Runs the graph and yields {"type": "token", "content": ...} events as the LLM produces
+        them in generate, then a final {"type": "done", "response": ..., "user_id": ...} event.
+        Answers that never reach the LLM (routed intents, semantic cache hits) only produce the
+        final event.
+        """
+        initial_state = await self._initial_state(user_id, query, lat, lon)
+        final_state = initial_state
+
+        start = time.perf_counter()
+        async for mode, chunk in self.graph.astream(initial_state, stream_mode=["messages", "values"]):
+            if mode == "values":
+                final_state = chunk
+                continue
+            message, metadata = chunk
+            if metadata.get("langgraph_node") == "generate" and message.content:
+                yield {"type": "token", "content": message.content}
+        final_state["timings"]["total"] = time.perf_counter() - start
+        self._observe_request(final_state)
+
+        yield {"type": "done", "response": final_state["response"], "user_id": final_state["user_id"]}
+
+    @staticmethod
+    def _observe_request(state: Dict) -> None:
+        # "routed" answers end at the route node; everything else runs the full graph.
+        path = "graph" if "generate" in state["timings"] else "routed"
+        REQUEST_SECONDS.observe(state["timings"]["total"], path)
+
+    async def aprocess_query(self, user_id: str, query: str, lat: float, lon: float):
+        """
+        Invokes the graph.
+        """
+        result = await self.arun(user_id, query, lat, lon)
+        return result["response"], result["user_id"]
+
+    def process_query(self, user_id: str, query: str, lat: float, lon: float):
+        """
+        Blocking wrapper around aprocess_query for scripts and offline use.
+        """
+        return asyncio.run(self.aprocess_query(user_id, query, lat, lon))
 
 if __name__ == "__main__":
     agent = SupportAgent()
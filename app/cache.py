@@ -0,0 +1,308 @@
+import hashlib
+import os
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+import numpy as np
+
+
+# Tokens an embedding barely tells apart but that change the answer: codes and numbers
+# ("CHAI23", "USR-002", "500") and cup sizes.
+LITERAL_PATTERN = re.compile(r"\b(?:[\w-]*\d[\w-]*|small|medium|large|regular)\b", re.IGNORECASE)
+
+
+def normalize_query(query: str) -> str:
+    """
+    Canonical cache key for a (masked) query: lowercase, collapsed whitespace, no trailing punctuation.
+    """
+    return " ".join(query.lower().split()).rstrip("?!. ")
+
+
+class LRUCache:
+    """
+    Thread-safe, size-bounded LRU cache with an optional TTL and hit/miss counters.
+    Entries can be persisted to disk with save()/load() so they survive restarts.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and self.ttl is not None and time.time() - entry[0] > self.ttl:
+                del self._data[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return default if entry is None else entry[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def save(self, path: str, merge: bool = False) -> None:
+        """
+        Writes the entries to path. With merge, entries already saved there that this cache
+        does not hold are kept too (newest maxsize overall), so several processes can share it.
+        """
+        with self._lock:
+            items = list(self._data.items())
+        if merge:
+            saved = LRUCache(maxsize=self.maxsize, ttl=self.ttl)
+            saved.load(path)
+            keys = {key for key, _ in items}
+            items = [item for item in saved._data.items() if item[0] not in keys] + items
+            items.sort(key=lambda item: item[1][0])
+            items = items[-self.maxsize:] if self.maxsize > 0 else []
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(items, f)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> int:
+        """
+        Restores entries saved by save(), skipping expired ones. Returns the number loaded.
+        """
+        if not os.path.exists(path):
+            return 0
+        try:
+            with open(path, "rb") as f:
+                items = pickle.load(f)
+        except Exception as e:
+            print(f"Error loading cache from {path}: {e}")
+            return 0
+
+        now = time.time()
+        with self._lock:
+            for key, (stamp, value) in items[-self.maxsize:] if self.maxsize > 0 else []:
+                if self.ttl is None or now - stamp <= self.ttl:
+                    self._data[key] = (stamp, value)
+            return len(self._data)
+
+
+class SemanticCache:
+    """
+    Reuses LLM responses for near-identical questions asked under identical prompt inputs.
+
+    Entries are bucketed by a fingerprint of the context and RAG strings and the query's
+    literals(); a lookup is a hit when a query embedding in the same bucket has cosine
+    similarity >= threshold.
+    Eviction is LRU across all buckets, with an optional TTL.
+    """
+
+    def __init__(self, maxsize: int = 512, threshold: float = 0.95, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saved_latency = 0.0
+        self._entries: "OrderedDict[int, tuple[str, np.ndarray, str, float, float]]" = OrderedDict()
+        self._buckets: Dict[str, List[int]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(*parts: str) -> str:
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    @staticmethod
+    def literals(query: str) -> str:
+        """
+        The query's LITERAL_PATTERN tokens in order, for the fingerprint: "CHAI23" and "CHAI24"
+        (or "small" and "large") never share a bucket however close their embeddings are.
+        """
+        return " ".join(token.lower() for token in LITERAL_PATTERN.findall(query))
+
+    @staticmethod
+    def _unit(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, embedding, fingerprint: str) -> Optional[str]:
+        """
+        Returns a cached response for a similar query under the same fingerprint, or None.
+        """
+        with self._lock:
+            entry_ids = self._buckets.get(fingerprint)
+            if entry_ids and self.ttl is not None:
+                now = time.time()
+                for entry_id in [e for e in entry_ids if now - self._entries[e][4] > self.ttl]:
+                    self._remove(entry_id)
+                entry_ids = self._buckets.get(fingerprint)
+
+            if not entry_ids:
+                self.misses += 1
+                return None
+
+            vectors = np.stack([self._entries[e][1] for e in entry_ids])
+            scores = vectors @ self._unit(embedding)
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            entry_id = entry_ids[best]
+            self._entries.move_to_end(entry_id)
+            _, _, response, latency, _ = self._entries[entry_id]
+            self.hits += 1
+            self.saved_latency += latency
+            return response
+
+    def store(self, embedding, fingerprint: str, response: str, latency: float = 0.0) -> None:
+        """
+        Caches a response; latency is the cost of producing it and is credited on every hit.
+        """
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (fingerprint, self._unit(embedding), response, latency, time.time())
+            self._buckets.setdefault(fingerprint, []).append(entry_id)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, entry_id: int) -> None:
+        fingerprint = self._entries.pop(entry_id)[0]
+        bucket = self._buckets[fingerprint]
+        bucket.remove(entry_id)
+        if not bucket:
+            del self._buckets[fingerprint]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "saved_llm_calls": self.hits,
+            "saved_latency_seconds": round(self.saved_latency, 3),
+        }
+
+
+class DependencyCache:
+    """
+    LRU cache whose entries are stamped with the versions of the records they were built from.
+    invalidate(dependency) bumps that record's version in O(1); entries built from an older
+    version are treated as misses on their next lookup and dropped, so no reverse index from
+    records to entries is kept.
+
+    Take snapshot(dependencies) before reading the records and pass it to put(), so a record
+    that changes while the value is being built invalidates it.
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.stale = 0
+        self.invalidations = 0
+        self._entries = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._versions: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def snapshot(self, dependencies) -> tuple:
+        versions = self._versions
+        return tuple((dependency, versions.get(dependency, 0)) for dependency in dependencies)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        stamp, value = entry
+        versions = self._versions
+        if any(versions.get(dependency, 0) != version for dependency, version in stamp):
+            with self._lock:
+                self.stale += 1
+            self._entries.pop(key)
+            return default
+        return value
+
+    def put(self, key: Hashable, value: Any, stamp: tuple) -> None:
+        self._entries.put(key, (stamp, value))
+
+    def invalidate(self, dependency: Hashable) -> None:
+        with self._lock:
+            self._versions[dependency] = self._versions.get(dependency, 0) + 1
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self._entries.stats()
+        # Stale entries were found by the LRU but could not be used.
+        hits = stats["hits"] - self.stale
+        lookups = stats["hits"] + stats["misses"]
+        stats.update({
+            "hits": hits,
+            "misses": stats["misses"] + self.stale,
+            "stale": self.stale,
+            "invalidations": self.invalidations,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        })
+        return stats
@@ -0,0 +1,220 @@
+"""
+Chunkers turn the page texts of a document into retrieval chunks. Each declares the pypdf
+extraction mode it expects ("plain" or "layout") and a config string that is recorded in the
+ingestion manifest, so changing chunker settings re-chunks documents that are otherwise unchanged.
+"""
+import math
+import os
+import re
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Type
+
+# Three or more spaces inside a layout-mode line separate table columns.
+COLUMN_GAP = re.compile(r"\S {3,}\S")
+COLUMN_PADDING = re.compile(r" {3,}")
+SPACES = re.compile(r" {2,}")
+# pypdf renders some glyphs (e.g. list bullets) as control characters.
+CONTROL = re.compile(r"[\x00-\x08\x0b-\x1f\x7f]")
+HEADING = re.compile(r"^(\d+(?:\.\d+)*)\.?\s+[A-Z]")
+QUESTION = re.compile(r"^Q\s*[:.]", re.IGNORECASE)
+ANSWER = re.compile(r"^A\s*[:.]", re.IGNORECASE)
+# Layout-mode lines indented this far are wrapped cells of a neighbouring table row.
+CONTINUATION_INDENT = 8
+
+
+class Unit(NamedTuple):
+    """
+    A block the structured chunker never splits (unless it alone exceeds the budget).
+    kind is "text", "header" (a table's header row) or "row" (a table row, under header).
+    """
+    text: str
+    kind: str
+    header: Optional[str]
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough LLM/embedding token count (about four characters per token for English text).
+    """
+    return math.ceil(len(text) / 4)
+
+
+class LineWindowChunker:
+    """
+    The original chunking: a sliding window of window lines, overlapping by overlap, per page.
+    """
+
+    extraction_mode = "plain"
+
+    def __init__(self, window: int = 20, overlap: int = 5):
+        self.window = window
+        self.overlap = overlap
+        self.config = f"window:{window}:{overlap}"
+
+    def chunk(self, pages: Iterable[str]) -> Iterator[str]:
+        for text in pages:
+            lines = [line.strip() for line in text.split("\n") if line.strip()]
+            for i in range(0, len(lines), self.window - self.overlap):
+                yield "\n".join(lines[i:i + self.window])
+
+
+class StructuredChunker:
+    """
+    Chunks along the document's structure, read from layout-mode text:
+    - numbered headings ("4.", "1.2") start a new section; every chunk is prefixed with its
+      section path, and chunks never span sections;
+    - table rows (column-aligned lines, with wrapped cells kept on their row) are never split,
+      and a chunk that starts inside a table repeats the table's header row;
+    - a "Q:" line stays with its "A:" answer, and a short title line stays with the paragraph
+      it introduces.
+    These units are packed into chunks of at most max_tokens (estimated) without overlap. Column
+    padding is collapsed to " | ", so table chunks carry far fewer tokens than the raw layout.
+    """
+
+    extraction_mode = "layout"
+
+    def __init__(self, max_tokens: int = 128):
+        self.max_tokens = max_tokens
+        self.config = f"structured:{max_tokens}"
+
+    def chunk(self, pages: Iterable[str]) -> Iterator[str]:
+        sections: List[str] = []
+        units: List[Unit] = []
+        table_header: Optional[str] = None
+        in_table = False
+
+        for block in self._blocks(pages):
+            first = block[0].strip()
+            heading = HEADING.match(first)
+            if heading and len(block) == 1 and not COLUMN_GAP.search(first):
+                yield from self._pack(sections, units)
+                units = []
+                level = heading.group(1).count(".") + 1
+                sections[level - 1:] = [first]
+                in_table = False
+                continue
+
+            text = "\n".join(self._clean(line) for line in block)
+            if any(COLUMN_GAP.search(line.strip()) for line in block):
+                if in_table and text == table_header:
+                    # The header row repeated at the top of a page.
+                    continue
+                if not in_table:
+                    table_header = text
+                    in_table = True
+                    units.append(Unit(text, "header", None))
+                else:
+                    units.append(Unit(text, "row", table_header))
+                continue
+
+            in_table = False
+            if units and units[-1].kind == "text" and self._joins_previous(units[-1].text, text):
+                units[-1] = Unit(units[-1].text + "\n" + text, "text", None)
+            else:
+                units.append(Unit(text, "text", None))
+
+        yield from self._pack(sections, units)
+
+    def _blocks(self, pages: Iterable[str]) -> Iterator[List[str]]:
+        """
+        Atomic groups of lines: split on blank lines, and inside tables only between two rows
+        that both start at the left margin (never next to a wrapped cell).
+        """
+        for text in pages:
+            block: List[str] = []
+            for line in text.split("\n"):
+                if not line.strip():
+                    if block:
+                        yield block
+                        block = []
+                    continue
+                if block and self._row_boundary(block[-1], line):
+                    yield block
+                    block = []
+                block.append(line.rstrip())
+            if block:
+                yield block
+
+    @staticmethod
+    def _indent(line: str) -> int:
+        return len(line) - len(line.lstrip())
+
+    def _row_boundary(self, previous: str, line: str) -> bool:
+        if not (COLUMN_GAP.search(previous.strip()) or COLUMN_GAP.search(line.strip())):
+            return False
+        return self._indent(previous) < CONTINUATION_INDENT and self._indent(line) < CONTINUATION_INDENT
+
+    @staticmethod
+    def _clean(line: str) -> str:
+        line = CONTROL.sub("", line).strip()
+        return SPACES.sub(" ", COLUMN_PADDING.sub(" | ", line))
+
+    @staticmethod
+    def _joins_previous(previous: str, text: str) -> bool:
+        if ANSWER.match(text) and QUESTION.match(previous):
+            return True
+        # A short title line without punctuation introduces what follows it.
+        return ("\n" not in previous and len(previous.split()) <= 8
+                and not previous.endswith((".", ":", "?", "!")) and not QUESTION.match(previous))
+
+    def _pack(self, sections: List[str], units: List[Unit]) -> Iterator[str]:
+        prefix = " > ".join(sections)
+        chunk: List[str] = []
+        size = 0
+
+        def lead(unit: Unit) -> List[str]:
+            lines = [prefix] if prefix else []
+            if unit.kind == "row" and unit.header:
+                lines.append(unit.header)
+            return lines
+
+        for unit in units:
+            budget = self.max_tokens - estimate_tokens("\n".join(lead(unit)))
+            for piece in self._split(unit.text, budget):
+                tokens = estimate_tokens(piece)
+                if chunk and size + tokens > self.max_tokens:
+                    yield "\n".join(chunk)
+                    chunk = []
+                if not chunk:
+                    chunk = lead(unit)
+                    size = estimate_tokens("\n".join(chunk))
+                chunk.append(piece)
+                size += tokens
+        if chunk:
+            yield "\n".join(chunk)
+
+    @staticmethod
+    def _split(text: str, budget: int) -> Iterator[str]:
+        """
+        A unit within budget as is; an oversized one (e.g. a long paragraph) word by word,
+        keeping its line breaks.
+        """
+        if estimate_tokens(text) <= budget:
+            yield text
+            return
+        piece: List[str] = []
+        for word in text.replace("\n", " \n ").split(" "):
+            if piece and estimate_tokens(" ".join(piece + [word])) > max(budget, 1):
+                yield " ".join(piece).replace(" \n ", "\n").strip()
+                piece = []
+            piece.append(word)
+        if piece:
+            yield " ".join(piece).replace(" \n ", "\n").strip()
+
+
+CHUNKERS: Dict[str, Type] = {
+    "window": LineWindowChunker,
+    "structured": StructuredChunker,
+}
+
+
+def make_chunker(name: Optional[str] = None, max_tokens: Optional[int] = None):
+    """
+    Chunker by name (RAG_CHUNKER, default "structured"); max_tokens (RAG_CHUNK_TOKENS) applies
+    to token-budgeted chunkers.
+    """
+    name = name or os.getenv("RAG_CHUNKER", "structured")
+    if name not in CHUNKERS:
+        raise ValueError(f"Unknown chunker: {name}")
+    if name == "window":
+        return LineWindowChunker()
+    return CHUNKERS[name](max_tokens=max_tokens or int(os.getenv("RAG_CHUNK_TOKENS", "128")))
@@ -1,64 +1,256 @@
 import json
-import math
-from typing import Dict, List, Optional
+import os
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.cache import DependencyCache
+from app.geo import StoreIndex, haversine_km, nearest_batch
+from app.storage import SqliteUserTable, load_stores
+from app.stores import CONTROL_FIELDS, StoreCatalog, StoreFileWatcher, diff_stores
+from app.text_index import StoreTextIndex
+from app.users import LOGIN_PHONE_PATTERN, PHONE_ONLY_PATTERN, USER_ID_PATTERN, UserIndex, user_point
+
+# Stands in for the per-request distance inside a cached store fragment.
+DISTANCE_SLOT = "\0distance\0"
+
+
+def format_distance(dist_km: float) -> str:
+    dist_meters = int(dist_km * 1000)
+    return f"{dist_meters}m" if dist_meters < 1000 else f"{dist_meters/1000:.1f}km"
+
 
 class ContextManager:
-    def __init__(self, users_path="data/users.json", stores_path="data/stores.json"):
-        with open(users_path, "r") as f:
-            self.users = {u["user_id"]: u for u in json.load(f)}
-        
-        with open(stores_path, "r") as f:
-            self.stores = json.load(f)
+    def __init__(self, users_path="data/users.json", stores_path="data/stores.json", db_path=None):
+        """
+        Loads users and stores from the JSON files, or from the SQLite database at db_path
+        (or CONTEXT_DB_PATH). Stores live in an immutable snapshot, so readers never lock.
+        """
+        db_path = db_path or os.getenv("CONTEXT_DB_PATH")
+        if db_path:
+            self.users = SqliteUserTable(db_path)
+            stores = load_stores(db_path)
+            self.stores_path = None
+        else:
+            with open(users_path, "r") as f:
+                self.users = UserIndex(json.load(f))
+
+            with open(stores_path, "r") as f:
+                stores = json.load(f)
+            self.stores_path = stores_path
+
+        self.catalog = StoreCatalog(stores)
+        # Serialises writers only; readers never take it.
+        self._store_lock = threading.Lock()
+        self._store_watcher: Optional[StoreFileWatcher] = None
+
+        # Rendered user and nearest-store fragments per (user, location cell of cell_size degrees,
+        # about 550 m at the default). Entries depend on the user, the store and the store set;
+        # update_stores() invalidates them, invalidate_user / invalidate_store cover other changes.
+        self.context_cache = DependencyCache(maxsize=int(os.getenv("CONTEXT_CACHE_SIZE", "4096")))
+        self.cell_size = float(os.getenv("CONTEXT_CELL_SIZE", "0.005"))
+
+        # User coordinate arrays are only needed for batch fan-out, so they are built on first use.
+        self._user_ids: Optional[List[str]] = None
+        self._user_rows: Dict[str, int] = {}
+        self._user_coords: Optional[np.ndarray] = None
+
+    @property
+    def stores(self) -> List[Dict]:
+        return self.catalog.live_stores()
+
+    @property
+    def store_coords(self) -> np.ndarray:
+        return self.catalog.coords
+
+    @property
+    def store_index(self) -> StoreIndex:
+        return self.catalog.store_index
+
+    @property
+    def store_text_index(self) -> StoreTextIndex:
+        return self.catalog.text_index
+
+    @property
+    def user_ids(self) -> List[str]:
+        self._load_user_coords()
+        return self._user_ids
+
+    @property
+    def user_coords(self) -> np.ndarray:
+        self._load_user_coords()
+        return self._user_coords
+
+    def _load_user_coords(self) -> None:
+        if self._user_ids is None:
+            self._user_ids, self._user_coords = self.users.coordinates()
+            self._user_rows = {uid: row for row, uid in enumerate(self._user_ids)}
 
     def get_user(self, user_id: str) -> Optional[Dict]:
         return self.users.get(user_id)
 
+    def upsert_user(self, user: Dict) -> None:
+        """
+        Adds or updates a user profile, keeping the lookup indexes and coordinate arrays in sync.
+        """
+        user_id = user["user_id"]
+        self.users.upsert(user)
+        self.invalidate_user(user_id)
+        if self._user_ids is None:
+            return
+
+        point = np.array(user_point(user), dtype=np.float64)
+        row = self._user_rows.get(user_id)
+        if row is None:
+            self._user_rows[user_id] = len(self._user_ids)
+            self._user_ids.append(user_id)
+            self._user_coords = np.vstack([self._user_coords, point])
+        else:
+            self._user_coords[row] = point
+
+    def invalidate_user(self, user_id: str) -> None:
+        """
+        Drops cached context built from this user's profile.
+        """
+        self.context_cache.invalidate(("user", user_id))
+
+    def invalidate_store(self, store_id: Optional[str] = None) -> None:
+        """
+        Drops cached context built from this store's record (stock, offers, hours), or with no
+        store_id, all cached store resolutions (stores added, removed or moved).
+        """
+        self.context_cache.invalidate(("store", store_id) if store_id else ("stores",))
+
+    def update_stores(self, deltas: Sequence[Dict]) -> List[str]:
+        """
+        Applies store deltas (see StoreCatalog.apply) as one snapshot and returns the changed
+        store_ids. Raises ValueError, applying nothing, on an invalid delta.
+        """
+        with self._store_lock:
+            catalog, changed, relocated = self.catalog.apply(deltas)
+            self.catalog = catalog
+            for store_id in changed:
+                self.invalidate_store(store_id)
+            if relocated:
+                self.invalidate_store()
+        return sorted(changed)
+
+    def update_store(self, store_id: str, changes: Dict) -> Dict:
+        """
+        Partial update of one store, e.g. {"stock": {"Vada Pav": False}}. Returns the new record.
+        Raises ValueError if changes carries store_id or the "deleted" / "replace" delta flags.
+        """
+        flags = sorted(CONTROL_FIELDS & changes.keys())
+        if flags:
+            raise ValueError(f"Store updates cannot set {', '.join(flags)}")
+        if self.catalog.get(store_id) is None:
+            raise KeyError(store_id)
+        self.update_stores([{**changes, "store_id": store_id}])
+        return self.catalog.get(store_id)
+
+    def add_store(self, store: Dict) -> None:
+        flags = sorted((CONTROL_FIELDS - {"store_id"}) & store.keys())
+        if flags:
+            raise ValueError(f"New stores cannot set {', '.join(flags)}")
+        if self.catalog.get(store.get("store_id")) is not None:
+            raise ValueError(f"Store {store['store_id']} already exists")
+        self.update_stores([store])
+
+    def remove_store(self, store_id: str) -> None:
+        if self.catalog.get(store_id) is None:
+            raise KeyError(store_id)
+        self.update_stores([{"store_id": store_id, "deleted": True}])
+
+    def start_store_watch(self, interval: Optional[float] = None) -> bool:
+        """
+        Polls stores.json every interval seconds (STORES_WATCH_INTERVAL, 0 = off) and applies
+        changed records; start it in each worker. Returns whether a watcher is running.
+        """
+        if interval is None:
+            interval = float(os.getenv("STORES_WATCH_INTERVAL", "0"))
+        if interval <= 0 or not self.stores_path or self._store_watcher is not None:
+            return self._store_watcher is not None
+
+        def reload(records: List[Dict]) -> None:
+            changed = self.update_stores(diff_stores(self.catalog, records))
+            if changed:
+                print(f"Reloaded {len(changed)} stores from {self.stores_path}")
+
+        self._store_watcher = StoreFileWatcher(self.stores_path, reload, interval)
+        self._store_watcher.start()
+        return True
+
+    def stop_store_watch(self) -> None:
+        if self._store_watcher is not None:
+            self._store_watcher.stop()
+            self._store_watcher = None
+
+    def context_cache_stats(self) -> Dict:
+        return self.context_cache.stats()
+
     def find_user_id(self, identifier: str) -> Optional[str]:
         """
-        Finds a user ID by exact match, phone number, or extracting from text.
+        Finds a user ID by exact match, phone number, or extracting from text. Within text only
+        a "+91" number counts as a phone; other digit runs may be order or reference numbers.
         """
-        import re
-        
         if identifier in self.users:
             return identifier
-            
-        for uid, user in self.users.items():
-            if user.get("phone_number") == identifier:
-                return uid
 
-        id_match = re.search(r"USR-\d+", identifier, re.IGNORECASE)
+        if PHONE_ONLY_PATTERN.match(identifier):
+            return self.users.find_by_phone(identifier)
+
+        id_match = USER_ID_PATTERN.search(identifier)
         if id_match:
             extracted_id = id_match.group(0).upper()
             if extracted_id in self.users:
                 return extracted_id
-        
-        phone_match = re.search(r"\+91-\d{5}-\d{5}", identifier)
+
+        phone_match = LOGIN_PHONE_PATTERN.search(identifier)
         if phone_match:
-            extracted_phone = phone_match.group(0)
-            for uid, user in self.users.items():
-                if user.get("phone_number") == extracted_phone:
-                    return uid
-                    
+            return self.users.find_by_phone(phone_match.group(0))
+
         return None
 
-    def get_nearest_store(self, lat: float, lon: float) -> tuple[Dict, float]:
+    def get_nearest_store(self, lat: float, lon: float) -> tuple[Optional[Dict], float]:
         """
-        Finds the nearest store using Haversine formula.
+        Finds the nearest store using Haversine distance. Returns (store, distance_km).
         """
-        nearest_store = None
-        min_dist = float("inf")
+        catalog = self.catalog
+        hits = catalog.store_index.nearest(lat, lon, k=1)
+        if not hits:
+            return None, float("inf")
 
-        for store in self.stores:
-            s_lat = store["location"]["latitude"]
-            s_lon = store["location"]["longitude"]
-            
-            dist = math.sqrt((lat - s_lat)**2 + (lon - s_lon)**2)
-            
-            if dist < min_dist:
-                min_dist = dist
-                nearest_store = store
-        
-        return nearest_store, min_dist
+        idx, dist_km = hits[0]
+        return catalog.stores[idx], dist_km
+
+    def get_nearest_stores(self, lat: float, lon: float, k: int = 3) -> List[tuple[Dict, float]]:
+        """
+        Returns the k nearest stores as (store, distance_km) pairs, closest first.
+        """
+        catalog = self.catalog
+        return [(catalog.stores[idx], dist) for idx, dist in catalog.store_index.nearest(lat, lon, k=k)]
+
+    def get_stores_within(self, lat: float, lon: float, radius_km: float) -> List[tuple[Dict, float]]:
+        """
+        Returns all stores within radius_km as (store, distance_km) pairs, closest first.
+        """
+        catalog = self.catalog
+        return [(catalog.stores[idx], dist) for idx, dist in catalog.store_index.within(lat, lon, radius_km)]
+
+    def nearest_stores_batch(self, lats: Sequence[float], lons: Sequence[float],
+                             catalog: Optional[StoreCatalog] = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Nearest store for many points at once. Returns (store_indices, distances_km) arrays,
+        indices being slots of catalog.stores (the current catalog by default); an index of -1
+        means no store could be resolved for that point.
+        """
+        catalog = catalog or self.catalog
+        indices, distances = nearest_batch(lats, lons, catalog.coords[catalog.live])
+        invalid = ~np.isfinite(distances)
+        indices[~invalid] = catalog.live[indices[~invalid]]
+        indices[invalid] = -1
+        return indices, distances
 
     def find_stores_by_text(self, query: str) -> List[Dict]:
         """
@@ -66,96 +258,167 @@ class ContextManager:
         """
         if not query:
             return []
-            
-        query_lower = query.lower()
-        matches = []
-        for store in self.stores:
-            try:
-                name = store["name"].lower()
-                address = store["location"]["address"].lower()
-                address_parts = [p.strip().lower() for p in store["location"]["address"].split(",")]
-                
-                match_found = False
-                
-                for part in address_parts:
-                    if part in query_lower and len(part) > 3: 
-                        match_found = True
-                        break
-                
-                if match_found or query_lower in name or query_lower in address:
-                    matches.append(store)
-            except Exception as e:
-                print(f"Error matching store {store.get('store_id')}: {e}")
-                continue
-                
-        return matches
+
+        catalog = self.catalog
+        return [catalog.stores[idx] for idx in catalog.text_index.search(query)]
 
     def format_context(self, user_id: str, current_lat: float, current_lon: float, query: str = "", include_location: bool = True) -> str:
         """
         Builds the context string for the LLM.
         """
-        user = self.get_user(user_id)
-        
-        context = []
-        
+        if self.context_cache.maxsize > 0:
+            return self._cached_context(user_id, current_lat, current_lon, query, include_location)
+
+        store, dist_km = None, float("inf")
         if include_location:
-            context.append(f"Current Location: Lat: {current_lat:.4f}, Lon: {current_lon:.4f}")
-        
-        if user:
-            context.append(f"User: {user['name']}")
-            context.append(f"Preferences: {user['preferences']['size']} {user['preferences']['favorite_drink']} "
-                           f"({user['preferences']['milk']} Milk, {user['preferences']['sugar']})")
-            context.append(f"Loyalty Points: {user['loyalty_points']}")
-            if user['past_orders']:
-                last_order = user['past_orders'][0]
-                context.append(f"Last Order: {last_order['item']} on {last_order['date']}")
+            store, dist_km = self.get_nearest_store(current_lat, current_lon)
+
+        return self._render_context(self.get_user(user_id), current_lat, current_lon, store, dist_km,
+                                    query, include_location)
+
+    def format_context_batch(self, user_ids: Optional[Sequence[str]] = None, query: str = "",
+                             include_location: bool = True) -> Dict[str, str]:
+        """
+        Builds context strings for many users at their profile location, resolving every
+        nearest store in one vectorized pass. Defaults to all users.
+        """
+        if user_ids is None:
+            user_ids = self.user_ids
+            coords = self.user_coords
         else:
-            context.append("User: Guest (No profile found)")
+            coords = np.array([user_point(self.users.get(uid) or {}) for uid in user_ids],
+                              dtype=np.float64).reshape(-1, 2)
 
-        if not include_location:
-            return "\n".join(context)
+        catalog = self.catalog
+        indices, distances = self.nearest_stores_batch(coords[:, 0], coords[:, 1], catalog)
 
-        store, dist_deg = self.get_nearest_store(current_lat, current_lon)
-        
-        found_store = None
-        dist_str = "Unknown distance"
-        
+        contexts = {}
+        for uid, (lat, lon), idx, dist_km in zip(user_ids, coords.tolist(), indices.tolist(), distances.tolist()):
+            store = catalog.stores[idx] if idx >= 0 else None
+            contexts[uid] = self._render_context(self.get_user(uid), lat, lon, store, dist_km,
+                                                 query, include_location)
+        return contexts
+
+    def select_store(self, store: Optional[Dict], dist_km: float, query: str = "") -> tuple[Optional[Dict], str]:
+        """
+        The store a conversation is about: the nearest one if within 50km, otherwise the first
+        store named in the query. Returns (store, distance description).
+        """
         if store:
-            dist_meters = int(dist_deg * 111000)
+            dist_meters = int(dist_km * 1000)
             if dist_meters <= 50000: 
-                found_store = store
-                dist_str = f"{dist_meters}m" if dist_meters < 1000 else f"{dist_meters/1000:.1f}km"
+                return store, format_distance(dist_km)
         
-        if not found_store and query:
+        if query:
             text_matches = self.find_stores_by_text(query)
             if text_matches:
-                found_store = text_matches[0] 
-                dist_str = "Distance unknown (found by name)"
-
-        if found_store:
-            try:
-                city = found_store["location"]["address"].split(",")[-2].strip()
-                context.append(f"Inferred City: {city}")
-            except:
-                pass
-
-            context.append(f"Nearest Store: {found_store['name']} ({dist_str} away)")
-            context.append(f"Store Hours: {found_store['hours']['open']} - {found_store['hours']['close']}")
-            
-            if found_store['offers']:
-                offers = ", ".join([f"{o['code']} ({o['description']})" for o in found_store['offers']])
-                context.append(f"Active Offers: {offers}")
-            else:
-                context.append("Active Offers: None")
-                
-            unavailable = [k for k, v in found_store['stock'].items() if not v]
-            if unavailable:
-                context.append(f"Out of Stock: {', '.join(unavailable)}")
+                return text_matches[0], "Distance unknown (found by name)"
+
+        return None, "Unknown distance"
+
+    def _cached_context(self, user_id: str, current_lat: float, current_lon: float, query: str,
+                        include_location: bool) -> str:
+        """
+        format_context from cached fragments; the location line, the distance and a store named
+        in the query are resolved per call.
+        """
+        key = (user_id, include_location)
+        if include_location:
+            key += (round(current_lat / self.cell_size), round(current_lon / self.cell_size))
+        fragments = self.context_cache.get(key)
+        if fragments is None:
+            fragments = self._build_fragments(key, user_id, current_lat, current_lon, include_location)
+        user_text, store_point, store_text = fragments
+
+        if not include_location:
+            return user_text
+
+        context = [f"Current Location: Lat: {current_lat:.4f}, Lon: {current_lon:.4f}", user_text]
+        if store_point is not None:
+            store_lat, store_lon = store_point
+            dist_str = format_distance(haversine_km(current_lat, current_lon, store_lat, store_lon))
+            context.append(store_text.replace(DISTANCE_SLOT, dist_str))
         else:
-             context.append("Nearest Store: None nearby (closest is >50km away and no city mentioned)")
+            context.extend(self._store_lines(*self.select_store(None, float("inf"), query)))
+        return "\n".join(context)
+
+    def _build_fragments(self, key: tuple, user_id: str, current_lat: float, current_lon: float,
+                         include_location: bool) -> tuple:
+        stamp = self.context_cache.snapshot([("user", user_id), ("stores",)])
+        user_text = "\n".join(self._user_lines(self.get_user(user_id)))
+        store_point, store_text = None, ""
+        if include_location:
+            catalog = self.catalog
+            hits = catalog.store_index.nearest(current_lat, current_lon, k=1)
+            if hits and int(hits[0][1] * 1000) <= 50000:
+                store_idx = hits[0][0]
+                store = catalog.stores[store_idx]
+                stamp += self.context_cache.snapshot([("store", store["store_id"])])
+                store_point = catalog.point(store_idx)
+                store_text = "\n".join(self._store_lines(store, DISTANCE_SLOT))
+                # A snapshot swapped in before the store's stamp was taken would go unnoticed.
+                if self.catalog is not catalog:
+                    return (user_text, store_point, store_text)
+
+        fragments = (user_text, store_point, store_text)
+        self.context_cache.put(key, fragments, stamp)
+        return fragments
+
+    def _render_context(self, user: Optional[Dict], current_lat: float, current_lon: float,
+                        store: Optional[Dict], dist_km: float, query: str, include_location: bool) -> str:
+        context = []
+        
+        if include_location:
+            context.append(f"Current Location: Lat: {current_lat:.4f}, Lon: {current_lon:.4f}")
         
+        context.extend(self._user_lines(user))
+
+        if not include_location:
+            return "\n".join(context)
+
+        context.extend(self._store_lines(*self.select_store(store, dist_km, query)))
         return "\n".join(context)
 
+    @staticmethod
+    def _user_lines(user: Optional[Dict]) -> List[str]:
+        if not user:
+            return ["User: Guest (No profile found)"]
+
+        lines = [f"User: {user['name']}"]
+        lines.append(f"Preferences: {user['preferences']['size']} {user['preferences']['favorite_drink']} "
+                     f"({user['preferences']['milk']} Milk, {user['preferences']['sugar']})")
+        lines.append(f"Loyalty Points: {user['loyalty_points']}")
+        if user['past_orders']:
+            last_order = user['past_orders'][0]
+            lines.append(f"Last Order: {last_order['item']} on {last_order['date']}")
+        return lines
+
+    @staticmethod
+    def _store_lines(store: Optional[Dict], dist_str: str) -> List[str]:
+        if not store:
+            return ["Nearest Store: None nearby (closest is >50km away and no city mentioned)"]
+
+        lines = []
+        try:
+            city = store["location"]["address"].split(",")[-2].strip()
+            lines.append(f"Inferred City: {city}")
+        except:
+            pass
+
+        lines.append(f"Nearest Store: {store['name']} ({dist_str} away)")
+        lines.append(f"Store Hours: {store['hours']['open']} - {store['hours']['close']}")
+        
+        if store['offers']:
+            offers = ", ".join([f"{o['code']} ({o['description']})" for o in store['offers']])
+            lines.append(f"Active Offers: {offers}")
+        else:
+            lines.append("Active Offers: None")
+            
+        unavailable = [k for k, v in store['stock'].items() if not v]
+        if unavailable:
+            lines.append(f"Out of Stock: {', '.join(unavailable)}")
+        return lines
+
 if __name__ == "__main__":
     cm = ContextManager()
     user_id = list(cm.users.keys())[0]
@@ -0,0 +1,73 @@
+"""
+PDF page text extraction, optionally spread over a process pool. Kept free of the embedding and
+Qdrant imports so that pool workers start quickly.
+"""
+import functools
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+from pypdf import PdfReader
+
+
+@functools.lru_cache(maxsize=4)
+def _reader(pdf_path: str, mtime: float) -> PdfReader:
+    # One parsed reader per document per worker process; mtime keeps it from going stale.
+    return PdfReader(pdf_path)
+
+
+def extract_pages(pdf_path: str, start: int, stop: int, mode: str = "plain") -> List[str]:
+    """
+    Text of pages [start, stop). mode "layout" keeps the horizontal layout (table columns).
+    """
+    reader = _reader(pdf_path, os.path.getmtime(pdf_path))
+    return [reader.pages[i].extract_text(extraction_mode=mode) or "" for i in range(start, stop)]
+
+
+def page_count(pdf_path: str) -> int:
+    return len(_reader(pdf_path, os.path.getmtime(pdf_path)).pages)
+
+
+def iter_page_texts(pdf_path: str, workers: Optional[int] = None, pages_per_task: int = 16,
+                    max_pending: Optional[int] = None, mode: str = "plain") -> Iterator[str]:
+    """
+    Yields the text of every page in order. With more than one worker, page ranges are extracted
+    in a process pool; at most max_pending ranges are in flight or buffered, so a slow consumer
+    stalls extraction instead of piling up text in memory.
+    """
+    try:
+        yield from _iter_page_texts(pdf_path, workers, pages_per_task, max_pending, mode)
+    finally:
+        # The parent's reader is only needed while a document is being read.
+        _reader.cache_clear()
+
+
+def _iter_page_texts(pdf_path: str, workers: Optional[int], pages_per_task: int, max_pending: Optional[int],
+                     mode: str) -> Iterator[str]:
+    workers = workers or os.cpu_count() or 1
+    n_pages = page_count(pdf_path)
+    ranges: List[Tuple[int, int]] = [(i, min(i + pages_per_task, n_pages)) for i in range(0, n_pages, pages_per_task)]
+
+    if workers <= 1 or len(ranges) <= 1:
+        for start, stop in ranges:
+            yield from extract_pages(pdf_path, start, stop, mode)
+        return
+
+    max_pending = max_pending or 2 * workers
+    # spawn, not fork: the parent may already be running ONNX/Qdrant threads.
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        pending = deque()
+        remaining = iter(ranges)
+        for start, stop in remaining:
+            pending.append(pool.submit(extract_pages, pdf_path, start, stop, mode))
+            if len(pending) >= max_pending:
+                break
+        while pending:
+            texts = pending.popleft().result()
+            for start, stop in remaining:
+                pending.append(pool.submit(extract_pages, pdf_path, start, stop, mode))
+                break
+            yield from texts
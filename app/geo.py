@@ -0,0 +1,237 @@
+import heapq
+import math
+from operator import itemgetter
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.persistent import PersistentMap
+
+EARTH_RADIUS_KM = 6371.0088
+# Tombstoned slots of a StoreIndex (as keys).
+EMPTY_DEAD = PersistentMap()
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Great-circle distance in kilometres between two (lat, lon) points.
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def haversine_pairs(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """
+    Element-wise (broadcasting) Haversine distance in km for arrays in degrees.
+    """
+    phi1 = np.radians(np.asarray(lat1, dtype=np.float64))
+    phi2 = np.radians(np.asarray(lat2, dtype=np.float64))
+    d_lambda = np.radians(np.asarray(lon2, dtype=np.float64) - np.asarray(lon1, dtype=np.float64))
+    a = np.sin((phi2 - phi1) / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+
+def haversine_matrix(q_lat: np.ndarray, q_lon: np.ndarray, s_lat: np.ndarray, s_lon: np.ndarray) -> np.ndarray:
+    """
+    Vectorized Haversine: distances in km from every query point (rows) to every store (columns).
+    All inputs are in degrees.
+    """
+    return haversine_pairs(
+        np.asarray(q_lat, dtype=np.float64)[:, None], np.asarray(q_lon, dtype=np.float64)[:, None],
+        np.asarray(s_lat, dtype=np.float64)[None, :], np.asarray(s_lon, dtype=np.float64)[None, :],
+    )
+
+
+def unit_xyz_array(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """
+    (n, 3) array of unit vectors for arrays of (lat, lon) in degrees.
+    """
+    phi = np.radians(np.asarray(lat, dtype=np.float64))
+    lam = np.radians(np.asarray(lon, dtype=np.float64))
+    cos_phi = np.cos(phi)
+    return np.stack([cos_phi * np.cos(lam), cos_phi * np.sin(lam), np.sin(phi)], axis=1)
+
+
+def nearest_batch(q_lat: np.ndarray, q_lon: np.ndarray, coords: np.ndarray,
+                  max_block_elements: int = 4_000_000) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Nearest store for every query point in one vectorized pass per block of queries.
+    coords is an (n, 2) array of (lat, lon). Returns (indices, distances_km); indices are -1
+    when there are no stores.
+
+    The closest store maximises the dot product of unit vectors, so the search is a
+    single matrix product; Haversine is only evaluated for the winning pairs.
+    """
+    q_lat = np.asarray(q_lat, dtype=np.float64)
+    q_lon = np.asarray(q_lon, dtype=np.float64)
+    indices = np.full(len(q_lat), -1, dtype=np.int64)
+    if len(coords) == 0 or len(q_lat) == 0:
+        return indices, np.full(len(q_lat), np.inf)
+
+    stores_xyz = unit_xyz_array(coords[:, 0], coords[:, 1])
+    queries_xyz = unit_xyz_array(q_lat, q_lon)
+
+    # Blocks keep the (queries x stores) matrix bounded in memory.
+    block_size = max(1, max_block_elements // len(coords))
+    for start in range(0, len(q_lat), block_size):
+        stop = start + block_size
+        indices[start:stop] = np.argmax(queries_xyz[start:stop] @ stores_xyz.T, axis=1)
+
+    best = coords[indices]
+    return indices, haversine_pairs(q_lat, q_lon, best[:, 0], best[:, 1])
+
+
+def to_unit_xyz(lat: float, lon: float) -> Tuple[float, float, float]:
+    phi, lam = math.radians(lat), math.radians(lon)
+    cos_phi = math.cos(phi)
+    return (cos_phi * math.cos(lam), cos_phi * math.sin(lam), math.sin(phi))
+
+
+def chord_to_km(chord: float) -> float:
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+def km_to_chord(km: float) -> float:
+    return 2 * math.sin(min(math.pi, km / EARTH_RADIUS_KM) / 2)
+
+
+class StoreIndex:
+    """
+    k-d tree over store coordinates projected onto the unit sphere.
+
+    Straight-line (chord) distance between unit vectors is monotonic in
+    great-circle distance, so the tree can prune with plain Euclidean maths
+    and only convert the final answers back to kilometres.
+    Nodes are tuples of (x, y, z, idx, axis, left, right).
+
+    The index is persistent: insert() and remove() return a new index that shares
+    all untouched nodes with the old one, which stays valid for concurrent readers.
+    Inserts copy the root-to-leaf path; removals tombstone the point's idx in a PersistentMap,
+    which copies one shard rather than every tombstone.
+    """
+
+    def __init__(self, points: Sequence[Tuple[float, float]] = (), indices: Optional[Sequence[int]] = None):
+        indices = range(len(points)) if indices is None else indices
+        items = [to_unit_xyz(lat, lon) + (idx,) for idx, (lat, lon) in zip(indices, points)]
+        self._size = len(items)
+        self._root = self._build(items, 0)
+        self._dead = EMPTY_DEAD
+
+    def __len__(self) -> int:
+        return self._size - len(self._dead)
+
+    @property
+    def tombstones(self) -> int:
+        return len(self._dead)
+
+    def _derive(self, root: Optional[Tuple], size: int, dead: PersistentMap) -> "StoreIndex":
+        index = StoreIndex.__new__(StoreIndex)
+        index._root, index._size, index._dead = root, size, dead
+        return index
+
+    def insert(self, lat: float, lon: float, idx: int) -> "StoreIndex":
+        """
+        New index with the point added under idx (which must not have been used before).
+        """
+        point = to_unit_xyz(lat, lon)
+
+        def add(node, depth):
+            if node is None:
+                return point + (idx, depth % 3, None, None)
+            x, y, z, node_idx, axis, left, right = node
+            if point[axis] < node[axis]:
+                return (x, y, z, node_idx, axis, add(left, depth + 1), right)
+            return (x, y, z, node_idx, axis, left, add(right, depth + 1))
+
+        return self._derive(add(self._root, 0), self._size + 1, self._dead)
+
+    def remove(self, idx: int) -> "StoreIndex":
+        """
+        New index without the point stored under idx.
+        """
+        dead = self._dead.evolver()
+        dead[idx] = None
+        return self._derive(self._root, self._size, dead.persistent())
+
+    def _build(self, items: List[Tuple], depth: int) -> Optional[Tuple]:
+        if not items:
+            return None
+        axis = depth % 3
+        items.sort(key=itemgetter(axis))
+        mid = len(items) // 2
+        x, y, z, idx = items[mid]
+        return (
+            x, y, z, idx, axis,
+            self._build(items[:mid], depth + 1),
+            self._build(items[mid + 1:], depth + 1),
+        )
+
+    def nearest(self, lat: float, lon: float, k: int = 1) -> List[Tuple[int, float]]:
+        """
+        Returns up to k (index, distance_km) pairs, closest first.
+        """
+        if k <= 0 or self._root is None:
+            return []
+
+        q = to_unit_xyz(lat, lon)
+        heap: List[Tuple[float, int]] = []
+        dead = self._dead or ()
+
+        def visit(node):
+            if node is None:
+                return
+            dx, dy, dz = node[0] - q[0], node[1] - q[1], node[2] - q[2]
+            d2 = dx * dx + dy * dy + dz * dz
+            if node[3] in dead:
+                pass
+            elif len(heap) < k:
+                heapq.heappush(heap, (-d2, node[3]))
+            elif d2 < -heap[0][0]:
+                heapq.heapreplace(heap, (-d2, node[3]))
+
+            diff = q[node[4]] - node[node[4]]
+            near, far = (node[5], node[6]) if diff < 0 else (node[6], node[5])
+            visit(near)
+            if len(heap) < k or diff * diff < -heap[0][0]:
+                visit(far)
+
+        visit(self._root)
+        return sorted(((idx, chord_to_km(math.sqrt(-neg_d2))) for neg_d2, idx in heap), key=itemgetter(1))
+
+    def within(self, lat: float, lon: float, radius_km: float) -> List[Tuple[int, float]]:
+        """
+        Returns every (index, distance_km) pair within radius_km, closest first.
+        """
+        if radius_km < 0 or self._root is None:
+            return []
+
+        q = to_unit_xyz(lat, lon)
+        limit = km_to_chord(radius_km) ** 2
+        dead = self._dead or ()
+        found: List[Tuple[int, float]] = []
+        stack = [self._root]
+
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            dx, dy, dz = node[0] - q[0], node[1] - q[1], node[2] - q[2]
+            d2 = dx * dx + dy * dy + dz * dz
+            if d2 <= limit and node[3] not in dead:
+                found.append((node[3], chord_to_km(math.sqrt(d2))))
+
+            diff = q[node[4]] - node[node[4]]
+            if diff < 0:
+                stack.append(node[5])
+                if diff * diff <= limit:
+                    stack.append(node[6])
+            else:
+                stack.append(node[6])
+                if diff * diff <= limit:
+                    stack.append(node[5])
+
+        found.sort(key=itemgetter(1))
+        return found
@@ -0,0 +1,100 @@
+"""
+Request-path logging that never blocks on stdout: records go through a bounded queue to a
+writer thread, and chatty loggers (per-request lines, rendered contexts) keep only a sample of
+their records. Warnings and errors are never sampled out.
+
+LOG_LEVEL sets the level of the "app" loggers (default INFO; DEBUG adds the rendered user
+context) and LOG_SAMPLE_RATE the fraction of sampled records kept (default 0.01).
+"""
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+from typing import Optional
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+
+class BackgroundHandler(logging.Handler):
+    """
+    Hands records to a bounded queue that a daemon thread drains into target, so emit() only
+    costs a put. Records are dropped (and counted in dropped) when the queue is full. The
+    thread is started on first use in each process, so a handler created before app.serve
+    forks its workers still writes from every worker.
+    """
+
+    def __init__(self, target: logging.Handler, maxsize: int = 10000):
+        super().__init__()
+        self.target = target
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._queue: Optional[queue.Queue] = None
+        self._pid: Optional[int] = None
+        self._start_lock = threading.Lock()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self._pid != os.getpid():
+            self._start()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(self.maxsize)
+            threading.Thread(target=self._drain, args=(self._queue,), name="log-writer", daemon=True).start()
+            self._pid = os.getpid()
+
+    def _drain(self, records: queue.Queue) -> None:
+        while True:
+            self.target.handle(records.get())
+
+
+class SampledLogger(logging.LoggerAdapter):
+    """
+    Keeps a rate fraction of the records below WARNING. The sample is drawn before a record is
+    built, so a skipped call costs one random() instead of a LogRecord and a caller lookup.
+    """
+
+    def __init__(self, logger: logging.Logger, rate: float):
+        super().__init__(logger, {})
+        self.rate = rate
+
+    def isEnabledFor(self, level: int) -> bool:
+        return self.logger.isEnabledFor(level) and (level >= logging.WARNING or random.random() < self.rate)
+
+    def process(self, msg, kwargs):
+        return msg, kwargs
+
+
+_handler: Optional[BackgroundHandler] = None
+
+
+def get_logger(name: str, sampled: bool = False):
+    """
+    Logger under "app" that writes through the shared BackgroundHandler; with sampled, a
+    SampledLogger keeping LOG_SAMPLE_RATE of its records below WARNING.
+    """
+    global _handler
+    if _handler is None:
+        target = logging.StreamHandler(sys.stdout)
+        target.setFormatter(logging.Formatter(LOG_FORMAT))
+        _handler = BackgroundHandler(target)
+        root = logging.getLogger("app")
+        root.addHandler(_handler)
+        root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+        root.propagate = False
+
+    logger = logging.getLogger(name)
+    if sampled:
+        return SampledLogger(logger, float(os.getenv("LOG_SAMPLE_RATE", "0.01")))
+    return logger
+
+
+def dropped_records() -> int:
+    return _handler.dropped if _handler is not None else 0
@@ -1,7 +1,14 @@
-from fastapi import FastAPI, HTTPException
+import hmac
+import json
+import os
+from typing import Any, Dict, Optional
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from app.agent import SupportAgent
+from app.logs import dropped_records, get_logger
+from app.metrics import REGISTRY
 from fastapi.staticfiles import StaticFiles
 import uvicorn
 
@@ -17,6 +24,28 @@ app.add_middleware(
 
 agent = SupportAgent()
 
+# One line per request would be a stdout write on every call; only a LOG_SAMPLE_RATE sample is kept.
+log = get_logger("app.requests", sampled=True)
+REGISTRY.counter("app_log_records_dropped_total", "Log records dropped because the log queue was full.",
+                 dropped_records)
+
+# Store admin endpoints are disabled unless a token is configured.
+STORE_ADMIN_TOKEN = os.getenv("STORE_ADMIN_TOKEN", "")
+
+@app.on_event("startup")
+def start_store_watch():
+    # Runs in each worker, after app.serve forks, so every process follows stores.json.
+    agent.context.start_store_watch()
+
+@app.on_event("shutdown")
+def stop_store_watch():
+    agent.context.stop_store_watch()
+
+@app.on_event("shutdown")
+def save_rag_cache():
+    # app.serve workers leave through os._exit, which skips atexit, so each saves its query cache here.
+    agent.rag.save_cache()
+
 class ChatRequest(BaseModel):
     user_id: str
     query: str
@@ -30,8 +59,9 @@ class ChatResponse(BaseModel):
 @app.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
     try:
-        print(f"Received Request: User={request.user_id}, Lat={request.latitude}, Lon={request.longitude}, Query={request.query}")
-        response, final_user_id = agent.process_query(
+        log.info("Request: User=%s, Lat=%s, Lon=%s, Query=%s",
+                 request.user_id, request.latitude, request.longitude, request.query)
+        response, final_user_id = await agent.aprocess_query(
             user_id=request.user_id,
             query=request.query,
             lat=request.latitude,
@@ -41,6 +71,76 @@ async def chat(request: ChatRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Same as /chat, but streams the answer as Server-Sent Events while the LLM generates it.
+    """
+    log.info("Stream request: User=%s, Lat=%s, Lon=%s, Query=%s",
+             request.user_id, request.latitude, request.longitude, request.query)
+
+    async def events():
+        try:
+            async for event in agent.astream_query(
+                user_id=request.user_id,
+                query=request.query,
+                lat=request.latitude,
+                lon=request.longitude
+            ):
+                yield f"data: {json.dumps(event)}\n\n"
+        except Exception as e:
+            yield f"data: {json.dumps({'type': 'error', 'detail': str(e)})}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/metrics")
+def metrics():
+    """
+    Prometheus text format: per-stage, per-request and embedding / Qdrant / LLM latency
+    histograms. Each worker process reports its own.
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+def check_admin(token: Optional[str]) -> None:
+    if not STORE_ADMIN_TOKEN or not hmac.compare_digest(token or "", STORE_ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Store updates are not enabled for this token")
+
+@app.patch("/stores/{store_id}")
+def update_store(store_id: str, changes: Dict[str, Any], x_admin_token: Optional[str] = Header(None)):
+    """
+    Partial store update, e.g. {"stock": {"Vada Pav": false}}. Applies to this process only:
+    with several workers, edit stores.json and let STORES_WATCH_INTERVAL pick it up instead.
+    """
+    check_admin(x_admin_token)
+    try:
+        return agent.context.update_store(store_id, changes)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown store {store_id}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/stores")
+def add_store(store: Dict[str, Any], x_admin_token: Optional[str] = Header(None)):
+    check_admin(x_admin_token)
+    try:
+        agent.context.add_store(store)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return store
+
+@app.delete("/stores/{store_id}")
+def remove_store(store_id: str, x_admin_token: Optional[str] = Header(None)):
+    check_admin(x_admin_token)
+    try:
+        agent.context.remove_store(store_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown store {store_id}")
+    return {"deleted": store_id}
+
 app.mount("/", StaticFiles(directory="frontend", html=True), name="frontend")
 
 if __name__ == "__main__":
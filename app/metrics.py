@@ -0,0 +1,105 @@
+"""
+In-process latency histograms rendered in the Prometheus text exposition format, for the
+/metrics endpoint. Observing a value is a bucket search and a few additions under a lock, so
+it is cheap enough for every request; nothing is written anywhere until /metrics is scraped.
+"""
+import contextlib
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; spans from sub-millisecond cache hits and routed answers to multi-second LLM calls.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram with one optional label. Per label value it keeps the bucket
+    counts, the sum and the count, as a Prometheus histogram does.
+    """
+
+    def __init__(self, name: str, help: str, label: Optional[str] = None,
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = tuple(sorted(buckets))
+        # label value -> [count per bucket (last one is +Inf), sum]
+        self._series: Dict[str, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, label_value: str = "") -> None:
+        slot = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][slot] += 1
+            series[1][0] += value
+
+    @contextlib.contextmanager
+    def time(self, label_value: str = "") -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, label_value)
+
+    def snapshot(self) -> Dict[str, Tuple[List[int], float]]:
+        with self._lock:
+            return {label_value: (list(counts), total[0]) for label_value, (counts, total) in self._series.items()}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_value, (counts, total) in sorted(self.snapshot().items()):
+            labels = f'{self.label}="{_escape(label_value)}"' if self.label else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{{labels + "," if labels else ""}le="{le}"}} {cumulative}')
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {total!r}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.histograms: Dict[str, Histogram] = {}
+        # name -> (help, function returning the current total)
+        self.counters: Dict[str, Tuple[str, Callable[[], float]]] = {}
+
+    def histogram(self, name: str, help: str, label: Optional[str] = None,
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        if name not in self.histograms:
+            self.histograms[name] = Histogram(name, help, label, buckets)
+        return self.histograms[name]
+
+    def counter(self, name: str, help: str, read: Callable[[], float]) -> None:
+        """
+        Counter whose value is read from read() at scrape time, for totals kept elsewhere.
+        """
+        self.counters[name] = (help, read)
+
+    def render(self) -> str:
+        lines = []
+        for histogram in self.histograms.values():
+            lines.extend(histogram.render())
+        for name, (help, read) in self.counters.items():
+            lines.extend([f"# HELP {name} {help}", f"# TYPE {name} counter", f"{name} {read()!r}"])
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# Graph nodes (route, anonymize, retrieve_context, retrieve_rag, pack, generate) and whole requests.
+STAGE_SECONDS = REGISTRY.histogram("agent_stage_seconds", "Wall time of each agent graph node.", "stage")
+REQUEST_SECONDS = REGISTRY.histogram("agent_request_seconds", "Wall time of a whole agent request.", "path")
+# Calls out of the nodes: query embedding, Qdrant searches and LLM completions.
+SPAN_SECONDS = REGISTRY.histogram("agent_span_seconds", "Wall time of embedding, Qdrant and LLM calls.", "span")
@@ -0,0 +1,122 @@
+"""
+Fits the user context and retrieved chunks into a token budget before they go into the system
+prompt: context fields irrelevant to the query's intent are dropped, lines that overlapping
+chunks share are kept once, and chunks are admitted best score first until the budget is spent.
+"""
+from typing import Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from app.chunking import estimate_tokens
+
+# Context lines ("Field: value") each intent can do without. With several intents only fields
+# that all of them can drop are removed; a query without a structured intent keeps everything.
+IRRELEVANT_FIELDS = {
+    "price": {"Current Location", "Loyalty Points", "Store Hours", "Out of Stock"},
+    "stock": {"Current Location", "Loyalty Points", "Last Order", "Store Hours"},
+    "hours": {"Current Location", "Preferences", "Loyalty Points", "Last Order", "Out of Stock"},
+}
+# Fewest shared lines that count as a sliding-window overlap between two chunks.
+MIN_OVERLAP_LINES = 2
+
+
+class PackedContext(NamedTuple):
+    context_str: str
+    rag_str: str
+    tokens: int
+    dropped_fields: List[str]
+    # Hits wholly contained in better-scored chunks, and chunks left out for lack of budget.
+    duplicate_chunks: int
+    dropped_chunks: int
+
+
+def _field(line: str) -> str:
+    return line.split(":", 1)[0].strip()
+
+
+def _overlap(first: Sequence[str], second: Sequence[str]) -> int:
+    """
+    Number of trailing lines of first that are the leading lines of second.
+    """
+    for n in range(min(len(first), len(second)), MIN_OVERLAP_LINES - 1, -1):
+        if list(first[-n:]) == list(second[:n]):
+            return n
+    return 0
+
+
+def dedupe_chunks(hits: Iterable[Tuple[str, float]]) -> List[Tuple[List[str], float]]:
+    """
+    Chunks as line lists, best score first. A chunk whose lines all appear in better ones is
+    dropped; one that continues or precedes a better one through shared lines (the line-window
+    chunker's overlap) loses those lines, so they appear once.
+    """
+    kept: List[Tuple[List[str], float]] = []
+    for text, score in sorted(hits, key=lambda hit: hit[1], reverse=True):
+        lines = [line for line in text.split("\n") if line.strip()]
+        for better, _ in kept:
+            if not lines or set(lines) <= set(better):
+                lines = []
+                break
+            lines = lines[_overlap(better, lines):]
+            lines = lines[:len(lines) - _overlap(lines, better)]
+        if lines:
+            kept.append((lines, score))
+    return kept
+
+
+class ContextPacker:
+    """
+    budget is the token allowance for the user context plus the RAG text (estimated, as with
+    estimate_tokens); 0 disables packing. The user context is short and always kept (minus
+    fields irrelevant to the intent); chunks then fill the rest in score order, skipping any
+    that do not fit. If not even the best chunk fits, its leading lines are kept.
+    """
+
+    def __init__(self, budget: int = 512):
+        self.budget = budget
+
+    def pack(self, context_str: str, hits: Sequence[Tuple[str, float]],
+             intents: Optional[Iterable[str]] = None) -> PackedContext:
+        if self.budget <= 0:
+            rag_str = "\n".join(f"- {text}" for text, _ in hits)
+            tokens = estimate_tokens(context_str) + estimate_tokens(rag_str)
+            return PackedContext(context_str, rag_str, tokens, [], 0, 0)
+
+        drop = self._irrelevant(intents or [])
+        lines = context_str.split("\n")
+        kept_lines = [line for line in lines if _field(line) not in drop]
+        dropped_fields = [_field(line) for line in lines if _field(line) in drop]
+        context_str = "\n".join(kept_lines)
+
+        remaining = self.budget - estimate_tokens(context_str)
+        chunks = dedupe_chunks(hits)
+        packed: List[str] = []
+        for chunk_lines, _ in chunks:
+            entry = "- " + "\n".join(chunk_lines)
+            tokens = estimate_tokens(entry) + 1
+            if tokens <= remaining:
+                packed.append(entry)
+                remaining -= tokens
+            elif not packed:
+                entry = self._truncate(chunk_lines, remaining)
+                if entry:
+                    packed.append(entry)
+                    remaining -= estimate_tokens(entry) + 1
+
+        rag_str = "\n".join(packed)
+        tokens = estimate_tokens(context_str) + estimate_tokens(rag_str)
+        return PackedContext(context_str, rag_str, tokens, dropped_fields,
+                             len(hits) - len(chunks), len(chunks) - len(packed))
+
+    @staticmethod
+    def _irrelevant(intents: Iterable[str]) -> Set[str]:
+        fields = [IRRELEVANT_FIELDS[intent] for intent in intents if intent in IRRELEVANT_FIELDS]
+        return set.intersection(*fields) if fields else set()
+
+    @staticmethod
+    def _truncate(lines: List[str], budget: int) -> str:
+        entry = ""
+        for line in lines:
+            candidate = f"{entry}\n{line}" if entry else f"- {line}"
+            if estimate_tokens(candidate) + 1 > budget:
+                break
+            entry = candidate
+        return entry
@@ -0,0 +1,217 @@
+"""
+Immutable containers with structural sharing for the store catalogue snapshots. Items live in
+fixed-size chunks or hash shards, so a change copies the outer tuple and the chunks it touches
+and shares everything else with the previous version: an update to a 100k-store catalogue
+copies a few hundred references instead of every record.
+
+Changes go through an evolver, which copies each chunk at most once per batch; persistent()
+returns the new version, and the evolver starts copying afresh if it is used again.
+"""
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Set, Tuple
+
+CHUNK_SIZE = 256
+SHARDS = 256
+
+
+class SlotVector:
+    """
+    Immutable sequence addressed by position, stored in chunks of CHUNK_SIZE.
+    """
+
+    __slots__ = ("_chunks", "_len")
+
+    def __init__(self, items: Iterable = ()):
+        items = list(items)
+        self._chunks = tuple(tuple(items[i:i + CHUNK_SIZE]) for i in range(0, len(items), CHUNK_SIZE))
+        self._len = len(items)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __getitem__(self, idx: int):
+        if not 0 <= idx < self._len:
+            raise IndexError(idx)
+        return self._chunks[idx // CHUNK_SIZE][idx % CHUNK_SIZE]
+
+    def __iter__(self) -> Iterator:
+        for chunk in self._chunks:
+            yield from chunk
+
+    def evolver(self) -> "SlotVectorEvolver":
+        return SlotVectorEvolver(self)
+
+
+class SlotVectorEvolver:
+    def __init__(self, vector: SlotVector):
+        self._chunks: List = list(vector._chunks)
+        self._len = len(vector)
+        self._owned: Set[int] = set()
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __getitem__(self, idx: int):
+        if not 0 <= idx < self._len:
+            raise IndexError(idx)
+        return self._chunks[idx // CHUNK_SIZE][idx % CHUNK_SIZE]
+
+    def __setitem__(self, idx: int, value) -> None:
+        if not 0 <= idx < self._len:
+            raise IndexError(idx)
+        self._chunk(idx // CHUNK_SIZE)[idx % CHUNK_SIZE] = value
+
+    def append(self, value) -> None:
+        if self._len % CHUNK_SIZE == 0:
+            self._chunks.append(())
+        self._chunk(len(self._chunks) - 1).append(value)
+        self._len += 1
+
+    def _chunk(self, pos: int) -> List:
+        if pos not in self._owned:
+            self._chunks[pos] = list(self._chunks[pos])
+            self._owned.add(pos)
+        return self._chunks[pos]
+
+    def persistent(self) -> SlotVector:
+        chunks = list(self._chunks)
+        for pos in self._owned:
+            chunks[pos] = tuple(chunks[pos])
+        self._owned = set()
+        vector = SlotVector.__new__(SlotVector)
+        vector._chunks = tuple(chunks)
+        vector._len = self._len
+        return vector
+
+
+class PersistentMap:
+    """
+    Immutable mapping split by key hash into SHARDS dicts.
+    """
+
+    __slots__ = ("_shards", "_len")
+
+    def __init__(self, items: Iterable[Tuple[Hashable, Any]] = ()):
+        shards: List[Dict] = [{} for _ in range(SHARDS)]
+        for key, value in items:
+            shards[hash(key) % SHARDS][key] = value
+        self._shards = tuple(shards)
+        self._len = sum(len(shard) for shard in shards)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __contains__(self, key) -> bool:
+        return key in self._shards[hash(key) % SHARDS]
+
+    def __getitem__(self, key):
+        return self._shards[hash(key) % SHARDS][key]
+
+    def get(self, key, default=None):
+        return self._shards[hash(key) % SHARDS].get(key, default)
+
+    def __iter__(self) -> Iterator:
+        for shard in self._shards:
+            yield from shard
+
+    def items(self) -> Iterator[Tuple[Hashable, Any]]:
+        for shard in self._shards:
+            yield from shard.items()
+
+    def evolver(self) -> "MapEvolver":
+        return MapEvolver(self)
+
+
+class MapEvolver:
+    def __init__(self, mapping: PersistentMap):
+        self._shards: List[Dict] = list(mapping._shards)
+        self._len = len(mapping)
+        self._owned: Set[int] = set()
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __contains__(self, key) -> bool:
+        return key in self._shards[hash(key) % SHARDS]
+
+    def __getitem__(self, key):
+        return self._shards[hash(key) % SHARDS][key]
+
+    def get(self, key, default=None):
+        return self._shards[hash(key) % SHARDS].get(key, default)
+
+    def __setitem__(self, key, value) -> None:
+        shard = self._shard(key)
+        self._len += key not in shard
+        shard[key] = value
+
+    def __delitem__(self, key) -> None:
+        del self._shard(key)[key]
+        self._len -= 1
+
+    def _shard(self, key) -> Dict:
+        pos = hash(key) % SHARDS
+        if pos not in self._owned:
+            self._shards[pos] = dict(self._shards[pos])
+            self._owned.add(pos)
+        return self._shards[pos]
+
+    def persistent(self) -> PersistentMap:
+        self._owned = set()
+        mapping = PersistentMap.__new__(PersistentMap)
+        mapping._shards = tuple(self._shards)
+        mapping._len = self._len
+        return mapping
+
+
+class Postings:
+    """
+    Immutable ascending sequence of ints (store slots) in chunks of at most CHUNK_SIZE.
+    removed() copies the chunk holding the value; appended() (values past the end only) copies
+    the last chunk.
+    """
+
+    __slots__ = ("_chunks", "_len")
+
+    def __init__(self, items: Iterable[int] = ()):
+        items = list(items)
+        self._chunks = tuple(tuple(items[i:i + CHUNK_SIZE]) for i in range(0, len(items), CHUNK_SIZE))
+        self._len = len(items)
+
+    @classmethod
+    def _make(cls, chunks: Tuple[Tuple[int, ...], ...], length: int) -> "Postings":
+        postings = cls.__new__(cls)
+        postings._chunks = chunks
+        postings._len = length
+        return postings
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[int]:
+        for chunk in self._chunks:
+            yield from chunk
+
+    @property
+    def last(self) -> int:
+        return self._chunks[-1][-1]
+
+    def removed(self, value: int) -> "Postings":
+        pos = bisect_right([chunk[0] for chunk in self._chunks], value) - 1
+        if pos < 0:
+            return self
+        chunk = self._chunks[pos]
+        at = bisect_left(chunk, value)
+        if at == len(chunk) or chunk[at] != value:
+            return self
+        chunk = chunk[:at] + chunk[at + 1:]
+        return self._make(self._chunks[:pos] + ((chunk,) if chunk else ()) + self._chunks[pos + 1:], self._len - 1)
+
+    def appended(self, value: int) -> "Postings":
+        if self._chunks and value <= self.last:
+            raise ValueError(f"{value} does not follow {self.last}")
+        if self._chunks and len(self._chunks[-1]) < CHUNK_SIZE:
+            chunks = self._chunks[:-1] + (self._chunks[-1] + (value,),)
+        else:
+            chunks = self._chunks + ((value,),)
+        return self._make(chunks, self._len + 1)
@@ -1,50 +1,272 @@
+import functools
+import os
+import re
+import threading
+from collections import deque
+from typing import Deque, Iterable, Iterator, List, Optional, Tuple
+
 from presidio_analyzer import AnalyzerEngine, PatternRecognizer, Pattern
+from presidio_analyzer.nlp_engine import NlpEngine, NlpEngineProvider
 from presidio_anonymizer import AnonymizerEngine
 from presidio_anonymizer.entities import OperatorConfig
-import spacy
 
-try:
-    nlp = spacy.load("en_core_web_lg")
-except OSError:
-    print("Downloading en_core_web_lg model...")
-    from spacy.cli import download
-    download("en_core_web_lg")
-    nlp = spacy.load("en_core_web_lg")
+from app.users import PHONE_PATTERN
+
+# Pipeline sizes for PII_MODEL (all CPU, transformer-free); any other value is used as a spaCy package name.
+MODEL_SIZES = {
+    "sm": "en_core_web_sm",
+    "md": "en_core_web_md",
+    "lg": "en_core_web_lg",
+}
+DEFAULT_MODEL = "lg"
+
+ENTITIES = ["PHONE_NUMBER", "EMAIL_ADDRESS", "PERSON", "LOCATION"]
+
+OPERATORS = {
+    "DEFAULT": OperatorConfig("replace", {"new_value": "<SENSITIVE_DATA>"}),
+    "PHONE_NUMBER": OperatorConfig("replace", {"new_value": "<PHONE_NUMBER>"}),
+    "EMAIL_ADDRESS": OperatorConfig("replace", {"new_value": "<EMAIL_ADDRESS>"}),
+    "PERSON": OperatorConfig("replace", {"new_value": "<PERSON>"}),
+    "LOCATION": OperatorConfig("replace", {"new_value": "<LOCATION>"}),
+}
+
+EMAIL_PATTERN = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+# Member and order IDs are not PII, but they must not look like proper nouns to the NER gate.
+ID_PATTERN = re.compile(r"\b(?:USR|ORD)-[\d-]+\b", re.IGNORECASE)
+# Digit runs that might be a phone number in a format the regex tier does not know.
+DIGIT_RUN_PATTERN = re.compile(r"\+?\d[\d\s().-]{5,}\d")
+WORD_PATTERN = re.compile(r"\b[A-Za-z][A-Za-z'-]*")
+NAME_CUE_PATTERN = re.compile(r"\b(?:my name is|name's|i am|i'm|this is|call me|speaking)\b", re.IGNORECASE)
+
+# Words that are not names or places, in any case: everyday support-chat English and the menu
+# vocabulary. Any other word may be a name or a place ("rahul", "andheri") and sends the text to NER.
+NON_ENTITY_WORDS = {
+    "a", "about", "after", "again", "all", "also", "am", "an", "and", "any", "anything", "are", "as",
+    "at", "available", "back", "be", "because", "been", "before", "being", "best", "better", "big",
+    "bill", "both", "but", "buy", "by", "can", "can't", "cancel", "card", "cash", "change", "charge",
+    "charged", "check", "close", "closed", "closes", "closing", "come", "complain", "complaint", "cost",
+    "costs", "could", "coupon", "cup", "cups", "day", "days", "deliver", "delivery", "did", "didn't",
+    "discount", "do", "does", "doesn't", "don't", "drink", "drinks", "each", "early", "eat", "else",
+    "email", "evening", "ever", "every", "extra", "food", "for", "friend", "from", "get", "give", "go",
+    "going", "good", "got", "great", "had", "has", "have", "having", "he", "hello", "help", "her",
+    "here", "hey", "hi", "him", "his", "hot", "hours", "how", "i", "i'd", "i'll", "i'm", "i've", "id",
+    "if", "in", "info", "is", "isn't", "it", "it's", "item", "items", "just", "know", "late", "later",
+    "let", "like", "live", "location", "long", "look", "looking", "loyalty", "make", "many", "may",
+    "me", "member", "membership", "menu", "more", "morning", "most", "much", "my", "near", "nearest",
+    "need", "new", "next", "night", "no", "not", "now", "number", "of", "off", "offer", "offers", "ok",
+    "okay", "on", "one", "only", "open", "opening", "or", "order", "ordered", "orders", "other", "our",
+    "out", "outlet", "paid", "pay", "payment", "phone", "please", "pls", "point", "points", "policy",
+    "price", "prices", "pricing", "receipt", "recommend", "refund", "reward", "rewards", "right", "same",
+    "say", "seating", "see", "service", "she", "should", "size", "so", "some", "something", "sorry",
+    "still", "stock", "store", "stores", "sure", "table", "take", "takeaway", "than", "thank", "thanks",
+    "that", "that's", "the", "their", "them", "then", "there", "these", "they", "thing", "this", "those",
+    "time", "timing", "timings", "to", "today", "tomorrow", "tonight", "too", "try", "two", "up", "us",
+    "use", "used", "very", "vegan", "wait", "want", "wanted", "was", "wasn't", "way", "we", "week",
+    "weekend", "well", "were", "what", "what's", "when", "where", "which", "while", "who", "why",
+    "will", "with", "without", "won't", "would", "wrong", "yes", "yet", "you", "you're", "your",
+    "masala", "chai", "ginger", "elaichi", "lemon", "tea", "green", "kashmiri", "kahwa", "tulsi",
+    "assam", "strong", "filter", "coffee", "cappuccino", "latte", "espresso", "americano", "mocha",
+    "macchiato", "flat", "white", "iced", "cold", "brew", "vietnamese", "peach", "mango", "rose",
+    "lassi", "buttermilk", "bun", "maska", "samosa", "vada", "pav", "poha", "upma", "banana", "cake",
+    "chocolate", "muffin", "paneer", "chicken", "puff", "sandwich", "small", "medium", "large",
+    "velvet", "wi-fi", "wifi", "upi", "oat", "almond", "soy", "milk", "jaggery", "sugar", "free",
+}
+
+Span = Tuple[int, int, str]
+
+
+def resolve_model_name(model: Optional[str] = None) -> str:
+    model = model or os.getenv("PII_MODEL", DEFAULT_MODEL)
+    return MODEL_SIZES.get(model, model)
+
+
+@functools.lru_cache(maxsize=None)
+def get_nlp_engine(model_name: str) -> NlpEngine:
+    """
+    The process-wide spaCy NLP engine for a model, loaded (and downloaded if missing) on first use.
+    Every PrivacyManager in the process shares it, so the model is only ever in memory once.
+    """
+    print(f"Loading spaCy model {model_name}...")
+    provider = NlpEngineProvider(nlp_configuration={
+        "nlp_engine_name": "spacy",
+        "models": [{"lang_code": "en", "model_name": model_name}],
+    })
+    return provider.create_engine()
+
 
 class PrivacyManager:
-    def __init__(self):
-        self.analyzer = AnalyzerEngine()
+    def __init__(self, model: Optional[str] = None, preload: Optional[bool] = None):
+        """
+        model is a size from MODEL_SIZES or a spaCy package name (default: PII_MODEL, else "lg").
+        The NER pipeline is loaded the first time a message needs it, unless preload (or
+        PII_PRELOAD=1) asks for it up front.
+        """
+        self.model_name = resolve_model_name(model)
         self.anonymizer = AnonymizerEngine()
-        
-        phone_pattern = Pattern(name="indian_phone_pattern", regex=r"\+91-\d{5}-\d{5}", score=1.0)
-        phone_recognizer = PatternRecognizer(supported_entity="PHONE_NUMBER", patterns=[phone_pattern])
-        self.analyzer.registry.add_recognizer(phone_recognizer)
+        self._analyzer: Optional[AnalyzerEngine] = None
+        self._analyzer_lock = threading.Lock()
+
+        if preload is None:
+            preload = os.getenv("PII_PRELOAD", "0") == "1"
+        if preload:
+            self.load()
+
+    @property
+    def analyzer(self) -> AnalyzerEngine:
+        return self._analyzer or self.load()
+
+    def load(self) -> AnalyzerEngine:
+        """
+        Builds the analyzer on the shared NLP engine. Safe to call more than once and from several threads.
+        """
+        if self._analyzer is None:
+            with self._analyzer_lock:
+                if self._analyzer is None:
+                    analyzer = AnalyzerEngine(nlp_engine=get_nlp_engine(self.model_name), supported_languages=["en"])
+
+                    phone_pattern = Pattern(name="indian_phone_pattern", regex=r"\+91-\d{5}-\d{5}", score=1.0)
+                    phone_recognizer = PatternRecognizer(supported_entity="PHONE_NUMBER", patterns=[phone_pattern])
+                    analyzer.registry.add_recognizer(phone_recognizer)
+                    self._analyzer = analyzer
+        return self._analyzer
 
     def anonymize(self, text: str):
         """
         Anonymizes the input text by replacing sensitive entities with placeholders.
         """
+        return self.anonymize_tiered(text)[0]
+
+    def anonymize_tiered(self, text: str) -> Tuple[str, str]:
+        """
+        Anonymizes text through the cheapest tier that is safe for it. Returns (masked_text, tier):
+        - "none":  nothing that could be PII; returned unchanged.
+        - "regex": only phones/emails the precompiled patterns fully cover; replaced directly.
+        - "ner":   possible names, places or unrecognised numbers; full Presidio + spaCy analysis.
+        """
+        fast = self._fast_path(text)
+        if fast is not None:
+            return fast
+        return self.anonymize_full(text), "ner"
+
+    def anonymize_batch(self, texts: Iterable[str], batch_size: int = 64, n_process: int = 1) -> Iterator[str]:
+        """
+        Streams masked texts in input order. Texts that clear the regex tier never reach spaCy;
+        the rest go through a single nlp.pipe call (optionally over n_process worker processes,
+        started once). Input is consumed lazily: only the rows between two NER texts and the
+        texts spaCy has read ahead are held in memory.
+        """
+        iterator = iter(texts)
+        for first in iterator:
+            fast = self._fast_path(first)
+            if fast is None:
+                break
+            yield fast[0]
+        else:
+            # Nothing needs NER, so spaCy is neither loaded nor invoked.
+            return
+
+        # Masked text of every row read but not yet yielded, None while it waits for NER.
+        pending: Deque[Optional[str]] = deque([None])
+
+        def ner_texts() -> Iterator[str]:
+            yield first
+            for text in iterator:
+                fast = self._fast_path(text)
+                pending.append(None if fast is None else fast[0])
+                if fast is None:
+                    yield text
+
+        # Same as BatchAnalyzerEngine.analyze_iterator, but consumed lazily.
+        artifacts = self.analyzer.nlp_engine.process_batch(
+            texts=ner_texts(), language="en", batch_size=batch_size, n_process=n_process
+        )
+        for text, nlp_artifacts in artifacts:
+            while pending[0] is not None:
+                yield pending.popleft()
+            pending.popleft()
+            results = self.analyzer.analyze(
+                text=text, entities=ENTITIES, language="en", nlp_artifacts=nlp_artifacts
+            )
+            yield self._mask(text, results)
+
+        yield from pending
+
+    def _fast_path(self, text: str) -> Optional[Tuple[str, str]]:
+        """
+        (masked_text, tier) when the "none" or "regex" tier can handle the text, else None.
+        """
         if not text:
-            return text
+            return text, "none"
+
+        spans = self._regex_spans(text)
+        if self._needs_ner(text, spans):
+            return None
+        if not spans:
+            return text, "none"
+        return self._replace(text, spans), "regex"
 
+    def _regex_spans(self, text: str) -> List[Span]:
+        spans = [(m.start(), m.end(), "EMAIL_ADDRESS") for m in EMAIL_PATTERN.finditer(text)]
+        spans += [(m.start(), m.end(), "PHONE_NUMBER") for m in PHONE_PATTERN.finditer(text)]
+
+        # Like Presidio, keep the longer of two overlapping matches.
+        spans.sort(key=lambda s: (s[0], -(s[1] - s[0])))
+        resolved: List[Span] = []
+        for span in spans:
+            if not resolved or span[0] >= resolved[-1][1]:
+                resolved.append(span)
+        return resolved
+
+    def _needs_ner(self, text: str, spans: List[Span]) -> bool:
+        """
+        Cheap gate: only run NER if the text could contain a name, a place or a phone number
+        in a format the regex tier does not cover. Any word outside NON_ENTITY_WORDS counts,
+        lowercase ones included ("rahul sharma here"), so such text gets the full analysis.
+        """
+        # Blank out what the regex tier (and the ID pattern) already account for.
+        chars = list(text)
+        for start, end, _ in spans:
+            chars[start:end] = " " * (end - start)
+        for m in ID_PATTERN.finditer(text):
+            chars[m.start():m.end()] = " " * (m.end() - m.start())
+        remainder = "".join(chars)
+
+        if NAME_CUE_PATTERN.search(remainder):
+            return True
+        for m in DIGIT_RUN_PATTERN.finditer(remainder):
+            if sum(c.isdigit() for c in m.group(0)) >= 7:
+                return True
+        return any(w.lower() not in NON_ENTITY_WORDS for w in WORD_PATTERN.findall(remainder))
+
+    @staticmethod
+    def _replace(text: str, spans: List[Span]) -> str:
+        parts = []
+        last = 0
+        for start, end, entity in spans:
+            parts.append(text[last:start])
+            parts.append(f"<{entity}>")
+            last = end
+        parts.append(text[last:])
+        return "".join(parts)
+
+    def anonymize_full(self, text: str) -> str:
+        """
+        Full Presidio analysis (regex recognizers + spaCy NER) on a single text.
+        """
         results = self.analyzer.analyze(
             text=text,
-            entities=["PHONE_NUMBER", "EMAIL_ADDRESS", "PERSON", "LOCATION"],
+            entities=ENTITIES,
             language='en'
         )
-        
+        return self._mask(text, results)
+
+    def _mask(self, text: str, results) -> str:
         anonymized_result = self.anonymizer.anonymize(
             text=text,
             analyzer_results=results,
-            operators={
-                "DEFAULT": OperatorConfig("replace", {"new_value": "<SENSITIVE_DATA>"}),
-                "PHONE_NUMBER": OperatorConfig("replace", {"new_value": "<PHONE_NUMBER>"}),
-                "EMAIL_ADDRESS": OperatorConfig("replace", {"new_value": "<EMAIL_ADDRESS>"}),
-                "PERSON": OperatorConfig("replace", {"new_value": "<PERSON>"}),
-                "LOCATION": OperatorConfig("replace", {"new_value": "<LOCATION>"}),
-            }
+            operators=OPERATORS
         )
-        
+
         return anonymized_result.text
 
 if __name__ == "__main__":
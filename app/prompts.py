@@ -0,0 +1,176 @@
+"""
+Prompt template registry. Templates live in app/prompt_templates/ as <name>.v<version>.txt, are
+parsed once into literal/field parts, and are reloaded when their files change, so rendering a
+prompt per request touches no files and does no template parsing.
+"""
+import glob
+import os
+import re
+import string
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from app.chunking import estimate_tokens
+
+PROMPTS_DIR = os.path.join(os.path.dirname(__file__), "prompt_templates")
+TEMPLATE_FILE = re.compile(r"^(?P<name>[\w-]+)\.v(?P<version>\d+)\.txt$")
+FIELD = re.compile(r"^[A-Za-z_]\w*$")
+
+
+class RenderedPrompt(NamedTuple):
+    text: str
+    tokens: int
+    name: str
+    version: int
+
+
+class PromptTemplate:
+    """
+    A template compiled into alternating literal text and {field} names ("{{" / "}}" escape
+    braces as with str.format; only plain field names are supported).
+    """
+
+    def __init__(self, name: str, version: int, text: str, mtime: float = 0.0):
+        self.name = name
+        self.version = version
+        self.mtime = mtime
+        self.parts: List[Tuple[str, Optional[str]]] = []
+        for literal, field, spec, conversion in string.Formatter().parse(text):
+            if field is not None and (spec or conversion or not FIELD.match(field)):
+                raise ValueError(f"Unsupported placeholder {{{field}}} in prompt {name} v{version}")
+            self.parts.append((literal, field))
+        self.fields = {field for _, field in self.parts if field is not None}
+        # Tokens of the fixed text; a rendered prompt adds those of the field values.
+        self.static_tokens = estimate_tokens("".join(literal for literal, _ in self.parts))
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}.v{self.version}"
+
+    def render(self, **values: str) -> RenderedPrompt:
+        missing = self.fields - values.keys()
+        if missing:
+            raise KeyError(f"Prompt {self.key} is missing {', '.join(sorted(missing))}")
+        pieces = []
+        for literal, field in self.parts:
+            pieces.append(literal)
+            if field is not None:
+                pieces.append(str(values[field]))
+        text = "".join(pieces)
+        return RenderedPrompt(text, estimate_tokens(text), self.name, self.version)
+
+
+class PromptRegistry:
+    """
+    Loads every <name>.v<version>.txt under directory. get() returns the pinned version of a
+    template (pins, or the version argument) or its latest one.
+
+    Files are checked for changes at most every reload_interval seconds (0 disables hot reload);
+    a changed file is recompiled and swapped in atomically, and a template that fails to compile
+    keeps serving its previous version. Render sizes are recorded per template version so prompt
+    growth shows up in stats().
+    """
+
+    def __init__(self, directory: str = PROMPTS_DIR, reload_interval: float = 2.0,
+                 pins: Optional[Dict[str, int]] = None,
+                 defaults: Optional[Dict[str, str]] = None):
+        self.directory = directory
+        self.reload_interval = reload_interval
+        self.pins = dict(pins or {})
+        # Built-in version-0 templates, used when no file provides the name.
+        self.defaults = {name: PromptTemplate(name, 0, text) for name, text in (defaults or {}).items()}
+        self._templates: Dict[Tuple[str, int], PromptTemplate] = {}
+        self._latest: Dict[str, int] = {}
+        self._checked = 0.0
+        # path -> mtime of files that failed to compile, so they are reported once per change
+        self._failed: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        # template key -> [renders, total tokens, max tokens]
+        self._sizes: Dict[str, List[int]] = {}
+        self.reload()
+
+    def reload(self) -> bool:
+        """
+        Rescans the directory, recompiling new or modified files. Returns whether anything changed.
+        """
+        with self._lock:
+            self._checked = time.monotonic()
+            templates = {}
+            for path in glob.glob(os.path.join(self.directory, "*.txt")):
+                match = TEMPLATE_FILE.match(os.path.basename(path))
+                if not match:
+                    continue
+                key = (match.group("name"), int(match.group("version")))
+                try:
+                    mtime = os.path.getmtime(path)
+                except OSError:
+                    continue
+                current = self._templates.get(key)
+                if current is not None and current.mtime == mtime:
+                    templates[key] = current
+                    continue
+                if self._failed.get(path) != mtime:
+                    try:
+                        with open(path, "r") as f:
+                            templates[key] = PromptTemplate(key[0], key[1], f.read(), mtime)
+                        self._failed.pop(path, None)
+                        continue
+                    except (OSError, ValueError) as e:
+                        print(f"Error loading prompt {path}: {e}")
+                        self._failed[path] = mtime
+                if current is not None:
+                    templates[key] = current
+
+            changed = templates.keys() != self._templates.keys() or any(
+                templates[key] is not self._templates[key] for key in templates)
+            if changed:
+                latest = {}
+                for name, version in templates:
+                    latest[name] = max(version, latest.get(name, version))
+                self._templates, self._latest = templates, latest
+            return changed
+
+    def _maybe_reload(self) -> None:
+        if self.reload_interval > 0 and time.monotonic() - self._checked >= self.reload_interval:
+            self.reload()
+
+    def get(self, name: str, version: Optional[int] = None) -> PromptTemplate:
+        self._maybe_reload()
+        version = version if version is not None else self.pins.get(name, self._latest.get(name))
+        template = self._templates.get((name, version))
+        if template is None:
+            template = self.defaults.get(name) if name not in self._latest else None
+        if template is None:
+            raise KeyError(f"Unknown prompt {name}" + (f" v{version}" if version is not None else ""))
+        return template
+
+    def render(self, name: str, version: Optional[int] = None, **values: str) -> RenderedPrompt:
+        rendered = self.get(name, version).render(**values)
+        with self._lock:
+            sizes = self._sizes.setdefault(f"{rendered.name}.v{rendered.version}", [0, 0, 0])
+            sizes[0] += 1
+            sizes[1] += rendered.tokens
+            sizes[2] = max(sizes[2], rendered.tokens)
+        return rendered
+
+    def versions(self, name: str) -> List[int]:
+        return sorted(version for key_name, version in self._templates if key_name == name)
+
+    def stats(self) -> Dict[str, Dict]:
+        """
+        Per template version: static tokens, and renders with their mean / max token counts.
+        """
+        with self._lock:
+            sizes = {key: list(values) for key, values in self._sizes.items()}
+            templates = list(self._templates.values()) + list(self.defaults.values())
+        stats = {}
+        for template in templates:
+            renders, total, largest = sizes.get(template.key, [0, 0, 0])
+            stats[template.key] = {
+                "static_tokens": template.static_tokens,
+                "renders": renders,
+                "mean_tokens": total / renders if renders else 0.0,
+                "max_tokens": largest,
+            }
+        return stats
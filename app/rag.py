@@ -1,88 +1,529 @@
+import atexit
+import contextlib
+import glob
+import hashlib
+import json
 import os
-from typing import List
+import queue
+import threading
+import uuid
+from typing import Dict, Iterator, List, Optional, Tuple
 from qdrant_client import QdrantClient
 from qdrant_client.http import models
 from fastembed import TextEmbedding
-from pypdf import PdfReader
+
+from app.cache import LRUCache, normalize_query
+from app.chunking import make_chunker
+from app.extract import iter_page_texts
+from app.metrics import SPAN_SECONDS
+from app.router import parse_price_list
+from app.sparse import BM25Encoder, weighted_rrf_scores
+
+# Point IDs are UUIDs derived from (source, chunk hash), so the same chunk always maps to the same point.
+POINT_NAMESPACE = uuid.UUID("6f1d8f3e-2b7a-4c1e-9a57-0c3d2e8b9f10")
+
+# The dense embedding is the collection's unnamed default vector; BM25 is a named sparse vector.
+DENSE_VECTOR = ""
+SPARSE_VECTOR = "bm25"
+
+# On a Qdrant server the ingestion manifest is the payload of this point in a vectorless
+# "<collection>_manifest" collection, so every host sees the same record.
+MANIFEST_POINT = str(uuid.uuid5(POINT_NAMESPACE, "manifest"))
+
+
+def quantization_config(kind: str) -> Optional[models.QuantizationConfig]:
+    """
+    "scalar" (int8, 4x smaller) or "binary" (1 bit per dimension, 32x smaller) quantized copies
+    of the vectors, kept in RAM for the HNSW search while the originals may live on disk.
+    """
+    if kind == "scalar":
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    if kind == "binary":
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+    if kind in ("", "none"):
+        return None
+    raise ValueError(f"Unknown quantization: {kind}")
+
+
+def search_params(quantization: str, hnsw_ef: Optional[int], oversampling: float) -> models.SearchParams:
+    """
+    Query-time settings: hnsw_ef trades latency for recall; with quantization, oversampling x limit
+    candidates are found on the quantized vectors and rescored with the originals.
+    """
+    quantized = None
+    if quantization not in ("", "none"):
+        quantized = models.QuantizationSearchParams(rescore=True, oversampling=oversampling)
+    return models.SearchParams(hnsw_ef=hnsw_ef, quantization=quantized)
+
+
+def create_vector_collection(client: QdrantClient, name: str, quantization: str = "none", on_disk: bool = False,
+                             m: int = 16, ef_construct: int = 100) -> None:
+    client.create_collection(
+        collection_name=name,
+        vectors_config=models.VectorParams(size=384, distance=models.Distance.COSINE, on_disk=on_disk),
+        sparse_vectors_config={SPARSE_VECTOR: models.SparseVectorParams(modifier=models.Modifier.IDF)},
+        hnsw_config=models.HnswConfigDiff(m=m, ef_construct=ef_construct),
+        quantization_config=quantization_config(quantization),
+    )
+
+
+def point_id(source: str, chunk_hash: str) -> str:
+    return str(uuid.uuid5(POINT_NAMESPACE, f"{source}\0{chunk_hash}"))
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
 
 class RAGManager:
-    def __init__(self, collection_name="store_policies"):
-        self.client = QdrantClient(path="qdrant_data")
+    def __init__(self, collection_name="store_policies", cache_size=None, cache_ttl=None, cache_dir=None):
+        self.data_path = os.getenv("QDRANT_PATH", "qdrant_data")
+        # QDRANT_URL switches from the embedded store (exact search only) to a Qdrant server, where
+        # the HNSW, quantization and on-disk settings below take effect.
+        url = os.getenv("QDRANT_URL")
+        self.remote = bool(url)
+        if url:
+            os.makedirs(self.data_path, exist_ok=True)
+            self.client = QdrantClient(url=url, api_key=os.getenv("QDRANT_API_KEY"))
+        else:
+            self.client = QdrantClient(path=self.data_path)
         self.collection_name = collection_name
-        self.embedding_model = TextEmbedding()
+        # EMBED_THREADS caps the ONNX intra-op pool; app.serve sets it to 1 so the session stays fork-safe.
+        threads = os.getenv("EMBED_THREADS")
+        self.embedding_model = TextEmbedding(threads=int(threads) if threads else None)
+
+        # Ingestion pipeline: page extraction processes, chunks per embedding call, and how many
+        # embedded batches may wait for Qdrant before embedding pauses.
+        self.ingest_workers = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))
+        self.ingest_batch_size = int(os.getenv("INGEST_BATCH_SIZE", "256"))
+        self.ingest_upsert_queue = int(os.getenv("INGEST_UPSERT_QUEUE", "4"))
+        self.chunker = make_chunker()
+
+        # Support traffic is repetitive, so both the query embedding and the top-k hits are
+        # cached on the normalized masked query. RAG_CACHE_DIR enables persistence across restarts.
+        cache_size = int(cache_size if cache_size is not None else os.getenv("RAG_CACHE_SIZE", "2048"))
+        cache_ttl = cache_ttl if cache_ttl is not None else os.getenv("RAG_CACHE_TTL")
+        cache_ttl = float(cache_ttl) if cache_ttl else None
+        self.embedding_cache = LRUCache(maxsize=cache_size, ttl=cache_ttl)
+        self.result_cache = LRUCache(maxsize=cache_size, ttl=cache_ttl)
+
+        self.cache_dir = cache_dir or os.getenv("RAG_CACHE_DIR")
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self.embedding_cache.load(os.path.join(self.cache_dir, "query_embeddings.pkl"))
+            atexit.register(self.save_cache)
         
+        # Retrieval: "dense" (embeddings only), "sparse" (BM25 only) or "hybrid" (both, fused by
+        # weighted RRF over each leg's top candidates).
+        self.bm25 = BM25Encoder()
+        self.retrieval_mode = os.getenv("RAG_RETRIEVAL", "hybrid")
+        self.dense_weight = float(os.getenv("RAG_DENSE_WEIGHT", "1.0"))
+        self.sparse_weight = float(os.getenv("RAG_SPARSE_WEIGHT", "1.0"))
+        self.candidates = int(os.getenv("RAG_CANDIDATES", "20"))
+        self.top_k = int(os.getenv("RAG_TOP_K", "5"))
+
+        # Vector storage and index: RAG_QUANTIZATION=none|scalar|binary, RAG_ON_DISK=1 keeps the
+        # full-precision vectors on disk, RAG_HNSW_M / RAG_HNSW_EF_CONSTRUCT shape the graph and
+        # RAG_HNSW_EF sets the search beam (unset: the server default).
+        self.quantization = os.getenv("RAG_QUANTIZATION", "none")
+        self.on_disk = os.getenv("RAG_ON_DISK", "0") == "1"
+        self.hnsw_m = int(os.getenv("RAG_HNSW_M", "16"))
+        self.hnsw_ef_construct = int(os.getenv("RAG_HNSW_EF_CONSTRUCT", "100"))
+        hnsw_ef = os.getenv("RAG_HNSW_EF")
+        self.search_params = search_params(
+            self.quantization, int(hnsw_ef) if hnsw_ef else None, float(os.getenv("RAG_OVERSAMPLING", "2.0"))
+        ) if self.remote else None
+
+        # A shared server collection is never dropped automatically: other hosts may be serving it.
+        self.sparse = True
         if not self.client.collection_exists(self.collection_name):
-            self.client.create_collection(
-                collection_name=self.collection_name,
-                vectors_config=models.VectorParams(size=384, distance=models.Distance.COSINE)
-            )
+            self._create_collection()
+        elif SPARSE_VECTOR not in (self.client.get_collection(self.collection_name).config.params.sparse_vectors or {}):
+            if self.remote:
+                print(f"Collection {self.collection_name} has no BM25 index; using dense retrieval only. "
+                      "Delete the collection to rebuild it with one.")
+                self.sparse = False
+                self.retrieval_mode = "dense"
+            else:
+                print("Collection has no BM25 index; rebuilding it.")
+                self.client.delete_collection(self.collection_name)
+                self._create_collection()
+        if self.remote:
+            self._sync_index_config()
+
+        self.manifest_path = os.path.join(self.data_path, f"{self.collection_name}_manifest.json")
+        self.manifest_collection = f"{self.collection_name}_manifest"
+        self.manifest = self._load_manifest()
+        # Hits depend on the settings above and the indexed points, so they are loaded only now.
+        if self.cache_dir:
+            self.result_cache.load(self._result_cache_path())
+
+    def _create_collection(self):
+        create_vector_collection(
+            self.client,
+            self.collection_name,
+            quantization=self.quantization,
+            on_disk=self.on_disk,
+            m=self.hnsw_m,
+            ef_construct=self.hnsw_ef_construct,
+        )
 
-    def ingest_pdf(self, pdf_path: str):
+    def _sync_index_config(self):
+        """
+        Applies changed HNSW / quantization / on-disk settings to an existing server collection;
+        Qdrant rebuilds the index in the background. Does nothing when they already match.
+        """
+        config = self.client.get_collection(self.collection_name).config
+        wanted = quantization_config(self.quantization)
+        if ((config.hnsw_config.m, config.hnsw_config.ef_construct) == (self.hnsw_m, self.hnsw_ef_construct)
+                and type(config.quantization_config) is type(wanted)
+                and bool(config.params.vectors.on_disk) == self.on_disk):
+            return
+        print("Vector index settings changed; updating the collection.")
+        self.client.update_collection(
+            collection_name=self.collection_name,
+            vectors_config={DENSE_VECTOR: models.VectorParamsDiff(on_disk=self.on_disk)},
+            hnsw_config=models.HnswConfigDiff(m=self.hnsw_m, ef_construct=self.hnsw_ef_construct),
+            quantization_config=wanted or models.Disabled.DISABLED,
+        )
+
+    def ingest(self, path: str) -> int:
+        """
+        Ingests a single PDF or every PDF under a directory. Returns the number of chunks indexed.
+        """
+        if os.path.isdir(path):
+            return self.ingest_directory(path)
+        return self.ingest_pdf(path)
+
+    def ingest_directory(self, directory: str, pattern: str = "*.pdf") -> int:
+        """
+        Incrementally ingests every matching document under directory (recursively) and drops
+        the points of documents that were previously indexed from it but no longer exist.
+        """
+        paths = sorted(glob.glob(os.path.join(directory, "**", pattern), recursive=True))
+        total = sum(self.ingest_pdf(path) for path in paths)
+
+        root = self._source_key(directory) + os.sep
+        current = {self._source_key(path) for path in paths}
+        for source in [s for s in self.manifest["sources"] if s.startswith(root) and s not in current]:
+            print(f"Removing {source} from the index.")
+            self._delete_points(self.manifest["sources"].pop(source)["points"])
+            self._save_manifest()
+            self.result_cache.clear()
+        return total
+
+    def ingest_pdf(self, pdf_path: str) -> int:
         """
         Reads a PDF, chunks the text, embeds it, and stores it in Qdrant.
+
+        Ingestion is incremental: every chunk gets a point ID derived from its source and content
+        hash, so re-ingesting a changed document embeds and upserts only new chunks and deletes
+        the ones that disappeared. Unchanged documents (per the manifest) are skipped entirely.
         """
         if not os.path.exists(pdf_path):
             raise FileNotFoundError(f"PDF not found at {pdf_path}")
-            
-        count_result = self.client.count(collection_name=self.collection_name)
-        if count_result.count > 0:
-            print("Data already exists in Qdrant. Skipping ingestion.")
-            return count_result.count
-
-        print("Ingesting PDF...")
-        reader = PdfReader(pdf_path)
-        text_chunks = []
-        
-        window_size = 20
-        overlap = 5
-        
-        for page in reader.pages:
-            text = page.extract_text()
-            if text:
-                lines = [line.strip() for line in text.split('\n') if line.strip()]
-                
-                if not lines:
+
+        source = self._source_key(pdf_path)
+        stat = os.stat(pdf_path)
+        entry = self.manifest["sources"].get(source)
+        # With different chunker settings every chunk is re-derived, even from an unchanged file,
+        # as is an entry from before price lists were kept in the manifest.
+        same_chunker = entry is not None and entry.get("chunker") == self.chunker.config and "prices" in entry
+        if same_chunker and (entry["size"], entry["mtime"]) == (stat.st_size, stat.st_mtime):
+            print(f"{source} is unchanged. Skipping ingestion.")
+            return len(entry["points"])
+
+        digest = file_sha256(pdf_path)
+        if same_chunker and entry["sha256"] == digest:
+            entry.update(size=stat.st_size, mtime=stat.st_mtime)
+            self._save_manifest()
+            print(f"{source} is unchanged. Skipping ingestion.")
+            return len(entry["points"])
+
+        print(f"Ingesting {source}...")
+        previous = set(entry["points"]) if entry else set()
+        seen = {}
+        prices = {}
+        added = 0
+        batch = []
+        with self._upsert_writer() as write:
+            for chunk in self._chunk_pdf(pdf_path):
+                prices.update(parse_price_list([chunk]))
+                chunk_hash = hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+                pid = point_id(source, chunk_hash)
+                if pid in seen:
                     continue
-                    
-                for i in range(0, len(lines), window_size - overlap):
-                    chunk_lines = lines[i:i + window_size]
-                    chunk_text = "\n".join(chunk_lines)
-                    text_chunks.append(chunk_text)
-        
-        if not text_chunks:
-            return 0
+                seen[pid] = None
+                if pid in previous:
+                    continue
+                batch.append((pid, chunk, chunk_hash))
+                if len(batch) >= self.ingest_batch_size:
+                    write(self._embed_points(batch, source))
+                    added += len(batch)
+                    batch = []
+            if batch:
+                write(self._embed_points(batch, source))
+                added += len(batch)
 
-        embeddings = list(self.embedding_model.embed(text_chunks))
-        
-        points = [
+        removed = [pid for pid in previous if pid not in seen]
+        self._delete_points(removed)
+        if added or removed:
+            self.result_cache.clear()
+
+        self.manifest["sources"][source] = {
+            "sha256": digest,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "chunker": self.chunker.config,
+            "points": list(seen),
+            "prices": prices,
+        }
+        self._save_manifest()
+        print(f"{source}: {added} chunks embedded, {len(removed)} removed, {len(seen) - added} unchanged.")
+
+        return len(seen)
+
+    def price_list(self) -> Dict[str, Dict[str, int]]:
+        """
+        Quick-reference prices found in the indexed documents, as parsed during ingestion.
+        """
+        prices = {}
+        for source in sorted(self.manifest["sources"]):
+            prices.update(self.manifest["sources"][source].get("prices", {}))
+        return prices
+
+    def _chunk_pdf(self, pdf_path: str) -> Iterator[str]:
+        pages = iter_page_texts(pdf_path, workers=self.ingest_workers, mode=self.chunker.extraction_mode)
+        return self.chunker.chunk(pages)
+
+    def _embed_points(self, batch: List[Tuple[str, str, str]], source: str) -> List[models.PointStruct]:
+        embeddings = self.embedding_model.embed([chunk for _, chunk, _ in batch], batch_size=len(batch))
+        return [
             models.PointStruct(
-                id=idx,
-                vector=embedding.tolist(),
-                payload={"text": chunk}
+                id=pid,
+                vector={DENSE_VECTOR: embedding.tolist(), SPARSE_VECTOR: self.bm25.encode_document(chunk)}
+                if self.sparse else {DENSE_VECTOR: embedding.tolist()},
+                payload={"text": chunk, "source": source, "chunk_hash": chunk_hash}
             )
-            for idx, (chunk, embedding) in enumerate(zip(text_chunks, embeddings))
+            for (pid, chunk, chunk_hash), embedding in zip(batch, embeddings)
         ]
-        
-        self.client.upsert(
-            collection_name=self.collection_name,
-            points=points
-        )
-        
-        return len(points)
 
-    def search(self, query: str, limit: int = 5) -> List[str]:
+    @contextlib.contextmanager
+    def _upsert_writer(self):
+        """
+        Yields write(points), which hands a batch to a background upsert thread so the next batch
+        can be embedded meanwhile. At most ingest_upsert_queue batches wait; beyond that write()
+        blocks, so embedding never runs far ahead of Qdrant.
+        """
+        batches = queue.Queue(maxsize=self.ingest_upsert_queue)
+        errors = []
+
+        def run():
+            while True:
+                points = batches.get()
+                if points is None:
+                    return
+                if errors:
+                    continue
+                try:
+                    self.client.upsert(collection_name=self.collection_name, points=points)
+                except Exception as e:
+                    errors.append(e)
+
+        thread = threading.Thread(target=run, name="qdrant-upsert", daemon=True)
+        thread.start()
+
+        def write(points):
+            if errors:
+                raise errors[0]
+            batches.put(points)
+
+        try:
+            yield write
+        finally:
+            batches.put(None)
+            thread.join()
+        if errors:
+            raise errors[0]
+
+    def _delete_points(self, ids: List[str]) -> None:
+        if ids:
+            self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=models.PointIdsList(points=ids)
+            )
+        self.result_cache.clear()
+
+    @staticmethod
+    def _source_key(path: str) -> str:
+        return os.path.relpath(os.path.abspath(path))
+
+    def _load_manifest(self) -> dict:
+        """
+        The record of indexed documents (content hash and point IDs per source): a local file for
+        the embedded store, a point in the manifest collection on a server. Points in a local
+        collection without a manifest predate incremental ingestion, so they are dropped once;
+        a server collection is left alone and re-ingestion upserts over it.
+        """
+        manifest = {"collection": self.collection_name, "sources": {}}
+        if self.remote:
+            try:
+                if self.client.collection_exists(self.manifest_collection):
+                    points = self.client.retrieve(self.manifest_collection, ids=[MANIFEST_POINT])
+                    if points:
+                        manifest = json.loads(points[0].payload["manifest"])
+            except (KeyError, ValueError) as e:
+                print(f"Error loading manifest from {self.manifest_collection}: {e}")
+        elif os.path.exists(self.manifest_path):
+            try:
+                with open(self.manifest_path) as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Error loading manifest from {self.manifest_path}: {e}")
+
+        count = self.client.count(collection_name=self.collection_name).count
+        if not manifest["sources"] and count and self.remote:
+            print(f"Collection {self.collection_name} has no ingestion manifest; keeping its points. "
+                  "Chunks that no longer exist in any document stay until the collection is deleted.")
+        elif not manifest["sources"] and count:
+            print("Collection has no ingestion manifest; rebuilding it.")
+            self.client.delete_collection(self.collection_name)
+            self._create_collection()
+        elif manifest["sources"] and not count:
+            # The collection was wiped or rebuilt; everything has to be ingested again.
+            manifest["sources"] = {}
+        return manifest
+
+    def _save_manifest(self) -> None:
+        if self.remote:
+            if not self.client.collection_exists(self.manifest_collection):
+                self.client.create_collection(self.manifest_collection, vectors_config={})
+            self.client.upsert(self.manifest_collection, points=[
+                models.PointStruct(id=MANIFEST_POINT, vector={}, payload={"manifest": json.dumps(self.manifest)})
+            ])
+            return
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f, indent=1)
+        os.replace(tmp_path, self.manifest_path)
+
+    def embed_query(self, query: str):
+        """
+        Returns the embedding for a query, reusing cached embeddings for repeated questions.
+        """
+        key = normalize_query(query)
+        embedding = self.embedding_cache.get(key)
+        if embedding is None:
+            with SPAN_SECONDS.time("embedding"):
+                embedding = list(self.embedding_model.embed([query]))[0]
+            self.embedding_cache.put(key, embedding)
+        return embedding
+
+    def search(self, query: str, limit: Optional[int] = None, mode: Optional[str] = None) -> List[str]:
         """
         Searches for relevant context based on the query.
         """
-        query_embedding = list(self.embedding_model.embed([query]))[0]
-        
-        results = self.client.query_points(
-            collection_name=self.collection_name,
-            query=query_embedding.tolist(),
-            limit=limit
-        ).points
+        return [text for text, _ in self.search_scored(query, limit, mode)]
+
+    def search_scored(self, query: str, limit: Optional[int] = None,
+                      mode: Optional[str] = None) -> List[Tuple[str, float]]:
+        """
+        search() with each chunk's retrieval score, best first: cosine similarity (dense), BM25
+        (sparse) or the fused RRF score (hybrid). Scores only compare within one result list.
+        """
+        limit = limit or self.top_k
+        mode = mode or self.retrieval_mode
+        key = (normalize_query(query), limit, mode)
+        cached = self.result_cache.get(key)
+        if cached is not None:
+            return list(cached)
+
+        if mode == "dense":
+            hits = [(hit.payload["text"], hit.score) for hit in self._dense_hits(query, limit)]
+        elif mode == "sparse":
+            hits = [(hit.payload["text"], hit.score) for hit in self._sparse_hits(query, limit)]
+        elif mode == "hybrid":
+            candidates = max(self.candidates, limit)
+            dense = self._dense_hits(query, candidates)
+            sparse = self._sparse_hits(query, candidates)
+            by_id = {hit.id: hit.payload["text"] for hit in dense + sparse}
+            fused = weighted_rrf_scores(
+                [[hit.id for hit in dense], [hit.id for hit in sparse]],
+                [self.dense_weight, self.sparse_weight],
+                limit=limit,
+            )
+            hits = [(by_id[pid], score) for pid, score in fused]
+        else:
+            raise ValueError(f"Unknown retrieval mode: {mode}")
+
+        self.result_cache.put(key, tuple(hits))
+        return hits
+
+    def _dense_hits(self, query: str, limit: int) -> List[models.ScoredPoint]:
+        query_embedding = self.embed_query(query)
         
-        return [hit.payload["text"] for hit in results]
+        with SPAN_SECONDS.time("qdrant"):
+            return self.client.query_points(
+                collection_name=self.collection_name,
+                query=query_embedding.tolist(),
+                search_params=self.search_params,
+                limit=limit
+            ).points
+
+    def _sparse_hits(self, query: str, limit: int) -> List[models.ScoredPoint]:
+        query_vector = self.bm25.encode_query(query)
+        if not query_vector.indices:
+            return []
+        with SPAN_SECONDS.time("qdrant"):
+            return self.client.query_points(
+                collection_name=self.collection_name,
+                query=query_vector,
+                using=SPARSE_VECTOR,
+                limit=limit
+            ).points
+
+    def cache_stats(self) -> dict:
+        return {"embeddings": self.embedding_cache.stats(), "results": self.result_cache.stats()}
+
+    def _result_cache_path(self) -> str:
+        """
+        The hits file for the current retrieval settings and indexed points: after a settings
+        change or a re-ingest, hits cached before it are never loaded.
+        """
+        signature = json.dumps({
+            "collection": self.collection_name,
+            "weights": [self.dense_weight, self.sparse_weight],
+            "candidates": self.candidates,
+            "sparse": self.sparse,
+            "quantization": self.quantization,
+            "search_params": str(self.search_params),
+            "sources": {source: [entry.get("chunker"), sorted(entry["points"])]
+                        for source, entry in self.manifest["sources"].items()},
+        }, sort_keys=True)
+        digest = hashlib.sha256(signature.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"query_hits_{digest}.pkl")
+
+    def save_cache(self):
+        """
+        Persists the query caches to RAG_CACHE_DIR, if configured, merged with what other
+        processes (app.serve workers) saved there, and drops hits files for older indexes.
+        """
+        if not self.cache_dir:
+            return
+        try:
+            self.embedding_cache.save(os.path.join(self.cache_dir, "query_embeddings.pkl"), merge=True)
+            path = self._result_cache_path()
+            self.result_cache.save(path, merge=True)
+            for stale in glob.glob(os.path.join(self.cache_dir, "query_hits*.pkl")):
+                if stale != path:
+                    os.remove(stale)
+        except Exception as e:
+            print(f"Error saving RAG cache: {e}")
 
 if __name__ == "__main__":
     rag = RAGManager()
@@ -90,7 +531,7 @@ if __name__ == "__main__":
     if not os.path.exists("data/store_policies.pdf"):
         print("PDF not found, skipping ingestion test.")
     else:
-        count = rag.ingest_pdf("data/store_policies.pdf")
+        count = rag.ingest("data/store_policies.pdf")
         print(f"Ingested {count} chunks.")
         
         query = "What is the return policy?"
@@ -99,3 +540,6 @@ if __name__ == "__main__":
         print("Results:")
         for res in results:
             print(f"- {res}")
+
+        rag.search(query)
+        print(f"Cache: {rag.cache_stats()}")
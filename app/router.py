@@ -0,0 +1,233 @@
+"""
+Intent routing: answers price, stock and opening-hours questions straight from structured data
+(the manual's quick-reference price list and stores.json) with templated replies, so only
+open-ended queries go through retrieval and the LLM.
+"""
+import glob
+import os
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from app.context import ContextManager
+from app.extract import iter_page_texts
+from app.text_index import tokenize
+
+# "Masala Chai: Small Rs.85 | Medium Rs.125 | Large Rs.165 | 263 kcal" (section 7 of the manual).
+PRICE_LINE = re.compile(
+    r"^(?P<item>[A-Z][\w'&. -]*?):\s*Small Rs\.\s*(?P<small>\d+)\s*\|\s*Medium Rs\.\s*(?P<medium>\d+)"
+    r"\s*\|\s*Large Rs\.\s*(?P<large>\d+)",
+    re.MULTILINE,
+)
+SIZES = ("small", "medium", "large")
+SIZE = re.compile(r"\b(small|medium|large)\b", re.IGNORECASE)
+
+INTENTS = {
+    "price": re.compile(r"\b(how much|price|prices|priced|cost|costs|rate|rupees)\b", re.IGNORECASE),
+    "stock": re.compile(r"\b(in stock|out of stock|sold out|available|availability|do you have|have any)\b",
+                        re.IGNORECASE),
+    "hours": re.compile(r"\b(what time|when do you|opens?|opening|close|closes|closing|hours|timings?)\b",
+                        re.IGNORECASE),
+}
+# Anything that asks for judgement, policy or a specific day (holiday hours live in the manual,
+# not in stores.json) is left to the LLM, as are prices that depend on more than item and size:
+# milk and sweetener variants, coupons ("CHAI23"), discounts and member pricing.
+OPEN_ENDED = re.compile(
+    r"\b(why|should|recommend|suggest|best|refund|cancel|complain\w*|policy|policies|deliver\w*|"
+    r"holiday\w*|festival\w*|diwali|holi|christmas|eid|dussehra|(?!today\b)\w+day|"
+    r"milk|oat|almond|soy|jaggery|sugar\w*|stevia|sweet\w*|variants?|extra|add-?ons?|"
+    r"coupons?|codes?|promo\w*|discount\w*|offers?|deals?|members?|membership|loyalty|points|[a-z]+\d+)\b",
+    re.IGNORECASE,
+)
+MAX_WORDS = 20
+
+# Location cues: "in/at/near <place>" and "<place> store/branch/outlet". A query with one that
+# does not resolve to a store is about a place the router does not know, not the nearest store.
+AT_PLACE = re.compile(r"\b(?:in|at|near|around)\s+(?:the\s+|your\s+|my\s+)?([a-z][\w'-]*)", re.IGNORECASE)
+PLACE_STORE = re.compile(r"\b([a-z][\w'-]*)\s+(?:store|branch|outlet|shop|cafe|location)s?\b", re.IGNORECASE)
+WORD = re.compile(r"[A-Za-z][\w'-]*")
+# Words that follow "in/at" or precede "store" without naming a place.
+NON_PLACES = {
+    "a", "an", "the", "your", "my", "our", "this", "that", "any", "every", "all", "one", "stock", "store",
+    "stores", "branch", "outlet", "shop", "cafe", "nearest", "closest", "nearby", "local", "same", "other",
+    "moment", "morning", "afternoon", "evening", "night", "today", "tonight", "tomorrow", "time", "least",
+    "once", "advance", "total", "general", "i", "i'm", "hi", "hello", "hey", "please", "thanks", "is", "are",
+    "do", "does", "what", "when", "how", "can", "will", "you", "me", "us", "here", "small", "medium", "large",
+}
+
+
+def detect_intents(query: str) -> List[str]:
+    """
+    The structured intents ("price", "stock", "hours") a query mentions, in INTENTS order.
+    """
+    return [name for name, pattern in INTENTS.items() if pattern.search(query)]
+
+
+class Route(NamedTuple):
+    intent: str
+    response: str
+
+
+def parse_price_list(pages: Iterable[str]) -> Dict[str, Dict[str, int]]:
+    """
+    Item -> {"small", "medium", "large"} prices from the quick-reference price list lines.
+    """
+    prices = {}
+    for text in pages:
+        for match in PRICE_LINE.finditer(text):
+            prices[match.group("item").strip()] = {size: int(match.group(size)) for size in SIZES}
+    return prices
+
+
+def load_price_list(path: str) -> Dict[str, Dict[str, int]]:
+    """
+    Price list read straight from a PDF, or from every PDF under a directory (recursively, as
+    RAGManager.ingest_directory does), for offline use; the agent takes RAGManager.price_list().
+    """
+    paths = sorted(glob.glob(os.path.join(path, "**", "*.pdf"), recursive=True)) if os.path.isdir(path) else [path]
+    prices = {}
+    for pdf_path in paths:
+        prices.update(parse_price_list(iter_page_texts(pdf_path, workers=1)))
+    return prices
+
+
+class IntentRouter:
+    """
+    Resolves a query to exactly one of the "price", "stock" or "hours" intents and answers it
+    from the indexed data. Returns None (fall back to the LLM) for anything else: no or several
+    intents, open-ended wording, long queries, or items/stores it cannot resolve.
+    """
+
+    def __init__(self, context: ContextManager, prices: Dict[str, Dict[str, int]]):
+        self.context = context
+        self.prices = prices
+        self._vocabulary_version = None
+        self._refresh()
+
+    def _refresh(self) -> None:
+        """
+        Rebuilds the item and place vocabularies when a catalogue update may have changed them
+        (stores added, removed or moved, or stock items added or dropped), not on stock flips.
+        """
+        catalog = self.context.catalog
+        if catalog.vocabulary_version == self._vocabulary_version:
+            return
+        stores = catalog.live_stores()
+        names = set(self.prices) | {item for store in stores for item in store.get("stock", {})}
+        self.items = {name.lower(): name for name in names}
+        # Longest names first, so "Lemon Iced Tea" wins over "Lemon Tea" / "Iced Tea".
+        alternatives = "|".join(re.escape(name) for name in sorted(self.items, key=len, reverse=True))
+        self.item_pattern = re.compile(rf"\b({alternatives})s?\b", re.IGNORECASE) if alternatives else None
+        # Name/address tokens that tell stores apart ("velvet", "india" are in every store's).
+        self.place_tokens = {token for token, postings in catalog.text_index.tokens.items()
+                             if len(postings) < len(stores)}
+        # Words that are not an unknown place: item names, store name/address tokens and NON_PLACES.
+        self.vocabulary = ({word for name in self.items for word in tokenize(name)}
+                           | set(catalog.text_index.tokens) | NON_PLACES)
+        self._vocabulary_version = catalog.vocabulary_version
+
+    def route(self, query: str, lat: float, lon: float) -> Optional[Route]:
+        if len(query.split()) > MAX_WORDS or OPEN_ENDED.search(query):
+            return None
+        intents = detect_intents(query)
+        if len(intents) != 1:
+            return None
+
+        self._refresh()
+        intent = intents[0]
+        response = getattr(self, f"_{intent}")(query, lat, lon)
+        return Route(intent, response) if response else None
+
+    def _find_items(self, query: str) -> List[str]:
+        if not self.item_pattern:
+            return []
+        found = []
+        for match in self.item_pattern.finditer(query):
+            # .get: a concurrent _refresh may have swapped items but not yet item_pattern.
+            item = self.items.get(match.group(1).lower())
+            if item and item not in found:
+                found.append(item)
+        return found
+
+    def _location_cue(self, query: str) -> bool:
+        """
+        Whether the query points at some place: "in/at <X>", "<X> store/branch/outlet", or a
+        capitalized word (other than the first) that is neither an item nor a store word.
+        """
+        vocabulary = self.vocabulary
+        for pattern in (AT_PLACE, PLACE_STORE):
+            if any(match.group(1).lower() not in vocabulary for match in pattern.finditer(query)):
+                return True
+        words = WORD.findall(query)[1:]
+        return any(word[0].isupper() and word.lower() not in vocabulary for word in words)
+
+    def _store(self, query: str, lat: float, lon: float) -> Optional[Dict]:
+        """
+        The store named in the query, else the nearest one when the query names no place at
+        all. None when it mentions a place that does not pin down exactly one store (e.g.
+        "Mumbai", just "Bandra", or "Jaipur" where there is no store).
+        """
+        named = self.context.find_stores_by_text(query)
+        if named:
+            return named[0] if len(named) == 1 else None
+        if any(token in self.place_tokens for token in tokenize(query)) or self._location_cue(query):
+            return None
+        store, dist_km = self.context.get_nearest_store(lat, lon)
+        return self.context.select_store(store, dist_km)[0]
+
+    def _sized_items(self, query: str) -> Optional[List[Tuple[str, Optional[str]]]]:
+        """
+        (item, size) pairs in query order, each item taking the size word between it and the
+        previous item ("a Medium Masala Chai and a Large Latte"). None when a size cannot be
+        paired: several before one item, or one after the last item.
+        """
+        if not self.item_pattern:
+            return []
+        pairs = []
+        last = 0
+        for match in self.item_pattern.finditer(query):
+            sizes = SIZE.findall(query, last, match.start())
+            if len(sizes) > 1:
+                return None
+            last = match.end()
+            item = self.items.get(match.group(1).lower())
+            pair = (item, sizes[0].lower() if sizes else None)
+            if item and pair not in pairs:
+                pairs.append(pair)
+        if SIZE.search(query, last):
+            return None
+        return pairs
+
+    def _price(self, query: str, lat: float, lon: float) -> Optional[str]:
+        pairs = self._sized_items(query)
+        if not pairs or any(item not in self.prices for item, _ in pairs):
+            return None
+        lines = []
+        for item, size in pairs:
+            prices = self.prices[item]
+            if size:
+                lines.append(f"A {size.capitalize()} {item} is Rs.{prices[size]}.")
+            else:
+                lines.append(f"{item}: Small Rs.{prices['small']}, Medium Rs.{prices['medium']}, "
+                             f"Large Rs.{prices['large']}.")
+        return " ".join(lines)
+
+    def _stock(self, query: str, lat: float, lon: float) -> Optional[str]:
+        items = self._find_items(query)
+        store = self._store(query, lat, lon)
+        if not items or not store or any(item not in store["stock"] for item in items):
+            return None
+        lines = []
+        for item in items:
+            if store["stock"][item]:
+                lines.append(f"Yes, {item} is in stock at {store['name']}.")
+            else:
+                lines.append(f"Sorry, {item} is out of stock at {store['name']} right now.")
+        return " ".join(lines)
+
+    def _hours(self, query: str, lat: float, lon: float) -> Optional[str]:
+        if self._find_items(query):
+            return None
+        store = self._store(query, lat, lon)
+        if not store:
+            return None
+        return f"{store['name']} is open from {store['hours']['open']} to {store['hours']['close']}."
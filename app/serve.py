@@ -0,0 +1,122 @@
+"""
+Pre-forked serving mode. The parent process builds the SupportAgent once (spaCy, FastEmbed,
+Qdrant, profile/store indexes), warms it up, then forks N uvicorn workers that accept on a
+shared socket. The workers inherit the loaded models as copy-on-write pages instead of each
+loading their own copy, so memory grows with per-request state rather than with model size.
+
+Run from the repository root (Linux/macOS):
+    python -m app.serve --workers 4 --port 8000
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+from typing import Dict
+
+import uvicorn
+
+# Everything below must be loaded before the fork, not lazily in each worker; and the ONNX
+# intra-op pool (whose threads would not survive fork) is kept at one thread per worker.
+os.environ.setdefault("PII_PRELOAD", "1")
+os.environ.setdefault("EMBED_THREADS", "1")
+
+
+def load_app():
+    """
+    Imports app.main (which builds the agent) and runs one request's worth of model work, so
+    every lazy structure is materialised in the parent rather than separately in each child.
+    The agent's thread pool is deliberately not used here: its threads would not survive fork.
+    """
+    from app import main
+
+    agent = main.agent
+    agent.privacy.anonymize_full("My name is Priya Sharma and I live in Bandra")
+    agent.rag.embed_query("warm up")
+    agent.context.user_ids
+    return main.app
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def spawn_worker(app, sock: socket.socket, log_level: str) -> int:
+    pid = os.fork()
+    if pid:
+        return pid
+
+    # Child: restore default signal handling and serve until told to stop.
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    try:
+        server = uvicorn.Server(uvicorn.Config(app, log_level=log_level))
+        server.run(sockets=[sock])
+    finally:
+        os._exit(0)
+
+
+def serve(workers: int, host: str, port: int, log_level: str = "info") -> None:
+    # Keep the collector from touching (and so copying) the parent's objects in every child.
+    gc.disable()
+    app = load_app()
+    gc.freeze()
+    gc.enable()
+
+    sock = bind_socket(host, port)
+    children: Dict[int, int] = {}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    for slot in range(workers):
+        children[spawn_worker(app, sock, log_level)] = slot
+    print(f"Serving on http://{host}:{port} with {workers} pre-forked workers (parent pid {os.getpid()})")
+
+    # Restart workers that die unexpectedly; exit once all have stopped after a signal.
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        slot = children.pop(pid, None)
+        if slot is not None and not stopping:
+            print(f"Worker {pid} exited with status {status}; restarting")
+            children[spawn_worker(app, sock, log_level)] = slot
+
+    sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    if not hasattr(os, "fork"):
+        sys.exit("Pre-forked serving needs os.fork; use `uvicorn app.main:app --workers N` instead.")
+    serve(args.workers, args.host, args.port, args.log_level)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import zlib
+from collections import Counter
+from typing import Dict, Hashable, List, Sequence, Tuple
+
+from qdrant_client.http import models
+
+from app.text_index import tokenize
+
+
+def term_id(token: str) -> int:
+    # Stable across processes and restarts (unlike hash()); Qdrant sparse indices are uint32.
+    return zlib.crc32(token.encode("utf-8"))
+
+
+class BM25Encoder:
+    """
+    Sparse BM25 vectors for Qdrant. Documents carry the BM25 term-frequency part; the collection's
+    IDF modifier supplies the inverse document frequency at query time, so the dot product of a
+    query vector (1.0 per distinct term) with a document vector is the document's BM25 score.
+
+    avg_len stands in for the corpus-wide average chunk length, which is unknown while chunks are
+    still being ingested; it only shifts how strongly long chunks are penalised.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, avg_len: float = 120.0):
+        self.k1 = k1
+        self.b = b
+        self.avg_len = avg_len
+
+    def encode_document(self, text: str) -> models.SparseVector:
+        tokens = tokenize(text)
+        norm = self.k1 * (1 - self.b + self.b * len(tokens) / self.avg_len)
+        weights: Dict[int, float] = {}
+        for token, tf in Counter(tokens).items():
+            index = term_id(token)
+            weights[index] = weights.get(index, 0.0) + tf * (self.k1 + 1) / (tf + norm)
+        return models.SparseVector(indices=list(weights), values=list(weights.values()))
+
+    def encode_query(self, text: str) -> models.SparseVector:
+        indices = sorted({term_id(token) for token in tokenize(text)})
+        return models.SparseVector(indices=indices, values=[1.0] * len(indices))
+
+
+def weighted_rrf(rankings: Sequence[Sequence[Hashable]], weights: Sequence[float], k: int = 60,
+                 limit: int = 5) -> List[Hashable]:
+    """
+    Weighted reciprocal rank fusion: each ranking contributes weight / (k + rank) per item.
+    Rank-based, so dense cosine scores and unbounded BM25 scores need no normalisation.
+    """
+    return [item for item, _ in weighted_rrf_scores(rankings, weights, k, limit)]
+
+
+def weighted_rrf_scores(rankings: Sequence[Sequence[Hashable]], weights: Sequence[float], k: int = 60,
+                        limit: int = 5) -> List[Tuple[Hashable, float]]:
+    """
+    weighted_rrf with the fused score of each item, best first.
+    """
+    scores: Dict[Hashable, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        if not weight:
+            continue
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + weight / (k + rank)
+    return sorted(scores.items(), key=lambda entry: entry[1], reverse=True)[:limit]
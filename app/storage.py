@@ -0,0 +1,167 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from app.users import normalize_phone, user_point
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    phone TEXT,
+    latitude REAL,
+    longitude REAL,
+    profile TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS users_phone ON users (phone);
+CREATE TABLE IF NOT EXISTS stores (
+    store_id TEXT PRIMARY KEY,
+    profile TEXT NOT NULL
+);
+"""
+
+# Reads go through SQLite's memory-mapped I/O, so hot pages are shared with the OS page cache
+# instead of being copied into every worker's heap.
+MMAP_SIZE = 1 << 30
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _user_row(user: Dict) -> Tuple:
+    lat, lon = user_point(user)
+    return (
+        user["user_id"],
+        normalize_phone(user.get("phone_number", "")),
+        None if np.isnan(lat) else lat,
+        None if np.isnan(lon) else lon,
+        json.dumps(user, separators=(",", ":")),
+    )
+
+
+class SqliteUserTable(Mapping):
+    """
+    Read-mostly user table backed by SQLite. Only the profile a request asks for is
+    decoded; user_id and normalized phone are indexed columns, so lookups never scan.
+    Same interface as UserIndex.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn = connect(db_path)
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        # A SQLite connection must not be used across fork (app.serve workers); reopen in the child.
+        if self._pid != os.getpid():
+            self._conn = connect(self.db_path)
+            self._pid = os.getpid()
+        return self._conn
+
+    def _query(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        with self._lock:
+            return self._connection().execute(sql, params).fetchall()
+
+    def __getitem__(self, user_id: str) -> Dict:
+        rows = self._query("SELECT profile FROM users WHERE user_id = ?", (user_id,))
+        if not rows:
+            raise KeyError(user_id)
+        return json.loads(rows[0][0])
+
+    def __contains__(self, user_id) -> bool:
+        return bool(self._query("SELECT 1 FROM users WHERE user_id = ?", (user_id,)))
+
+    def __iter__(self) -> Iterator[str]:
+        return (row[0] for row in self._query("SELECT user_id FROM users ORDER BY rowid"))
+
+    def __len__(self) -> int:
+        return self._query("SELECT COUNT(*) FROM users")[0][0]
+
+    def find_by_phone(self, phone: str) -> Optional[str]:
+        key = normalize_phone(phone)
+        if not key:
+            return None
+        rows = self._query("SELECT user_id FROM users WHERE phone = ? LIMIT 1", (key,))
+        return rows[0][0] if rows else None
+
+    def coordinates(self) -> Tuple[List[str], np.ndarray]:
+        """
+        All user IDs with an (n, 2) array of their (lat, lon), read from the columns
+        without decoding any profile.
+        """
+        rows = self._query("SELECT user_id, latitude, longitude FROM users ORDER BY rowid")
+        user_ids = [row[0] for row in rows]
+        coords = np.array([(row[1], row[2]) for row in rows], dtype=np.float64)
+        return user_ids, coords.reshape(-1, 2)
+
+    def upsert(self, user: Dict) -> None:
+        with self._lock, self._connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO users VALUES (?, ?, ?, ?, ?)", _user_row(user))
+
+
+def load_stores(db_path: str) -> List[Dict]:
+    """
+    Loads every store. The catalogue is small and feeds the in-memory indexes, so it is read eagerly.
+    """
+    conn = connect(db_path)
+    try:
+        return [json.loads(row[0]) for row in conn.execute("SELECT profile FROM stores ORDER BY rowid")]
+    finally:
+        conn.close()
+
+
+def _batched(rows: Iterable[Tuple], size: int = 10_000) -> Iterator[List[Tuple]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def convert_json(users_path: str = "data/users.json", stores_path: str = "data/stores.json",
+                 db_path: str = "data/context.db") -> Tuple[int, int]:
+    """
+    Converts the JSON files produced by generate_data.py into a SQLite database.
+    Returns (users, stores) written.
+    """
+    with open(users_path, "r") as f:
+        users = json.load(f)
+    with open(stores_path, "r") as f:
+        stores = json.load(f)
+
+    if os.path.exists(db_path):
+        os.remove(db_path)
+
+    conn = connect(db_path)
+    try:
+        with conn:
+            for batch in _batched(_user_row(u) for u in users):
+                conn.executemany("INSERT OR REPLACE INTO users VALUES (?, ?, ?, ?, ?)", batch)
+            conn.executemany(
+                "INSERT OR REPLACE INTO stores VALUES (?, ?)",
+                [(s["store_id"], json.dumps(s, separators=(",", ":"))) for s in stores],
+            )
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+    return len(users), len(stores)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    n_users, n_stores = convert_json(*args)
+    target = args[2] if len(args) > 2 else "data/context.db"
+    print(f"Wrote {n_users} users and {n_stores} stores to {target}")
@@ -0,0 +1,258 @@
+"""
+Live store catalogue. A StoreCatalog is an immutable snapshot of the store records with their
+nearest-store and text indexes; updates build a new snapshot that shares everything they do not
+touch, and the owner swaps it in with a single assignment, so readers never take a lock.
+StoreFileWatcher turns edits of stores.json into such updates.
+"""
+import itertools
+import json
+import os
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from app.geo import StoreIndex
+from app.persistent import PersistentMap, SlotVector
+from app.text_index import StoreTextIndex
+
+# Record fields the nearest-store and text indexes are built from.
+INDEXED_FIELDS = ("name", "location")
+REQUIRED_FIELDS = ("store_id", "name", "location", "hours", "stock", "offers")
+# Nested objects a partial update merges into instead of replacing.
+MERGED_FIELDS = ("location", "hours", "stock")
+# Delta keys that identify the store or act as flags rather than being record fields.
+CONTROL_FIELDS = {"store_id", "deleted", "replace"}
+
+_VERSIONS = itertools.count()
+
+
+def store_point(store: Dict) -> Tuple[float, float]:
+    return float(store["location"]["latitude"]), float(store["location"]["longitude"])
+
+
+def merge_store(store: Dict, changes: Dict) -> Dict:
+    """
+    New record with changes applied: stock, hours and location are merged key by key (so
+    {"stock": {"Vada Pav": true}} flips one item), every other field is replaced.
+    """
+    merged = dict(store)
+    for key, value in changes.items():
+        if key in MERGED_FIELDS and isinstance(value, dict) and isinstance(store.get(key), dict):
+            merged[key] = {**store[key], **value}
+        else:
+            merged[key] = value
+    return merged
+
+
+def validate_store(store: Dict) -> None:
+    missing = [key for key in REQUIRED_FIELDS if key not in store]
+    if missing:
+        raise ValueError(f"Store {store.get('store_id')} is missing {', '.join(missing)}")
+    try:
+        store_point(store)
+        store["location"]["address"]
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(f"Store {store['store_id']} needs location.latitude, longitude and address")
+
+
+class StoreCatalog:
+    """
+    stores is positional and only grows: a removed store leaves None in its slot and a store
+    whose name or location changes moves to a new slot, so a slot's coordinates and index
+    entries never change. stores, by_id and the text index are persistent containers (see
+    app.persistent), so apply() costs roughly O(sqrt(n)) per touched store instead of a copy
+    of the catalogue. coords holds (lat, lon) per slot (NaN for removed ones) and live the
+    occupied slots; both are built on first use after a change that adds or removes stores.
+    vocabulary_version changes whenever the set of store names, addresses or stock item
+    names may have changed.
+    """
+
+    def __init__(self, stores: Sequence[Optional[Dict]] = ()):
+        self.stores = SlotVector(stores)
+        self.by_id = PersistentMap((store["store_id"], idx) for idx, store in enumerate(self.stores)
+                                   if store is not None)
+        self._coords: Optional[np.ndarray] = None
+        self._live: Optional[np.ndarray] = None
+        self.store_index = StoreIndex(self.coords[self.live].tolist(), indices=self.live.tolist())
+        self.text_index = StoreTextIndex(self.stores)
+        self.vocabulary_version = next(_VERSIONS)
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    @property
+    def coords(self) -> np.ndarray:
+        if self._coords is None:
+            self._build_arrays()
+        return self._coords
+
+    @property
+    def live(self) -> np.ndarray:
+        if self._live is None:
+            self._build_arrays()
+        return self._live
+
+    def _build_arrays(self) -> None:
+        live = [idx for idx, store in enumerate(self.stores) if store is not None]
+        coords = np.full((len(self.stores), 2), np.nan, dtype=np.float64)
+        for idx in live:
+            coords[idx] = store_point(self.stores[idx])
+        self._coords, self._live = coords, np.array(live, dtype=np.int64)
+
+    def point(self, idx: int) -> Tuple[float, float]:
+        return store_point(self.stores[idx])
+
+    def get(self, store_id: str) -> Optional[Dict]:
+        idx = self.by_id.get(store_id)
+        return None if idx is None else self.stores[idx]
+
+    def live_stores(self) -> List[Dict]:
+        return [store for store in self.stores if store is not None]
+
+    def apply(self, deltas: Iterable[Dict]) -> Tuple["StoreCatalog", Set[str], bool]:
+        """
+        New catalogue with deltas applied, in order. A delta is a record with a store_id:
+        - {"store_id": ..., "deleted": true} removes the store;
+        - for an unknown store_id it must be a complete record, which is added;
+        - otherwise it is a partial update (see merge_store), or with "replace": true a
+          complete record that replaces the old one.
+        Returns (catalogue, changed store_ids, whether any store was added, removed or moved).
+        Only the touched slots, shards and index entries are copied. Raises ValueError on an
+        invalid delta, leaving this catalogue untouched.
+        """
+        stores = self.stores.evolver()
+        by_id = self.by_id.evolver()
+        store_index = self.store_index
+        added: List[int] = []
+        removed: List[int] = []
+        changed: Set[str] = set()
+        new_items = False
+
+        def drop(idx: int) -> None:
+            nonlocal store_index
+            stores[idx] = None
+            store_index = store_index.remove(idx)
+            removed.append(idx)
+
+        def add(store: Dict) -> None:
+            nonlocal store_index
+            idx = len(stores)
+            stores.append(store)
+            store_index = store_index.insert(*store_point(store), idx)
+            by_id[store["store_id"]] = idx
+            added.append(idx)
+
+        for delta in deltas:
+            store_id = delta.get("store_id")
+            if not store_id:
+                raise ValueError("Store delta without store_id")
+            idx = by_id.get(store_id)
+            changes = {key: value for key, value in delta.items() if key not in ("deleted", "replace")}
+
+            if delta.get("deleted"):
+                if idx is not None:
+                    drop(idx)
+                    del by_id[store_id]
+                    changed.add(store_id)
+                continue
+
+            if idx is None:
+                validate_store(changes)
+                add(changes)
+            else:
+                store = changes if delta.get("replace") else merge_store(stores[idx], changes)
+                validate_store(store)
+                if store == stores[idx]:
+                    continue
+                if any(store.get(key) != stores[idx].get(key) for key in INDEXED_FIELDS):
+                    drop(idx)
+                    add(store)
+                else:
+                    new_items = new_items or store["stock"].keys() != stores[idx]["stock"].keys()
+                    stores[idx] = store
+            changed.add(store_id)
+
+        catalog = StoreCatalog.__new__(StoreCatalog)
+        catalog.stores = stores.persistent()
+        catalog.by_id = by_id.persistent()
+        if added or removed:
+            catalog._coords, catalog._live = None, None
+        else:
+            catalog._coords, catalog._live = self._coords, self._live
+        # Tombstones slow lookups down once they outnumber live stores; rebuild the tree then.
+        if store_index.tombstones > len(store_index):
+            store_index = StoreIndex(catalog.coords[catalog.live].tolist(), indices=catalog.live.tolist())
+        catalog.store_index = store_index
+        catalog.text_index = self.text_index
+        if added or removed:
+            # Slots added and removed again within this batch are added empty.
+            catalog.text_index = self.text_index.updated(
+                [idx for idx in removed if idx < len(self.stores)], [(idx, catalog.stores[idx]) for idx in added])
+        catalog.vocabulary_version = next(_VERSIONS) if added or removed or new_items else self.vocabulary_version
+        return catalog, changed, bool(added or removed)
+
+
+def diff_stores(catalog: StoreCatalog, records: Iterable[Dict]) -> List[Dict]:
+    """
+    Deltas that turn catalog into exactly records (e.g. a re-read stores.json).
+    """
+    deltas = []
+    seen = set()
+    for record in records:
+        seen.add(record["store_id"])
+        if catalog.get(record["store_id"]) != record:
+            deltas.append({**record, "replace": True})
+    deltas.extend({"store_id": store_id, "deleted": True} for store_id in catalog.by_id if store_id not in seen)
+    return deltas
+
+
+class StoreFileWatcher:
+    """
+    Polls a stores JSON file every interval seconds and passes the records to on_change
+    whenever its mtime changes. Runs on a daemon thread, started per process (after fork).
+    """
+
+    def __init__(self, path: str, on_change: Callable[[List[Dict]], None], interval: float = 2.0):
+        self.path = path
+        self.on_change = on_change
+        self.interval = interval
+        self._mtime = os.path.getmtime(path) if os.path.exists(path) else None
+        self._failed_mtime: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="store-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def check(self) -> bool:
+        """
+        Applies the file if it changed since the last check. Returns whether it did.
+        """
+        mtime = None
+        try:
+            mtime = os.path.getmtime(self.path)
+            if mtime in (self._mtime, self._failed_mtime):
+                return False
+            with open(self.path, "r") as f:
+                records = json.load(f)
+            self.on_change(records)
+            self._mtime = mtime
+            return True
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            # An invalid file is reported once and retried when it changes again.
+            print(f"Error reloading stores from {self.path}: {e}")
+            self._failed_mtime = mtime
+            return False
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
@@ -0,0 +1,175 @@
+import re
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.persistent import PersistentMap, Postings, SlotVector
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+EMPTY_POSTINGS = Postings()
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class StoreTextIndex:
+    """
+    Inverted index over store names, address parts and city names.
+
+    phrases maps the token sequence of every address part (e.g. ("bandra", "west"),
+    ("mumbai",)) to the stores that have it, so a query is matched by looking up its
+    token n-grams. tokens maps every name/address token to its stores, which answers
+    "query is a substring of the store name or address" by posting-list intersection; the
+    last query token may be a prefix ("ban" finds Bandra), looked up in a sorted vocabulary
+    that is rebuilt on the first prefix lookup after an update adds or drops a token.
+    Lookups cost time proportional to the query length, not the catalogue size.
+
+    updated() returns a copy with stores added and removed that shares every posting list
+    and chunk they do not touch (see app.persistent), so readers of the old index are never
+    disturbed and an update costs far less than a rebuild.
+    """
+
+    def __init__(self, stores: Iterable[Optional[Dict]]):
+        phrases: Dict[Tuple[str, ...], List[int]] = {}
+        tokens: Dict[str, List[int]] = {}
+        names: List[str] = []
+        addresses: List[str] = []
+        self.max_phrase_len = 1
+
+        for idx, store in enumerate(stores):
+            name, address = self._fields(store)
+            names.append(name)
+            addresses.append(address)
+            phrase_keys, token_keys = self._keys(name, address)
+            for phrase in phrase_keys:
+                postings = phrases.setdefault(phrase, [])
+                if not postings or postings[-1] != idx:
+                    postings.append(idx)
+                self.max_phrase_len = max(self.max_phrase_len, len(phrase))
+            for token in token_keys:
+                tokens.setdefault(token, []).append(idx)
+
+        self.phrases = PersistentMap((key, Postings(postings)) for key, postings in phrases.items())
+        self.tokens = PersistentMap((key, Postings(postings)) for key, postings in tokens.items())
+        self._names = SlotVector(names)
+        self._addresses = SlotVector(addresses)
+        self._vocabulary: Optional[List[str]] = None
+
+    @staticmethod
+    def _fields(store: Optional[Dict]) -> Tuple[str, str]:
+        """
+        Lowercased name and address; empty for a removed store's slot (see StoreCatalog) or a
+        record that cannot be indexed.
+        """
+        if store is None:
+            return "", ""
+        try:
+            return store["name"].lower(), store["location"]["address"].lower()
+        except Exception as e:
+            print(f"Error indexing store {store.get('store_id')}: {e}")
+            return "", ""
+
+    @staticmethod
+    def _keys(name: str, address: str) -> Tuple[List[Tuple[str, ...]], Set[str]]:
+        phrases = []
+        for part in address.split(","):
+            part = part.strip()
+            phrase = tuple(tokenize(part))
+            if len(part) > 3 and phrase:
+                phrases.append(phrase)
+        return phrases, set(tokenize(name)) | set(tokenize(address))
+
+    def updated(self, removed: Iterable[int] = (), added: Iterable[Tuple[int, Optional[Dict]]] = ()) -> "StoreTextIndex":
+        """
+        Copy with the stores at the removed indexes taken out (their slots are left empty, not
+        reused) and the added (idx, store) pairs appended; each added idx must be the next
+        unused one. An added store of None takes its slot empty.
+        """
+        phrases, tokens = self.phrases.evolver(), self.tokens.evolver()
+        names, addresses = self._names.evolver(), self._addresses.evolver()
+        max_phrase_len = self.max_phrase_len
+        vocabulary = self._vocabulary
+
+        for idx in removed:
+            phrase_keys, token_keys = self._keys(names[idx], addresses[idx])
+            for postings_index, keys in ((phrases, phrase_keys), (tokens, token_keys)):
+                for key in keys:
+                    postings = postings_index.get(key)
+                    if postings is None:
+                        continue
+                    postings = postings.removed(idx)
+                    if postings:
+                        postings_index[key] = postings
+                    else:
+                        del postings_index[key]
+                        vocabulary = None
+            names[idx] = ""
+            addresses[idx] = ""
+
+        for idx, store in added:
+            if idx != len(names):
+                raise ValueError(f"Store index {idx} is not the next free index ({len(names)})")
+            name, address = self._fields(store)
+            names.append(name)
+            addresses.append(address)
+            phrase_keys, token_keys = self._keys(name, address)
+            for postings_index, keys in ((phrases, phrase_keys), (tokens, token_keys)):
+                for key in keys:
+                    postings = postings_index.get(key, EMPTY_POSTINGS)
+                    if not postings:
+                        vocabulary = None
+                    if not postings or postings.last != idx:
+                        postings_index[key] = postings.appended(idx)
+            max_phrase_len = max([max_phrase_len] + [len(phrase) for phrase in phrase_keys])
+
+        index = StoreTextIndex.__new__(StoreTextIndex)
+        index.phrases = phrases.persistent()
+        index.tokens = tokens.persistent()
+        index.max_phrase_len = max_phrase_len
+        index._names = names.persistent()
+        index._addresses = addresses.persistent()
+        index._vocabulary = vocabulary
+        return index
+
+    def _prefixed(self, prefix: str) -> List[Postings]:
+        """
+        Posting lists of every token starting with prefix.
+        """
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.tokens)
+        vocabulary = self._vocabulary
+        # Tokens are [a-z0-9], so "{" sorts after every token with this prefix.
+        start, end = bisect_left(vocabulary, prefix), bisect_left(vocabulary, prefix + "{")
+        return [self.tokens[token] for token in vocabulary[start:end]]
+
+    def search(self, query: str) -> List[int]:
+        """
+        Returns the indices of matching stores in catalogue order.
+        """
+        query_lower = query.lower()
+        query_tokens = tokenize(query_lower)
+        if not query_tokens:
+            return []
+
+        matches: Set[int] = set()
+
+        for n in range(1, min(self.max_phrase_len, len(query_tokens)) + 1):
+            for start in range(len(query_tokens) - n + 1):
+                postings = self.phrases.get(tuple(query_tokens[start:start + n]))
+                if postings:
+                    matches.update(postings)
+
+        # The last token may be a prefix: verify the shorter of its prefixed postings and the
+        # rarest other token's postings.
+        *head, last = query_tokens
+        exact = min((self.tokens.get(t, EMPTY_POSTINGS) for t in head), key=len, default=None)
+        prefixed = self._prefixed(last) if exact is None or exact else []
+        if exact is None or sum(map(len, prefixed)) < len(exact):
+            candidates = set().union(*prefixed)
+        else:
+            candidates = exact
+        for idx in candidates:
+            if idx not in matches and (query_lower in self._names[idx] or query_lower in self._addresses[idx]):
+                matches.add(idx)
+
+        return sorted(matches)
@@ -0,0 +1,85 @@
+import re
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+NON_DIGITS = re.compile(r"\D")
+USER_ID_PATTERN = re.compile(r"USR-\d+", re.IGNORECASE)
+# Anything that may be a phone number, for masking.
+PHONE_PATTERN = re.compile(r"(?<!\d)(?:\+?91[-\s]?)?\d{5}[-\s]?\d{5}(?!\d)")
+# Phone numbers that may log a guest in: "+91"-prefixed inside a message, or a message that is
+# nothing but a number. A bare 10-digit run in a sentence may be an order or reference number.
+LOGIN_PHONE_PATTERN = re.compile(r"(?<![\d+])\+91[-\s]?\d{5}[-\s]?\d{5}(?![-\d])")
+PHONE_ONLY_PATTERN = re.compile(r"^\s*(?:\+?91[-\s]?|0)?\d{5}[-\s]?\d{5}\s*$")
+
+
+def normalize_phone(phone: str) -> Optional[str]:
+    """
+    Reduces a phone number to its 10 national digits, e.g. "+91-98765-43210" -> "9876543210".
+    Returns None if the input does not look like an Indian mobile number.
+    """
+    if not phone:
+        return None
+    digits = NON_DIGITS.sub("", phone)
+    if len(digits) == 12 and digits.startswith("91"):
+        digits = digits[2:]
+    elif len(digits) == 11 and digits.startswith("0"):
+        digits = digits[1:]
+    return digits if len(digits) == 10 else None
+
+
+def user_point(user: Dict) -> Tuple[float, float]:
+    """
+    (lat, lon) of a user's profile location, NaN when unknown.
+    """
+    location = user.get("location") or {}
+    return (location.get("latitude", np.nan), location.get("longitude", np.nan))
+
+
+class UserIndex(Mapping):
+    """
+    In-memory user table keyed by user_id with a hash index on normalized phone number.
+    """
+
+    def __init__(self, users: Iterable[Dict] = ()):
+        self._users: Dict[str, Dict] = {}
+        self._by_phone: Dict[str, str] = {}
+        for user in users:
+            self.upsert(user)
+
+    def __getitem__(self, user_id: str) -> Dict:
+        return self._users[user_id]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._users)
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def find_by_phone(self, phone: str) -> Optional[str]:
+        key = normalize_phone(phone)
+        return self._by_phone.get(key) if key else None
+
+    def coordinates(self) -> Tuple[List[str], np.ndarray]:
+        """
+        All user IDs with an (n, 2) array of their (lat, lon).
+        """
+        user_ids = list(self._users)
+        coords = np.array([user_point(self._users[uid]) for uid in user_ids], dtype=np.float64)
+        return user_ids, coords.reshape(-1, 2)
+
+    def upsert(self, user: Dict) -> None:
+        """
+        Adds or replaces a user, keeping the phone index in sync.
+        """
+        user_id = user["user_id"]
+        previous = self._users.get(user_id)
+        if previous:
+            old_key = normalize_phone(previous.get("phone_number", ""))
+            if old_key and self._by_phone.get(old_key) == user_id:
+                del self._by_phone[old_key]
+
+        self._users[user_id] = user
+        key = normalize_phone(user.get("phone_number", ""))
+        if key:
+            self._by_phone[key] = user_id
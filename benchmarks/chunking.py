@@ -0,0 +1,71 @@
+"""
+Compares chunkers on the policy manual: the original 20-line / 5-overlap window against the
+structure-aware chunker at several token budgets. Reports chunk count, indexed tokens, embedding
+time, on-disk index size, and recall@k / prompt tokens at k on the retrieval_recall evaluation set.
+
+Run from the repository root (ingests into a temporary Qdrant directory):
+    python -m benchmarks.chunking
+    python -m benchmarks.chunking --budgets 128 256 512 --k 3
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from app.chunking import LineWindowChunker, StructuredChunker, estimate_tokens
+from benchmarks.retrieval_recall import build_eval_set
+
+
+def dir_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", default="data/store_policies.pdf")
+    parser.add_argument("--budgets", type=int, nargs="+", default=[128, 256, 512])
+    parser.add_argument("--k", type=int, default=3)
+    args = parser.parse_args()
+
+    queries = build_eval_set(args.pdf)
+    chunkers = [("window 20/5", LineWindowChunker())]
+    chunkers += [(f"structured {b}", StructuredChunker(max_tokens=b)) for b in args.budgets]
+
+    with tempfile.TemporaryDirectory() as qdrant_path:
+        os.environ["QDRANT_PATH"] = qdrant_path
+        from app.rag import RAGManager
+
+        print(f"{len(queries)} evaluation queries, k={args.k}")
+        print(f"{'chunker':>16} {'chunks':>7} {'tokens':>7} {'embed s':>8} {'index KB':>9} "
+              f"{f'R@{args.k}':>6} {'prompt tok':>10} {'vs window':>10}")
+        baseline = None
+        for i, (label, chunker) in enumerate(chunkers):
+            rag = RAGManager(collection_name=f"chunking_{i}", cache_size=0)
+            rag.chunker = chunker
+
+            chunks = list(rag._chunk_pdf(args.pdf))
+            start = time.perf_counter()
+            list(rag.embedding_model.embed(chunks))
+            embed_seconds = time.perf_counter() - start
+
+            rag.ingest_pdf(args.pdf)
+            index_kb = dir_size(os.path.join(qdrant_path, "collection", rag.collection_name)) / 1024
+
+            hits = 0
+            prompt_tokens = []
+            for query, answer in queries:
+                texts = rag.search(query, limit=args.k)
+                hits += any(answer in t for t in texts)
+                prompt_tokens.append(sum(estimate_tokens(f"- {t}") for t in texts))
+            rag.client.close()
+            mean_prompt = statistics.mean(prompt_tokens)
+            baseline = baseline or mean_prompt
+
+            print(f"{label:>16} {len(chunks):>7} {sum(map(estimate_tokens, chunks)):>7} {embed_seconds:>8.2f} "
+                  f"{index_kb:>9.0f} {hits / len(queries):>6.2f} {mean_prompt:>10.0f} "
+                  f"{(mean_prompt - baseline) / baseline:>+9.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Context fragment cache: format_context cost and hit rate over simulated conversations, with
+and without the cache. Each session is one user sending several turns while moving a little
+(GPS jitter of a few tens of metres); every --flip-every turns a random store's stock flips
+through ContextManager.update_store, as a live stock update would.
+
+Run from the repository root:
+    python -m benchmarks.context_cache
+    python -m benchmarks.context_cache --sessions 5000 --turns 8 --cell-size 0.002
+"""
+import argparse
+import random
+import time
+
+from app.cache import DependencyCache
+from app.context import ContextManager
+from app.users import user_point
+
+
+def run(cm: ContextManager, sessions, flip_every: int) -> float:
+    rng = random.Random(1)
+    calls = 0
+    start = time.perf_counter()
+    for user_id, turns in sessions:
+        for lat, lon in turns:
+            cm.format_context(user_id, lat, lon, "Is my usual available?")
+            calls += 1
+            if flip_every and calls % flip_every == 0:
+                store = rng.choice(cm.stores)
+                item = rng.choice(list(store["stock"]))
+                cm.update_store(store["store_id"], {"stock": {item: not store["stock"][item]}})
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--turns", type=int, default=6)
+    parser.add_argument("--jitter-m", type=float, default=30.0)
+    parser.add_argument("--flip-every", type=int, default=200)
+    parser.add_argument("--cell-size", type=float, help="degrees (default: CONTEXT_CELL_SIZE)")
+    args = parser.parse_args()
+
+    cm = ContextManager()
+    rng = random.Random(0)
+    user_ids = cm.user_ids
+    jitter = args.jitter_m / 111_000
+    sessions = []
+    for _ in range(args.sessions):
+        user_id = rng.choice(user_ids)
+        lat, lon = user_point(cm.get_user(user_id))
+        sessions.append((user_id, [(lat + rng.uniform(-jitter, jitter), lon + rng.uniform(-jitter, jitter))
+                                   for _ in range(args.turns)]))
+
+    cm.context_cache = DependencyCache(maxsize=0)
+    uncached_us = run(cm, sessions, args.flip_every)
+
+    cm.context_cache = DependencyCache(maxsize=4096)
+    if args.cell_size:
+        cm.cell_size = args.cell_size
+    cached_us = run(cm, sessions, args.flip_every)
+    stats = cm.context_cache_stats()
+
+    print(f"{args.sessions} sessions x {args.turns} turns, {len(user_ids)} users, cell {cm.cell_size} deg")
+    print(f"uncached: {uncached_us:6.1f} us/call")
+    print(f"cached:   {cached_us:6.1f} us/call ({uncached_us / cached_us:.1f}x)")
+    print(f"hit rate {stats['hit_rate']:.1%}  stale {stats['stale']}  invalidations {stats['invalidations']}  "
+          f"size {stats['size']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Prompt size and LLM latency with the context packer: for the retrieval_recall evaluation set,
+renders the support prompt from the unpacked user context + RAG chunks (budget 0) and packed
+at several token budgets. Reports estimated prompt tokens, the share of queries whose answer
+string survives packing, and what the packer removed.
+
+With GROQ_API_KEY set, also times the LLM on the unpacked and packed prompts for the first
+--llm-queries queries (GROQ_API_BASE can point at a stub server).
+
+Run from the repository root (ingests into a temporary Qdrant directory):
+    python -m benchmarks.context_packing
+    python -m benchmarks.context_packing --chunker window --budgets 256 512 768
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from app.chunking import make_chunker
+from app.context import ContextManager
+from app.packing import ContextPacker
+from app.prompts import PromptRegistry
+from app.router import detect_intents
+from benchmarks.retrieval_recall import build_eval_set
+
+
+def time_llm(llm, prompts, rounds: int) -> float:
+    from langchain_core.messages import HumanMessage, SystemMessage
+
+    latencies = []
+    for system_prompt, query in prompts:
+        for _ in range(rounds):
+            start = time.perf_counter()
+            llm.invoke([SystemMessage(content=system_prompt), HumanMessage(content=query)])
+            latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", default="data/store_policies.pdf")
+    parser.add_argument("--chunker", default=os.getenv("RAG_CHUNKER", "structured"))
+    parser.add_argument("--budgets", type=int, nargs="+", default=[256, 512, 768])
+    parser.add_argument("--user", default="USR-001")
+    parser.add_argument("--lat", type=float, default=19.10)
+    parser.add_argument("--lon", type=float, default=72.78)
+    parser.add_argument("--llm-queries", type=int, default=10)
+    parser.add_argument("--llm-rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    queries = build_eval_set(args.pdf)
+    context = ContextManager()
+    registry = PromptRegistry(reload_interval=0)
+
+    with tempfile.TemporaryDirectory() as qdrant_path:
+        os.environ["QDRANT_PATH"] = qdrant_path
+        from app.rag import RAGManager
+
+        rag = RAGManager(cache_size=0)
+        rag.chunker = make_chunker(args.chunker)
+        rag.ingest_pdf(args.pdf)
+        inputs = [
+            (query, answer, context.format_context(args.user, args.lat, args.lon, query), rag.search_scored(query))
+            for query, answer in queries
+        ]
+        rag.client.close()
+
+    prompts = {}
+    print(f"{len(queries)} queries, {args.chunker} chunker, top {rag.top_k} chunks")
+    print(f"{'budget':>7} {'prompt tok':>10} {'vs full':>8} {'answer kept':>11} {'fields -':>9} "
+          f"{'dupes':>7} {'dropped':>8} {'pack us':>8}")
+    baseline = None
+    for budget in [0] + args.budgets:
+        packer = ContextPacker(budget)
+        rows = []
+        start = time.perf_counter()
+        for query, answer, context_str, hits in inputs:
+            packed = packer.pack(context_str, hits, detect_intents(query))
+            rendered = registry.render("support", context_str=packed.context_str, rag_str=packed.rag_str)
+            rows.append((packed, rendered, answer in packed.rag_str, query))
+        pack_us = (time.perf_counter() - start) / len(inputs) * 1e6
+        prompts[budget] = [(rendered.text, query) for _, rendered, _, query in rows]
+
+        mean_tokens = statistics.mean(rendered.tokens for _, rendered, _, _ in rows)
+        baseline = baseline or mean_tokens
+        label = "full" if budget == 0 else str(budget)
+        print(f"{label:>7} {mean_tokens:>10.0f} {(mean_tokens - baseline) / baseline:>+8.0%} "
+              f"{sum(kept for _, _, kept, _ in rows) / len(rows):>11.0%} "
+              f"{statistics.mean(len(p.dropped_fields) for p, _, _, _ in rows):>9.1f} "
+              f"{statistics.mean(p.duplicate_chunks for p, _, _, _ in rows):>7.1f} "
+              f"{statistics.mean(p.dropped_chunks for p, _, _, _ in rows):>8.1f} {pack_us:>8.0f}")
+
+    if not os.getenv("GROQ_API_KEY"):
+        print("\nSet GROQ_API_KEY to also measure LLM latency.")
+        return
+
+    from langchain_groq import ChatGroq
+
+    llm = ChatGroq(api_key=os.getenv("GROQ_API_KEY"), model_name="llama-3.3-70b-versatile", temperature=0.7)
+    print(f"\nLLM median latency over {min(args.llm_queries, len(inputs))} queries x {args.llm_rounds} rounds")
+    full_ms = None
+    for budget in [0] + args.budgets:
+        ms = time_llm(llm, prompts[budget][:args.llm_queries], args.llm_rounds)
+        full_ms = full_ms or ms
+        label = "full" if budget == 0 else str(budget)
+        print(f"{label:>7} {ms:>8.0f} ms {(ms - full_ms) / full_ms:>+8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Per-node timing of the agent graph. Compares the wall time of the parallel graph with the
+sum of its stages (what the old strictly sequential wiring would take).
+
+Run from the repository root (needs GROQ_API_KEY, or GROQ_API_BASE pointing at a stub server):
+    python -m benchmarks.graph_timing
+"""
+import asyncio
+import os
+import statistics
+
+# Measure the uncached, unrouted path.
+os.environ.setdefault("SEMANTIC_CACHE_SIZE", "0")
+os.environ.setdefault("RAG_CACHE_SIZE", "0")
+os.environ.setdefault("INTENT_ROUTER", "0")
+
+from app.agent import SupportAgent  # noqa: E402
+
+QUERIES = [
+    ("USR-001", "How much is a Medium Masala Chai?"),
+    ("USR-002", "What time does the Bandra store close?"),
+    ("GUEST", "I'm in Gurgaon, is Vada Pav in stock?"),
+    ("USR-010", "My name is Priya Sharma, what is your refund policy?"),
+    ("USR-005", "Do you have Wi-Fi and seating?"),
+]
+ROUNDS = 5
+STAGES = ["anonymize", "retrieve_context", "retrieve_rag", "pack", "generate"]
+
+
+async def main():
+    agent = SupportAgent()
+    runs = []
+    for _ in range(ROUNDS):
+        for user_id, query in QUERIES:
+            result = await agent.arun(user_id, query, 19.10, 72.78)
+            runs.append(result["timings"])
+
+    def mean_ms(key):
+        return statistics.mean(t.get(key, 0.0) for t in runs) * 1000
+
+    print(f"{len(runs)} runs")
+    for stage in STAGES:
+        print(f"{stage:>18}: {mean_ms(stage):8.1f} ms")
+
+    sequential = sum(mean_ms(stage) for stage in STAGES)
+    critical = (max(mean_ms("retrieve_context"), mean_ms("anonymize") + mean_ms("retrieve_rag"))
+                + mean_ms("pack") + mean_ms("generate"))
+    print(f"{'sum of stages':>18}: {sequential:8.1f} ms  (sequential wiring)")
+    print(f"{'critical path':>18}: {critical:8.1f} ms")
+    print(f"{'measured total':>18}: {mean_ms('total'):8.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
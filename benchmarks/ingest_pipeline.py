@@ -0,0 +1,103 @@
+"""
+Ingestion throughput and peak memory for a large generated manual (default 5,000 pages):
+the old one-shot path (all pages, all chunks, all embeddings in memory, one upsert) versus
+the streaming pipeline in RAGManager.ingest_pdf at several extraction worker counts.
+Every run happens in a fresh interpreter against an empty temporary Qdrant directory, with
+RAG_CHUNKER=window so both paths cut the same 20-line windows. Peak RSS is the interpreter's
+own peak plus that of its largest extraction worker (RUSAGE_CHILDREN), as the pipeline's pages
+are parsed in spawned worker processes.
+
+Run from the repository root:
+    python -m benchmarks.ingest_pipeline
+    python -m benchmarks.ingest_pipeline --pages 1000 --workers 1 2 4 8
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+ITEMS = ["Masala Chai", "Filter Coffee", "Cold Brew", "Vada Pav", "Bun Maska", "Samosa", "Paneer Puff",
+         "Mango Lassi", "Kashmiri Kahwa", "Chocolate Muffin", "Iced Latte", "Ginger Chai"]
+CITIES = ["Mumbai", "Delhi", "Bangalore", "Pune", "Chennai", "Hyderabad", "Kolkata", "Gurgaon"]
+
+CHILD = """
+import json, resource, sys, time
+mode, pdf_path = sys.argv[1], sys.argv[2]
+from app.rag import RAGManager
+rag = RAGManager(cache_size=0)
+start = time.perf_counter()
+if mode == "legacy":
+    from pypdf import PdfReader
+    from qdrant_client.http import models
+    chunks = []
+    for page in PdfReader(pdf_path).pages:
+        lines = [line.strip() for line in (page.extract_text() or "").split("\\n") if line.strip()]
+        for i in range(0, len(lines), 15):
+            chunks.append("\\n".join(lines[i:i + 20]))
+    embeddings = list(rag.embedding_model.embed(chunks))
+    rag.client.upsert(collection_name=rag.collection_name, points=[
+        models.PointStruct(id=i, vector=e.tolist(), payload={"text": c})
+        for i, (c, e) in enumerate(zip(chunks, embeddings))
+    ])
+    n = len(chunks)
+else:
+    n = rag.ingest_pdf(pdf_path)
+print(json.dumps({"chunks": n, "seconds": time.perf_counter() - start,
+                  "main_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                  "worker_rss": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024}))
+"""
+
+
+def make_manual(path: str, pages: int, seed: int = 7) -> None:
+    rng = random.Random(seed)
+    pdf = canvas.Canvas(path, pagesize=letter)
+    for page in range(pages):
+        y = 750
+        pdf.setFont("Helvetica-Bold", 12)
+        pdf.drawString(50, y, f"Section {page + 1}: {rng.choice(CITIES)} outlet operations")
+        pdf.setFont("Helvetica", 9)
+        for line in range(45):
+            y -= 15
+            item = rng.choice(ITEMS)
+            pdf.drawString(50, y, f"{page + 1}.{line + 1} {item} ({rng.choice(['Small', 'Medium', 'Large'])}) "
+                                  f"Rs. {rng.randint(40, 400)}; code {rng.choice(['BREW', 'CHAI', 'SNACK'])}"
+                                  f"{rng.randint(10, 99)} valid in {rng.choice(CITIES)} until {rng.randint(1, 28)}/12.")
+        pdf.showPage()
+    pdf.save()
+
+
+def run(mode: str, pdf_path: str, workers: int) -> dict:
+    with tempfile.TemporaryDirectory() as qdrant_path:
+        env = dict(os.environ, QDRANT_PATH=qdrant_path, INGEST_WORKERS=str(workers), RAG_CHUNKER="window")
+        output = subprocess.run([sys.executable, "-c", CHILD, mode, pdf_path], env=env,
+                                check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=5000)
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "manual.pdf")
+        make_manual(pdf_path, args.pages)
+        print(f"{args.pages}-page manual, {os.path.getsize(pdf_path) / 2**20:.1f} MB")
+        print(f"{'mode':>18} {'chunks':>8} {'seconds':>8} {'pages/s':>8} {'main RSS':>9} {'workers':>8} {'peak RSS':>9}")
+
+        runs = [("legacy", "one-shot", 1)] + [("pipeline", f"pipeline x{w}", w) for w in args.workers]
+        for mode, label, workers in runs:
+            r = run(mode, pdf_path, workers)
+            print(f"{label:>18} {r['chunks']:>8} {r['seconds']:>8.1f} {args.pages / r['seconds']:>8.1f} "
+                  f"{r['main_rss']:>7.0f}MB {r['worker_rss']:>6.0f}MB {r['main_rss'] + r['worker_rss']:>7.0f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Per-request cost of the agent's instrumentation on the calling thread: the old synchronous
+print of the request line and rendered context (flushed, as stdout is under a container log
+driver), against logging the same lines through the background handler at several sample
+rates, and a histogram observation. Each flush of the output stream waits --flush-us to stand
+in for a log pipe that is not drained instantly; the handler's thread absorbs that wait.
+
+Run from the repository root:
+    python -m benchmarks.instrumentation
+    python -m benchmarks.instrumentation --calls 50000 --rates 0 0.01 1
+"""
+import argparse
+import io
+import logging
+import time
+
+from app import logs
+from app.metrics import Histogram
+
+REQUEST = "Request: User=%s, Lat=%s, Lon=%s, Query=%s"
+CONTEXT = ("Current Location: Lat: 19.1000, Lon: 72.8000\nUser: Ubika Keer\nPreferences: Medium Cappuccino "
+           "(Soy Milk, None)\nLoyalty Points: 270\nInferred City: Mumbai\nNearest Store: Velvet Brew - Juhu "
+           "(2.9km away)\nStore Hours: 08:00 - 22:00\nActive Offers: BREW20 (20% off Hot Beverages)")
+
+
+class SlowStream(io.StringIO):
+    def __init__(self, flush_us: float):
+        super().__init__()
+        self.flush_us = flush_us
+
+    def write(self, text):
+        return len(text)
+
+    def flush(self):
+        time.sleep(self.flush_us / 1e6)
+
+
+def per_call_us(fn, calls):
+    start = time.perf_counter()
+    for i in range(calls):
+        fn(i)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--rates", type=float, nargs="+", default=[0.0, 0.01, 0.1, 1.0])
+    parser.add_argument("--flush-us", type=float, default=50.0)
+    args = parser.parse_args()
+
+    stream = SlowStream(args.flush_us)
+
+    def print_lines(i):
+        print(f"Received Request: User=USR-{i}, Lat=19.1, Lon=72.8, Query=Is Vada Pav in stock?", file=stream, flush=True)
+        print(f"DEBUG CONTEXT: {CONTEXT}", file=stream, flush=True)
+
+    print(f"{'print + flush':>24}: {per_call_us(print_lines, args.calls):7.2f} us/request")
+
+    target = logging.StreamHandler(stream)
+    target.setFormatter(logging.Formatter(logs.LOG_FORMAT))
+    handler = logs.BackgroundHandler(target, maxsize=args.calls * 2)
+    for rate in args.rates:
+        base = logging.getLogger(f"benchmarks.instrumentation.{rate}")
+        base.propagate = False
+        base.setLevel(logging.DEBUG)
+        base.addHandler(handler)
+        logger = logs.SampledLogger(base, rate)
+
+        def log_lines(i):
+            logger.info(REQUEST, f"USR-{i}", 19.1, 72.8, "Is Vada Pav in stock?")
+            logger.debug("Context for %s: %s", f"USR-{i}", CONTEXT)
+
+        print(f"{f'background log, rate {rate:g}':>24}: {per_call_us(log_lines, args.calls):7.2f} us/request")
+
+    histogram = Histogram("bench_seconds", "benchmark", "stage")
+    observe_us = per_call_us(lambda i: histogram.observe(i * 1e-6, "retrieve_context"), args.calls)
+    print(f"{'histogram observe':>24}: {observe_us:7.2f} us/call")
+    print(f"dropped records: {handler.dropped}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Intent router fast path: per-query routing latency and the share of a support-query mix that is
+answered from structured data (price list, stores.json) instead of retrieval + the LLM.
+
+Run from the repository root (no API key needed; the LLM is never called):
+    python -m benchmarks.intent_router
+    python -m benchmarks.intent_router --rounds 1000 --verbose
+"""
+import argparse
+import statistics
+import time
+
+from app.context import ContextManager
+from app.router import IntentRouter, load_price_list
+
+QUERIES = [
+    "How much is a Medium Masala Chai?",
+    "What's the price of a large Filter Coffee?",
+    "How much does a Vietnamese Cold Brew cost?",
+    "price of samosa and vada pav",
+    "Is Vada Pav in stock?",
+    "Do you have Bun Maska today?",
+    "Is Samosa available in Koramangala?",
+    "What time do you close?",
+    "What are the opening hours of Bandra West?",
+    "When do you open tomorrow morning?",
+    "What time does the Bandra store close?",
+    "Are you open on Diwali?",
+    "What is your refund policy?",
+    "Can I cancel my order?",
+    "My coffee was cold, I want to complain",
+    "Do you have Wi-Fi and seating?",
+    "What would you recommend for a rainy day?",
+    "Which coupon gives me the biggest discount?",
+    "Hi, I'm Priya",
+    "How much is chai?",
+]
+# Queries that must go to the LLM. Places without a store, not answered for the nearest store:
+MUST_NOT_ROUTE = [
+    "Is Vada Pav in stock in Jaipur?",
+    "What time does the Jaipur store close?",
+    "what time does your Lucknow branch open?",
+    "Is Samosa available at the airport outlet?",
+    # Prices that depend on a variant, coupon, discount or membership.
+    "How much is a large latte with oat milk?",
+    "Price of a Medium Masala Chai with jaggery",
+    "How much is a small Ginger Chai sugar free?",
+    "How much is a Large Latte with the CHAI23 coupon?",
+    "any discount on Masala Chai price?",
+    "What does a Medium Cappuccino cost for members?",
+    # A size that cannot be paired with one item.
+    "How much is a Latte and a Mocha, large?",
+]
+# Routed price answers, checked against the manual's quick-reference price list.
+PRICE_ANSWERS = {
+    "How much is a Medium Masala Chai and a Large Latte?": "A Medium Masala Chai is Rs.125. A Large Latte is Rs.186.",
+    "What's the price of a large Filter Coffee?": "A Large Filter Coffee is Rs.145.",
+    "How much is a small samosa and a large vada pav?": "A Small Samosa is Rs.102. A Large Vada Pav is Rs.137.",
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", default="data/store_policies.pdf")
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--verbose", action="store_true", help="print every query's route")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    router = IntentRouter(ContextManager(), load_price_list(args.pdf))
+    print(f"Router ready in {(time.perf_counter() - start) * 1000:.0f} ms ({len(router.prices)} priced items)")
+
+    routes = {}
+    latencies = {True: [], False: []}
+    for _ in range(args.rounds):
+        for query in QUERIES:
+            start = time.perf_counter()
+            route = router.route(query, 19.10, 72.78)
+            latencies[route is not None].append((time.perf_counter() - start) * 1e6)
+            routes[query] = route
+
+    if args.verbose:
+        for query, route in routes.items():
+            print(f"{query:<48} -> {route.response if route else '(LLM)'}")
+
+    misrouted = [query for query in MUST_NOT_ROUTE if router.route(query, 19.10, 72.78)]
+    if misrouted:
+        raise SystemExit(f"Answered without the LLM: {misrouted}")
+    for query, expected in PRICE_ANSWERS.items():
+        route = router.route(query, 19.10, 72.78)
+        if not route or route.response != expected:
+            raise SystemExit(f"{query!r}: expected {expected!r}, got {route.response if route else None!r}")
+
+    answered = sum(1 for route in routes.values() if route)
+    print(f"answered without the LLM: {answered}/{len(QUERIES)} ({answered / len(QUERIES):.0%})")
+    for hit, label in [(True, "routed"), (False, "fallback")]:
+        if latencies[hit]:
+            values = sorted(latencies[hit])
+            print(f"{label:>9}: p50 {statistics.median(values):7.1f} us  p99 {values[int(len(values) * 0.99) - 1]:7.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Concurrent /chat throughput on a single uvicorn worker, with Groq replaced by a local stub
+server that answers after a fixed delay (so the numbers measure our pipeline, not the LLM).
+
+Run from the repository root (needs the same setup as the app itself):
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --llm-delay 1.0 --requests 200 --concurrency 1 8 32 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+STUB_REPLY = "Hello! A Medium Masala Chai is Rs. 130 at your nearest Velvet Brew outlet."
+
+
+def make_stub_llm(delay: float) -> FastAPI:
+    """
+    Minimal OpenAI-compatible chat completions endpoint, as called by the Groq SDK.
+    """
+    stub = FastAPI()
+
+    @stub.post("/openai/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        await asyncio.sleep(delay)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+
+        if body.get("stream"):
+            async def events():
+                for word in STUB_REPLY.split(" "):
+                    chunk = {
+                        "id": completion_id, "object": "chat.completion.chunk", "created": created,
+                        "model": body.get("model"),
+                        "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}],
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                done = {
+                    "id": completion_id, "object": "chat.completion.chunk", "created": created,
+                    "model": body.get("model"),
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                }
+                yield f"data: {json.dumps(done)}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        return JSONResponse({
+            "id": completion_id, "object": "chat.completion", "created": created, "model": body.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": STUB_REPLY}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        })
+
+    return stub
+
+
+def start_stub_llm(port: int, delay: float) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(make_stub_llm(delay), host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def start_app(port: int, stub_port: int) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        "GROQ_API_KEY": "stub",
+        "GROQ_API_BASE": f"http://127.0.0.1:{stub_port}",
+        # Every request below is unique anyway; keep the cache out of the measurement.
+        "SEMANTIC_CACHE_SIZE": "0",
+        # The opening-hours question would otherwise be answered by the intent router.
+        "INTENT_ROUTER": "0",
+    })
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", "1", "--log-level", "warning"],
+        env=env,
+    )
+
+
+def wait_until_ready(url: str, process: subprocess.Popen, timeout: float = 300.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("App exited during startup")
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.5)
+    raise TimeoutError(f"App did not come up within {timeout}s")
+
+
+async def run_level(base_url: str, n_requests: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0,
+                                 limits=httpx.Limits(max_connections=concurrency)) as client:
+        async def one(i):
+            nonlocal errors
+            payload = {
+                "user_id": f"USR-{(i % 50) + 1:03d}",
+                "query": f"Question {i}: what are your opening hours?",
+                "latitude": 19.10,
+                "longitude": 72.78,
+            }
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/chat", json=payload)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(n_requests)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "throughput": n_requests / elapsed,
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--llm-delay", type=float, default=0.5, help="seconds the stub LLM waits before answering")
+    parser.add_argument("--port", type=int, default=8010)
+    parser.add_argument("--stub-port", type=int, default=8011)
+    args = parser.parse_args()
+
+    stub = start_stub_llm(args.stub_port, args.llm_delay)
+    app_process = start_app(args.port, args.stub_port)
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_until_ready(base_url + "/", app_process)
+        print(f"Stub LLM delay: {args.llm_delay:.2f}s, {args.requests} requests per level, 1 uvicorn worker")
+        print(f"{'concurrency':>12} {'req/s':>8} {'p50 (s)':>8} {'p95 (s)':>8} {'errors':>7}")
+        for concurrency in args.concurrency:
+            result = asyncio.run(run_level(base_url, args.requests, concurrency))
+            print(f"{concurrency:>12} {result['throughput']:>8.2f} {result['p50']:>8.3f} "
+                  f"{result['p95']:>8.3f} {result['errors']:>7}")
+    finally:
+        app_process.terminate()
+        app_process.wait()
+        stub.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Compares the k-d tree StoreIndex against the original linear scan.
+
+Run from the repository root:
+    python -m benchmarks.nearest_store
+"""
+import math
+import random
+import time
+
+import numpy as np
+
+from app.geo import StoreIndex, haversine_km, nearest_batch
+
+SIZES = [20, 10_000, 1_000_000]
+QUERIES = 200
+
+
+def make_stores(n, rng):
+    # Roughly the bounding box of India.
+    return [
+        {"location": {"latitude": rng.uniform(8.0, 32.0), "longitude": rng.uniform(68.0, 90.0)}}
+        for _ in range(n)
+    ]
+
+
+def linear_scan(stores, lat, lon):
+    """The pre-index implementation of ContextManager.get_nearest_store."""
+    nearest_store = None
+    min_dist = float("inf")
+    for store in stores:
+        s_lat = store["location"]["latitude"]
+        s_lon = store["location"]["longitude"]
+        dist = math.sqrt((lat - s_lat) ** 2 + (lon - s_lon) ** 2)
+        if dist < min_dist:
+            min_dist = dist
+            nearest_store = store
+    return nearest_store, min_dist
+
+
+def time_per_query(fn, queries):
+    start = time.perf_counter()
+    for lat, lon in queries:
+        fn(lat, lon)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'stores':>10} {'build (s)':>10} {'linear (us)':>12} {'nearest (us)':>13} {'k=5 (us)':>10} {'5km (us)':>10} {'batch (us/q)':>13}")
+
+    for n in SIZES:
+        stores = make_stores(n, rng)
+        queries = [(rng.uniform(8.0, 32.0), rng.uniform(68.0, 90.0)) for _ in range(QUERIES)]
+
+        start = time.perf_counter()
+        index = StoreIndex([(s["location"]["latitude"], s["location"]["longitude"]) for s in stores])
+        build_s = time.perf_counter() - start
+
+        # The scan is O(n) per call; keep the 1M run to a handful of queries.
+        scan_queries = queries[: max(5, QUERIES * 1000 // n)]
+        linear_us = time_per_query(lambda lat, lon: linear_scan(stores, lat, lon), scan_queries)
+        nearest_us = time_per_query(lambda lat, lon: index.nearest(lat, lon, k=1), queries)
+        knn_us = time_per_query(lambda lat, lon: index.nearest(lat, lon, k=5), queries)
+        radius_us = time_per_query(lambda lat, lon: index.within(lat, lon, 5.0), queries)
+
+        coords = np.array([(s["location"]["latitude"], s["location"]["longitude"]) for s in stores])
+        q = np.array(queries)
+        start = time.perf_counter()
+        nearest_batch(q[:, 0], q[:, 1], coords)
+        batch_us = (time.perf_counter() - start) / len(queries) * 1e6
+
+        # Sanity check: the tree agrees with a brute-force Haversine scan.
+        for lat, lon in queries[:5]:
+            idx, dist = index.nearest(lat, lon)[0]
+            best = min(
+                haversine_km(lat, lon, s["location"]["latitude"], s["location"]["longitude"]) for s in stores
+            )
+            assert abs(dist - best) < 1e-6, (dist, best)
+
+        print(f"{n:>10} {build_s:>10.2f} {linear_us:>12.1f} {nearest_us:>13.1f} {knn_us:>10.1f} {radius_us:>10.1f} {batch_us:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Throughput (docs/sec) of offline anonymization: one message at a time versus
+PrivacyManager.anonymize_batch with spaCy nlp.pipe, single- and multi-process.
+
+Run from the repository root:
+    python -m benchmarks.privacy_batch
+    python -m benchmarks.privacy_batch --messages 100000 --processes 1 4
+"""
+import argparse
+import os
+import time
+
+from app.privacy import PrivacyManager
+from benchmarks.privacy_tiers import make_corpus, presidio
+
+
+def rate(n, seconds):
+    return n / seconds if seconds else float("inf")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--sample", type=int, default=5_000,
+                        help="messages used for the slow per-message baselines")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, min(4, os.cpu_count() or 1)])
+    args = parser.parse_args()
+
+    pm = PrivacyManager()
+    corpus = make_corpus(args.messages)
+    sample = corpus[: args.sample]
+    pm.anonymize_full("warm up the pipeline")
+
+    print(f"corpus: {args.messages} messages (per-message baselines on the first {len(sample)})")
+    print(f"{'mode':>28} {'docs/sec':>10}")
+
+    start = time.perf_counter()
+    expected = [presidio(pm, text) for text in sample]
+    print(f"{'full presidio, one by one':>28} {rate(len(sample), time.perf_counter() - start):>10.0f}")
+
+    start = time.perf_counter()
+    for text in sample:
+        pm.anonymize(text)
+    print(f"{'tiered, one by one':>28} {rate(len(sample), time.perf_counter() - start):>10.0f}")
+
+    assert list(pm.anonymize_batch(sample, batch_size=args.batch_size)) == [pm.anonymize(t) for t in sample]
+
+    for n_process in sorted(set(args.processes)):
+        start = time.perf_counter()
+        count = sum(1 for _ in pm.anonymize_batch(corpus, batch_size=args.batch_size, n_process=n_process))
+        label = f"anonymize_batch, {n_process} proc"
+        print(f"{label:>28} {rate(count, time.perf_counter() - start):>10.0f}")
+
+    mismatches = sum(a != b for a, b in zip(expected, pm.anonymize_batch(sample)))
+    print(f"{mismatches} of {len(sample)} batch outputs differ from full Presidio")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Latency of the tiered anonymizer versus always running full Presidio/spaCy analysis,
+broken down by the tier each message was routed to, plus output parity with a plain
+AnalyzerEngine.analyze + AnonymizerEngine.anonymize call on the raw text.
+
+Run from the repository root:
+    python -m benchmarks.privacy_tiers
+"""
+import random
+import statistics
+import time
+from collections import defaultdict
+
+from faker import Faker
+
+from app.privacy import ENTITIES, OPERATORS, PrivacyManager
+
+MESSAGES = 2000
+# All-lowercase names and places: these must not skip NER, and get exactly Presidio's output.
+LOWERCASE_PII = [
+    "rahul sharma here, where is my order",
+    "i live in andheri west",
+    "this is priya patel, is vada pav in stock?",
+    "im near koramangala, are you open",
+]
+
+
+def make_corpus(n, seed=3):
+    fake = Faker("en_IN")
+    Faker.seed(seed)
+    rng = random.Random(seed)
+    templates = [
+        lambda: rng.choice(["hi", "hello", "thanks!", "ok", "yes please", "no"]),
+        lambda: f"USR-{rng.randint(1, 50):03d}",
+        lambda: f"My ID is USR-{rng.randint(1, 50):03d}",
+        lambda: f"+91-{rng.randint(60000, 99999)}-{rng.randint(10000, 99999)}",
+        lambda: f"my number is {rng.randint(6000000000, 9999999999)}",
+        lambda: f"email me at {fake.email()}",
+        lambda: rng.choice([
+            "How much is a Medium Masala Chai?", "Is Vada Pav in stock?", "What time do you close?",
+            "Do you have Wi-Fi?", "what is your refund policy", "Any offers today?",
+        ]),
+        lambda: f"My name is {fake.name()}",
+        lambda: f"I'm in {fake.city()}, is the store open?",
+        lambda: f"{fake.first_name()} here, can I get a Large Filter Coffee?",
+        lambda: f"{fake.name().lower()} here, where is my order",
+        lambda: f"i live in {fake.city().lower()}",
+    ]
+    return [rng.choice(templates)() for _ in range(n)]
+
+
+def presidio(pm, text):
+    """
+    The untouched Presidio call the tiers must reproduce.
+    """
+    results = pm.analyzer.analyze(text=text, entities=ENTITIES, language="en")
+    return pm.anonymizer.anonymize(text=text, analyzer_results=results, operators=OPERATORS).text
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def main():
+    pm = PrivacyManager()
+    corpus = make_corpus(MESSAGES)
+    pm.anonymize_full("warm up the pipeline")
+
+    skipped = []
+    for text in LOWERCASE_PII:
+        masked, tier = pm.anonymize_tiered(text)
+        if tier != "ner" or masked != presidio(pm, text):
+            skipped.append((text, tier, masked))
+    if skipped:
+        raise SystemExit(f"Lowercase PII not analysed like Presidio: {skipped}")
+
+    full_times, tier_times = [], defaultdict(list)
+    mismatches = 0
+    for text in corpus:
+        start = time.perf_counter()
+        full = presidio(pm, text)
+        full_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        tiered, tier = pm.anonymize_tiered(text)
+        tier_times[tier].append(time.perf_counter() - start)
+        mismatches += tiered != full
+
+    print(f"{MESSAGES} messages, {mismatches} outputs differ from plain Presidio")
+    print(f"{'path':>14} {'share':>7} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+    rows = [("full presidio", full_times)] + [(f"tier: {t}", tier_times[t]) for t in ("none", "regex", "ner")]
+    for name, times in rows:
+        if not times:
+            continue
+        print(f"{name:>14} {len(times) / MESSAGES:>7.0%} {percentile(times, 0.5) * 1000:>9.3f} "
+              f"{percentile(times, 0.99) * 1000:>9.3f}")
+
+    tiered_all = [t for times in tier_times.values() for t in times]
+    print(f"mean per message: full {statistics.mean(full_times) * 1000:.3f} ms, "
+          f"tiered {statistics.mean(tiered_all) * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
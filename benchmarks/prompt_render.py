@@ -0,0 +1,69 @@
+"""
+System prompt assembly: the old per-request read + str.format of the prompt file vs. rendering
+from the PromptRegistry, and the estimated size of every template version rendered over all
+user contexts with a sample of policy-manual chunks as the RAG text.
+
+Use --budget to fail (exit 1) when a version's mean rendered prompt exceeds that many tokens,
+e.g. in CI to catch prompt size regressions:
+    python -m benchmarks.prompt_render
+    python -m benchmarks.prompt_render --budget 1600
+"""
+import argparse
+import statistics
+import sys
+import time
+
+from app.chunking import StructuredChunker
+from app.context import ContextManager
+from app.extract import iter_page_texts
+from app.prompts import PromptRegistry
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", default="data/store_policies.pdf")
+    parser.add_argument("--name", default="support")
+    parser.add_argument("--rag-chunks", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=2000)
+    parser.add_argument("--budget", type=int, help="max mean rendered tokens per template version")
+    args = parser.parse_args()
+
+    registry = PromptRegistry()
+    contexts = list(ContextManager().format_context_batch().values())
+    chunker = StructuredChunker()
+    chunks = list(chunker.chunk(iter_page_texts(args.pdf, workers=1, mode=chunker.extraction_mode)))
+    step = max(len(chunks) // args.rag_chunks, 1)
+    rag_str = "\n".join(f"- {chunk}" for chunk in chunks[::step][:args.rag_chunks])
+
+    template = registry.get(args.name)
+    path = f"{registry.directory}/{template.key}.txt"
+    start = time.perf_counter()
+    for i in range(args.rounds):
+        with open(path, "r") as f:
+            f.read().format(context_str=contexts[i % len(contexts)], rag_str=rag_str)
+    file_us = (time.perf_counter() - start) / args.rounds * 1e6
+    start = time.perf_counter()
+    for i in range(args.rounds):
+        registry.render(args.name, context_str=contexts[i % len(contexts)], rag_str=rag_str)
+    registry_us = (time.perf_counter() - start) / args.rounds * 1e6
+    print(f"read + format: {file_us:7.1f} us/prompt")
+    print(f"registry:      {registry_us:7.1f} us/prompt ({file_us / registry_us:.1f}x)")
+
+    over_budget = False
+    print(f"\n{'template':>14} {'static':>7} {'mean':>7} {'max':>7}  ({len(contexts)} user contexts)")
+    for version in registry.versions(args.name):
+        sizes = [registry.render(args.name, version, context_str=c, rag_str=rag_str).tokens for c in contexts]
+        mean = statistics.mean(sizes)
+        flag = ""
+        if args.budget and mean > args.budget:
+            over_budget = True
+            flag = f"  over budget ({args.budget})"
+        print(f"{f'{args.name}.v{version}':>14} {registry.get(args.name, version).static_tokens:>7} "
+              f"{mean:>7.0f} {max(sizes):>7}{flag}")
+
+    if over_budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+recall@k of dense, sparse (BM25) and hybrid retrieval over the policy manual, for a set of
+fusion weights, plus the prompt size each setting needs. A query counts as recalled at k when
+one of the top k chunks contains its answer string.
+
+The evaluation set is generated from the PDF itself (coupon codes, store names, menu items,
+holidays and policy titles), so it follows whatever generate_pdf.py produced; pass --queries
+with a JSONL file of {"query": ..., "answer": ...} lines to use your own instead.
+
+Run from the repository root (ingests into a temporary Qdrant directory):
+    python -m benchmarks.retrieval_recall
+    python -m benchmarks.retrieval_recall --weights 1:1 1:2 2:1 --k 1 3 5
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import tempfile
+from typing import List, Tuple
+
+from pypdf import PdfReader
+
+POLICY_QUESTIONS = [
+    ("Which delivery partners do you work with?", "Swiggy"),
+    ("How should hot beverages be packed?", "spill-proof"),
+    ("Can I cancel my order?", "within 60 seconds"),
+    ("How do refunds for missing items work?", "Refunds for missing items"),
+    ("What happens if my delivery is late?", "delayed by >45 mins"),
+]
+
+
+def build_eval_set(pdf_path: str) -> List[Tuple[str, str]]:
+    text = "\n".join(page.extract_text() or "" for page in PdfReader(pdf_path).pages)
+    queries = list(POLICY_QUESTIONS)
+    for code in sorted(set(re.findall(r"\b(CHAI\d{2})\b", text)))[:20]:
+        queries.append((f"What discount does coupon {code} give?", code))
+    for store in sorted(set(re.findall(r"Velvet Brew - ([A-Z][a-z]+)", text)))[:20]:
+        queries.append((f"What is the phone number of the {store} outlet?", f"Velvet Brew - {store}"))
+    for item in ["Masala Chai", "Vietnamese Cold Brew", "Paneer Puff", "Kashmiri Kahwa", "Banana Cake", "Flat White"]:
+        if item in text:
+            queries.append((f"How much is a medium {item}?", item))
+    for holiday in ["Diwali", "Holi", "Christmas", "Independence Day"]:
+        if holiday in text:
+            queries.append((f"Are you open on {holiday}?", holiday))
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", default="data/store_policies.pdf")
+    parser.add_argument("--queries", help="JSONL file with query/answer pairs")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--weights", nargs="+", default=["1:1", "1:2", "2:1"], help="dense:sparse fusion weights")
+    args = parser.parse_args()
+
+    if args.queries:
+        with open(args.queries) as f:
+            queries = [(row["query"], row["answer"]) for row in map(json.loads, f)]
+    else:
+        queries = build_eval_set(args.pdf)
+
+    with tempfile.TemporaryDirectory() as qdrant_path:
+        os.environ["QDRANT_PATH"] = qdrant_path
+        from app.rag import RAGManager
+
+        rag = RAGManager(cache_size=0)
+        rag.ingest_pdf(args.pdf)
+
+        settings = [("dense", "dense", None), ("sparse", "sparse", None)]
+        for weights in args.weights:
+            dense_weight, sparse_weight = map(float, weights.split(":"))
+            settings.append((f"hybrid {weights}", "hybrid", (dense_weight, sparse_weight)))
+
+        print(f"{len(queries)} queries")
+        header = " ".join(f"{f'R@{k}':>6}" for k in args.k)
+        print(f"{'mode':>14} {header} {f'tokens@{max(args.k)}':>10}")
+        for label, mode, weights in settings:
+            if weights:
+                rag.dense_weight, rag.sparse_weight = weights
+            ranks = []
+            prompt_tokens = []
+            for query, answer in queries:
+                texts = rag.search(query, limit=max(args.k), mode=mode)
+                ranks.append(next((i + 1 for i, t in enumerate(texts) if answer in t), None))
+                # Same rough chars/4 token estimate for every mode.
+                prompt_tokens.append(sum(len(t) for t in texts) / 4)
+            recalls = " ".join(f"{sum(1 for r in ranks if r and r <= k) / len(ranks):>6.2f}" for k in args.k)
+            print(f"{label:>14} {recalls} {statistics.mean(prompt_tokens):>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Semantic response cache: lookup cost as a fingerprint bucket fills up, and a check that queries
+differing only in a code, number or size never reuse each other's answer. The check stores
+each pair's first query and looks the second up with the very same embedding, the worst case
+for the similarity threshold, so it needs no embedding model.
+
+Run from the repository root:
+    python -m benchmarks.semantic_cache
+    python -m benchmarks.semantic_cache --sizes 10 100 1000 --lookups 5000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.cache import SemanticCache
+
+# (cached query, new query): same wording, different literal, so a different answer.
+NEAR_DUPLICATES = [
+    ("Can I use coupon CHAI23 on my order?", "Can I use coupon CHAI24 on my order?"),
+    ("How much is a small latte?", "How much is a large latte?"),
+    ("Show the last order for USR-002", "Show the last order for USR-003"),
+    ("Is ORD-1041 ready for pickup?", "Is ORD-1047 ready for pickup?"),
+    ("Can I get 2 samosas?", "Can I get 20 samosas?"),
+]
+# Same literals, different wording: these may share an answer.
+PARAPHRASES = [
+    ("How much is a small latte?", "how much is a Small latte"),
+    ("Can I use coupon CHAI23 on my order?", "Does coupon CHAI23 work on my order?"),
+]
+
+
+def fingerprint(query: str) -> str:
+    return SemanticCache.fingerprint("support.v1", "context", "rag", SemanticCache.literals(query))
+
+
+def check_literals(rng) -> None:
+    for pairs, should_hit in [(NEAR_DUPLICATES, False), (PARAPHRASES, True)]:
+        for cached, new in pairs:
+            cache = SemanticCache(threshold=0.95)
+            embedding = rng.standard_normal(384)
+            cache.store(embedding, fingerprint(cached), f"answer to {cached}")
+            hit = cache.lookup(embedding, fingerprint(new)) is not None
+            if hit != should_hit:
+                raise SystemExit(f"{new!r} after {cached!r}: expected a {'hit' if should_hit else 'miss'}")
+    print(f"{len(NEAR_DUPLICATES)} near-duplicates missed, {len(PARAPHRASES)} paraphrases hit")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 16, 128, 512])
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    check_literals(rng)
+
+    print(f"{'bucket size':>12} {'lookup (us)':>12}")
+    for size in args.sizes:
+        cache = SemanticCache(maxsize=size, threshold=0.95)
+        key = fingerprint("How much is a small latte?")
+        for _ in range(size):
+            cache.store(rng.standard_normal(384), key, "answer")
+        queries = rng.standard_normal((args.lookups, 384))
+        start = time.perf_counter()
+        for query in queries:
+            cache.lookup(query, key)
+        print(f"{size:>12} {(time.perf_counter() - start) / args.lookups * 1e6:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
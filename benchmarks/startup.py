@@ -0,0 +1,78 @@
+"""
+Worker startup cost of the privacy layer per spaCy model size: time to import and construct
+PrivacyManager (what a uvicorn worker pays before it can serve), time of the first NER call
+(where the lazy model load now lands), and resident memory before and after the model loads.
+Each configuration runs in a fresh interpreter so nothing is shared between measurements.
+
+Run from the repository root:
+    python -m benchmarks.startup
+    python -m benchmarks.startup --models sm lg --budget 2.0
+Exits non-zero if time-to-ready for any model exceeds --budget seconds.
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+CHILD = """
+import json, resource, sys, time
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 2**20
+
+start = time.perf_counter()
+from app.privacy import PrivacyManager
+imported = time.perf_counter()
+pm = PrivacyManager(model=sys.argv[1], preload=sys.argv[2] == "1")
+ready = time.perf_counter()
+ready_rss = rss_mb()
+pm.anonymize("please ring 98765 43210 about my order")
+regex = time.perf_counter()
+pm.anonymize("My name is Priya Sharma and I live in Bandra")
+ner = time.perf_counter()
+print(json.dumps({
+    "import": imported - start,
+    "ready": ready - start,
+    "regex": regex - ready,
+    "first_ner": ner - regex,
+    "ready_rss": ready_rss,
+    "rss": rss_mb(),
+}))
+"""
+
+
+def measure(model: str, preload: bool) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD, model, "1" if preload else "0"],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", nargs="+", default=["sm", "md", "lg"])
+    parser.add_argument("--budget", type=float, default=3.0, help="max seconds from import to a ready PrivacyManager")
+    args = parser.parse_args()
+
+    print(f"{'model':>6} {'mode':>8} {'import':>8} {'ready':>8} {'regex':>8} {'1st NER':>8} "
+          f"{'RSS ready':>10} {'RSS NER':>8}")
+    over_budget = []
+    for model in args.models:
+        for preload in (False, True):
+            r = measure(model, preload)
+            mode = "preload" if preload else "lazy"
+            print(f"{model:>6} {mode:>8} {r['import']:>7.2f}s {r['ready']:>7.2f}s {r['regex'] * 1000:>6.1f}ms "
+                  f"{r['first_ner']:>7.2f}s {r['ready_rss']:>8.0f}MB {r['rss']:>6.0f}MB")
+            if not preload and r["ready"] > args.budget:
+                over_budget.append(model)
+
+    if over_budget:
+        print(f"Startup budget of {args.budget:.1f}s exceeded for: {', '.join(over_budget)}")
+        sys.exit(1)
+    print(f"All models ready within the {args.budget:.1f}s startup budget (lazy mode).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Compares StoreTextIndex against the original per-query scan of find_stores_by_text
+as the store catalogue grows, for sentence queries and for partial words ("ban" for
+Bandra), which match a store when one of its name or address tokens starts with them.
+
+Run from the repository root:
+    python -m benchmarks.store_text_search
+"""
+import random
+import string
+import time
+
+from app.text_index import StoreTextIndex, tokenize
+
+SIZES = [100, 1_000, 10_000, 100_000]
+QUERIES = 200
+CITIES = ["Mumbai", "Delhi NCR", "Bangalore", "Pune", "Chennai", "Hyderabad", "Kolkata", "Ahmedabad"]
+
+
+def make_area(rng):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(6, 10))).title()
+
+
+def make_stores(n, rng):
+    stores = []
+    for i in range(n):
+        area = f"{make_area(rng)} {rng.choice(['West', 'East', 'Road', 'Nagar', 'Market'])}"
+        stores.append({
+            "store_id": f"store_{i + 1}",
+            "name": f"Velvet Brew - {area}",
+            "location": {"address": f"{area}, {rng.choice(CITIES)}, India"},
+        })
+    return stores
+
+
+def linear_scan(stores, query):
+    """The pre-index implementation of ContextManager.find_stores_by_text."""
+    query_lower = query.lower()
+    matches = []
+    for store in stores:
+        name = store["name"].lower()
+        address = store["location"]["address"].lower()
+        address_parts = [p.strip().lower() for p in store["location"]["address"].split(",")]
+        match_found = False
+        for part in address_parts:
+            if part in query_lower and len(part) > 3:
+                match_found = True
+                break
+        if match_found or query_lower in name or query_lower in address:
+            matches.append(store)
+    return matches
+
+
+def prefix_scan(stores, prefix):
+    """Stores with a name or address token starting with prefix."""
+    return [store for store in stores
+            if any(token.startswith(prefix)
+                   for token in tokenize(f"{store['name']} {store['location']['address']}"))]
+
+
+def time_per_query(fn, queries):
+    start = time.perf_counter()
+    for q in queries:
+        fn(q)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+
+def main():
+    rng = random.Random(7)
+    print(f"{'stores':>10} {'build (s)':>10} {'linear (us)':>12} {'index (us)':>11} {'prefix (us)':>12}")
+
+    for n in SIZES:
+        stores = make_stores(n, rng)
+        queries = []
+        prefixes = []
+        for _ in range(QUERIES):
+            area = rng.choice(stores)["location"]["address"].split(",")[0]
+            queries.append(f"is the {area} outlet open right now?")
+            prefixes.append(area[:rng.randint(2, 5)])
+
+        start = time.perf_counter()
+        index = StoreTextIndex(stores)
+        build_s = time.perf_counter() - start
+
+        for q in queries[:10]:
+            assert [stores[i] for i in index.search(q)] == linear_scan(stores, q)
+        for prefix in prefixes[:10]:
+            assert [stores[i] for i in index.search(prefix)] == prefix_scan(stores, prefix.lower())
+
+        scan_queries = queries[: max(5, QUERIES * 1000 // n)]
+        linear_us = time_per_query(lambda q: linear_scan(stores, q), scan_queries)
+        index_us = time_per_query(index.search, queries)
+        prefix_us = time_per_query(index.search, prefixes)
+        print(f"{n:>10} {build_s:>10.2f} {linear_us:>12.1f} {index_us:>11.1f} {prefix_us:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
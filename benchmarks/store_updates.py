@@ -0,0 +1,206 @@
+"""
+Live store updates: cost of applying one delta to a StoreCatalog (a stock flip, which touches
+no index, and a relocation, which moves the store in both indexes) against rebuilding the
+catalogue from scratch, as the number of stores grows. Also measures nearest-store reader
+throughput while a writer thread applies stock flips, compared with no writer.
+
+Before timing, it applies random batches of flips, relocations, renames, removals and
+additions and checks every snapshot against a catalogue rebuilt from the same records, and
+that the previous snapshot is unchanged; the batches are enough to trigger k-d tree rebuilds.
+
+Run from the repository root:
+    python -m benchmarks.store_updates
+    python -m benchmarks.store_updates --sizes 1000 100000 --updates 500
+"""
+import argparse
+import random
+import threading
+import time
+
+from app.context import ContextManager
+from app.stores import StoreCatalog, merge_store
+from benchmarks.store_text_search import CITIES, make_area
+
+ITEMS = ["Masala Chai", "Filter Coffee", "Vada Pav", "Bun Maska", "Cold Brew"]
+
+
+def make_stores(n, rng):
+    stores = []
+    for i in range(n):
+        area = f"{make_area(rng)} {rng.choice(['West', 'East', 'Road', 'Nagar', 'Market'])}"
+        stores.append({
+            "store_id": f"bench_{i + 1}",
+            "name": f"Velvet Brew - {area}",
+            "location": {"latitude": rng.uniform(8.0, 32.0), "longitude": rng.uniform(70.0, 90.0),
+                         "address": f"{area}, {rng.choice(CITIES)}, India"},
+            "hours": {"open": "08:00", "close": "22:00"},
+            "stock": {item: True for item in ITEMS},
+            "offers": [],
+        })
+    return stores
+
+
+def random_delta(rng, records, next_id):
+    store_id = rng.choice(sorted(records))
+    kind = rng.choice(["flip", "move", "move", "move", "rename", "delete", "add", "replace"])
+    if kind == "flip":
+        item = rng.choice(ITEMS)
+        return {"store_id": store_id, "stock": {item: not records[store_id]["stock"][item]}}
+    if kind == "move":
+        return {"store_id": store_id, "location": {"latitude": rng.uniform(8.0, 32.0),
+                                                   "longitude": rng.uniform(70.0, 90.0)}}
+    if kind == "rename":
+        return {"store_id": store_id, "name": f"Velvet Brew - {make_area(rng)} Market"}
+    if kind == "delete":
+        return {"store_id": store_id, "deleted": True}
+    store = make_stores(1, rng)[0]
+    if kind == "replace":
+        return {**store, "store_id": store_id, "replace": True}
+    return {**store, "store_id": f"new_{next_id}"}
+
+
+def apply_expected(records, delta):
+    records = dict(records)
+    store_id = delta["store_id"]
+    if delta.get("deleted"):
+        records.pop(store_id, None)
+    elif store_id not in records or delta.get("replace"):
+        records[store_id] = {k: v for k, v in delta.items() if k != "replace"}
+    else:
+        records[store_id] = merge_store(records[store_id], delta)
+    return records
+
+
+def snapshot_errors(catalog, records, rng):
+    """
+    Differences between catalog and a catalogue built from scratch from records.
+    """
+    errors = []
+    if len(catalog) != len(records) or any(catalog.get(sid) != record for sid, record in records.items()):
+        errors.append("records")
+    reference = StoreCatalog(list(records.values()))
+    if sorted(map(tuple, catalog.coords[catalog.live])) != sorted(map(tuple, reference.coords[reference.live])):
+        errors.append("coords")
+    for _ in range(10):
+        lat, lon = rng.uniform(8.0, 32.0), rng.uniform(70.0, 90.0)
+        got = [(catalog.stores[idx]["store_id"], round(dist, 6)) for idx, dist in catalog.store_index.nearest(lat, lon, k=3)]
+        want = [(reference.stores[idx]["store_id"], round(dist, 6)) for idx, dist in reference.store_index.nearest(lat, lon, k=3)]
+        if got != want:
+            errors.append(f"nearest({lat:.3f}, {lon:.3f})")
+    for record in rng.sample(list(records.values()), min(5, len(records))):
+        area = record["name"].split(" - ")[-1]
+        for query in (area, area[:3], record["location"]["address"].split(", ")[1]):
+            got = {catalog.stores[idx]["store_id"] for idx in catalog.text_index.search(query)}
+            want = {reference.stores[idx]["store_id"] for idx in reference.text_index.search(query)}
+            if got != want:
+                errors.append(f"search({query!r})")
+    return errors
+
+
+def check_snapshots(rng, stores=300, batches=400):
+    records = {store["store_id"]: store for store in make_stores(stores, rng)}
+    catalog = StoreCatalog(list(records.values()))
+    rebuilds = 0
+    next_id = 0
+    for batch in range(batches):
+        deltas = []
+        expected = records
+        for _ in range(rng.randint(1, 3)):
+            delta = random_delta(rng, expected, next_id)
+            next_id += 1
+            deltas.append(delta)
+            expected = apply_expected(expected, delta)
+
+        previous = {sid: catalog.get(sid) for sid in records}
+        tombstones = catalog.store_index.tombstones
+        new_catalog = catalog.apply(deltas)[0]
+        rebuilds += new_catalog.store_index.tombstones < tombstones
+        if any(catalog.get(sid) != record for sid, record in previous.items()):
+            raise SystemExit(f"Batch {batch} changed the previous snapshot")
+        errors = snapshot_errors(new_catalog, expected, rng)
+        if errors:
+            raise SystemExit(f"Batch {batch} ({deltas}): catalogue differs from a rebuild in {errors}")
+        catalog, records = new_catalog, expected
+    if not rebuilds:
+        raise SystemExit("No k-d tree rebuild was triggered")
+    print(f"snapshot checks: {batches} batches over {len(catalog.stores)} slots, {rebuilds} tree rebuilds")
+
+
+def time_updates(catalog, deltas):
+    start = time.perf_counter()
+    for delta in deltas:
+        catalog = catalog.apply([delta])[0]
+    return (time.perf_counter() - start) / len(deltas) * 1e6
+
+
+def reader_throughput(cm, rng, seconds, writer):
+    stop = threading.Event()
+    errors = []
+    updates = 0
+
+    def write():
+        nonlocal updates
+        writer_rng = random.Random(1)
+        try:
+            while not stop.is_set():
+                store = writer_rng.choice(cm.stores)
+                item = writer_rng.choice(list(store["stock"]))
+                cm.update_store(store["store_id"], {"stock": {item: not store["stock"][item]}})
+                updates += 1
+                time.sleep(0.001)
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=write, daemon=True) if writer else None
+    if thread:
+        thread.start()
+    points = [(rng.uniform(8.0, 32.0), rng.uniform(70.0, 90.0)) for _ in range(1000)]
+    lookups = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for lat, lon in points[:100]:
+            cm.get_nearest_store(lat, lon)
+        lookups += 100
+        points = points[100:] + points[:100]
+    stop.set()
+    if thread:
+        thread.join()
+        if errors:
+            raise RuntimeError("Writer thread failed") from errors[0]
+        if not updates:
+            raise RuntimeError("Writer thread applied no updates")
+    return lookups / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10_000, 100_000])
+    parser.add_argument("--updates", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    args = parser.parse_args()
+    rng = random.Random(0)
+    check_snapshots(random.Random(2))
+
+    print(f"{'stores':>8} {'rebuild':>10} {'stock flip':>11} {'relocate':>10}")
+    for size in args.sizes:
+        stores = make_stores(size, rng)
+        start = time.perf_counter()
+        catalog = StoreCatalog(stores)
+        rebuild_us = (time.perf_counter() - start) * 1e6
+
+        picks = [rng.choice(stores) for _ in range(args.updates)]
+        flips = [{"store_id": s["store_id"], "stock": {rng.choice(ITEMS): False}} for s in picks]
+        moves = [{"store_id": s["store_id"], "location": {"latitude": rng.uniform(8.0, 32.0)}} for s in picks]
+        print(f"{size:>8} {rebuild_us / 1000:>8.1f}ms {time_updates(catalog, flips):>9.1f}us "
+              f"{time_updates(catalog, moves):>8.1f}us")
+
+    cm = ContextManager()
+    cm.update_stores(make_stores(1000, rng))
+    idle = reader_throughput(cm, rng, args.seconds, writer=False)
+    busy = reader_throughput(cm, rng, args.seconds, writer=True)
+    print(f"nearest-store lookups/s over {len(cm.stores)} stores: {idle:,.0f} idle, "
+          f"{busy:,.0f} with a writer flipping stock every ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Guest login resolution: ContextManager.find_user_id latency as the user table grows, and a check
+of which messages log a guest in. A phone number counts when the message is only that number
+or when it carries +91; a bare 10-digit run inside a sentence may be an order or reference
+number and must not log anyone in.
+
+Run from the repository root:
+    python -m benchmarks.user_lookup
+    python -m benchmarks.user_lookup --users 1000 100000 1000000 --lookups 20000
+"""
+import argparse
+import random
+import time
+
+from app.context import ContextManager
+from app.users import normalize_phone
+
+
+def login_cases(user_id: str, phone: str):
+    """
+    (message, expected user_id or None) for one user with a "+91-XXXXX-XXXXX" phone.
+    """
+    digits = normalize_phone(phone)
+    spaced = f"{digits[:5]} {digits[5:]}"
+    return [
+        (user_id, user_id),
+        (f"my id is {user_id.lower()}", user_id),
+        (phone, user_id),
+        (digits, user_id),
+        (f"  {spaced} ", user_id),
+        (f"0{digits}", user_id),
+        (f"my number is +91 {spaced}", user_id),
+        (f"call me on {phone} please", user_id),
+        (f"my number is {spaced}", None),
+        (f"where is order {digits}?", None),
+        (f"ref {digits}, paid 91{digits}", None),
+    ]
+
+
+def check_logins(cm: ContextManager) -> None:
+    cases = [case for uid in cm.user_ids[:5] for case in login_cases(uid, cm.get_user(uid)["phone_number"])]
+    for message, expected in cases:
+        got = cm.find_user_id(message)
+        if got != expected:
+            raise SystemExit(f"find_user_id({message!r}) = {got!r}, expected {expected!r}")
+    print(f"{len(cases)} login messages resolved as expected")
+
+
+def add_users(cm: ContextManager, total: int, rng: random.Random) -> None:
+    for n in range(len(cm.users), total):
+        cm.upsert_user({
+            "user_id": f"USR-{n + 1:07d}",
+            "phone_number": f"+91-{rng.randint(60000, 99999)}-{rng.randint(10000, 99999)}",
+            "location": {"latitude": 19.0 + rng.random() * 0.2, "longitude": 72.8 + rng.random() * 0.2},
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, nargs="+", default=[1_000, 100_000])
+    parser.add_argument("--lookups", type=int, default=20_000)
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    cm = ContextManager()
+    check_logins(cm)
+
+    print(f"{'users':>10} {'id (us)':>10} {'phone (us)':>11} {'sentence (us)':>14}")
+    for total in sorted(args.users):
+        add_users(cm, total, rng)
+        user_ids = list(cm.users)
+        sample = [rng.choice(user_ids) for _ in range(args.lookups)]
+        phones = [cm.get_user(uid)["phone_number"] for uid in sample]
+        sentences = [f"hi, my number is {phone} and I want a latte" for phone in phones]
+        timings = []
+        for messages in (sample, phones, sentences):
+            start = time.perf_counter()
+            for message in messages:
+                cm.find_user_id(message)
+            timings.append((time.perf_counter() - start) / len(messages) * 1e6)
+        print(f"{len(cm.users):>10} {timings[0]:>10.2f} {timings[1]:>11.2f} {timings[2]:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Memory footprint, query latency and recall@k against exact search for the policy collection's
+vector settings (quantization, on-disk vectors, HNSW m / ef) as the collection grows.
+Vectors are synthetic, clustered 384-dim unit vectors (like embedded chunks from many stores'
+documents); queries are perturbed copies of stored vectors.
+
+HNSW and quantization only exist on a Qdrant server, so point --url (or QDRANT_URL) at one, e.g.
+    docker run -p 6333:6333 qdrant/qdrant
+    python -m benchmarks.vector_index --url http://localhost:6333
+    python -m benchmarks.vector_index --sizes 100000 1000000 --configs none scalar binary+disk --ef 32 128
+Without a server it runs on the embedded store, where every search is exact (recall 1.0).
+"""
+import argparse
+import os
+import statistics
+import time
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+from app.rag import create_vector_collection, search_params
+
+DIM = 384
+CLUSTERS = 256
+BATCH = 1000
+
+
+def make_vectors(start: int, stop: int, centers: np.ndarray) -> np.ndarray:
+    rng = np.random.default_rng(start)
+    labels = rng.integers(0, len(centers), stop - start)
+    vectors = centers[labels] + 0.6 * rng.standard_normal((stop - start, DIM)) / np.sqrt(DIM)
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def estimated_ram_mb(n: int, quantization: str, on_disk: bool, m: int) -> float:
+    """
+    Vector RAM per Qdrant's sizing rules: originals (unless on disk), quantized copies (always in
+    RAM), and the HNSW graph (about 2 * m links of 4 bytes per point on level 0).
+    """
+    full = 0 if on_disk else n * DIM * 4
+    quantized = {"scalar": n * DIM, "binary": n * DIM / 8}.get(quantization, 0)
+    graph = n * 2 * m * 4
+    return (full + quantized + graph) * 1.5 / 2**20
+
+
+def wait_indexed(client: QdrantClient, name: str, timeout: float = 3600) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        info = client.get_collection(name)
+        if info.status == models.CollectionStatus.GREEN:
+            return
+        time.sleep(1.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=os.getenv("QDRANT_URL"))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--configs", nargs="+", default=["none", "scalar", "binary", "scalar+disk", "binary+disk"],
+                        help="quantization (none/scalar/binary), optionally +disk for on-disk originals")
+    parser.add_argument("--m", type=int, default=16)
+    parser.add_argument("--ef-construct", type=int, default=100)
+    parser.add_argument("--ef", type=int, nargs="+", default=[64])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.url:
+        client = QdrantClient(url=args.url, timeout=600)
+    else:
+        print("No Qdrant server given: using the embedded store (exact search, settings have no effect).")
+        client = QdrantClient(":memory:")
+
+    centers = np.random.default_rng(0).standard_normal((CLUSTERS, DIM))
+    rng = np.random.default_rng(1)
+
+    print(f"{'config':>12} {'points':>9} {'ef':>5} {'RAM est':>9} {'p50 ms':>7} {'p95 ms':>7} {f'recall@{args.k}':>10}")
+    for config in args.configs:
+        quantization, _, disk = config.partition("+")
+        name = f"bench_vectors_{quantization}_{'disk' if disk else 'ram'}"
+        if client.collection_exists(name):
+            client.delete_collection(name)
+        create_vector_collection(client, name, quantization=quantization, on_disk=bool(disk),
+                                 m=args.m, ef_construct=args.ef_construct)
+
+        inserted = 0
+        for size in sorted(args.sizes):
+            for start in range(inserted, size, BATCH):
+                stop = min(start + BATCH, size)
+                client.upsert(collection_name=name, wait=False, points=models.Batch(
+                    ids=list(range(start, stop)), vectors=make_vectors(start, stop, centers).tolist()
+                ))
+            inserted = size
+            if args.url:
+                wait_indexed(client, name)
+
+            sample = rng.integers(0, size, args.queries)
+            queries = [make_vectors(int(i), int(i) + 1, centers)[0] + 0.05 * rng.standard_normal(DIM) / np.sqrt(DIM)
+                       for i in sample]
+            exact = [
+                {p.id for p in client.query_points(collection_name=name, query=q.tolist(), limit=args.k,
+                                                   search_params=models.SearchParams(exact=True)).points}
+                for q in queries
+            ]
+            for ef in args.ef:
+                params = search_params(quantization, ef, oversampling=2.0)
+                latencies = []
+                recalls = []
+                for q, truth in zip(queries, exact):
+                    start = time.perf_counter()
+                    hits = client.query_points(collection_name=name, query=q.tolist(), limit=args.k,
+                                               search_params=params).points
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    recalls.append(len(truth & {p.id for p in hits}) / len(truth))
+                latencies.sort()
+                print(f"{config:>12} {size:>9} {ef:>5} {estimated_ram_mb(size, quantization, bool(disk), args.m):>7.0f}MB "
+                      f"{statistics.median(latencies):>7.2f} {latencies[int(len(latencies) * 0.95) - 1]:>7.2f} "
+                      f"{statistics.mean(recalls):>10.3f}")
+
+        client.delete_collection(name)
+
+
+if __name__ == "__main__":
+    main()
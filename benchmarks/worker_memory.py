@@ -0,0 +1,136 @@
+"""
+Memory of the whole server process tree per worker count: `uvicorn --workers N`, where every
+worker loads its own models, versus `python -m app.serve --workers N`, where workers are forked
+from a parent that already loaded them. RSS counts shared pages once per process; PSS splits
+them between the processes sharing them, so total PSS is the real footprint.
+
+Groq is replaced by the stub server from benchmarks.load_test. Linux only (reads /proc).
+
+Run from the repository root:
+    python -m benchmarks.worker_memory
+    python -m benchmarks.worker_memory --workers 1 2 4 8 --requests 40
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.load_test import start_stub_llm, wait_until_ready
+
+QUERIES = [
+    "My name is Priya Sharma, what is your refund policy?",
+    "What time does the Bandra store close?",
+    "How much is a Medium Masala Chai?",
+    "Do you have Wi-Fi and seating?",
+]
+
+
+def descendants(root: int) -> List[int]:
+    parents: Dict[int, int] = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    # The command name may contain spaces; the ppid is the second field after it.
+                    parents[int(entry)] = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+    tree = [root]
+    for pid in tree:
+        tree.extend(child for child, parent in parents.items() if parent == pid)
+    return tree
+
+
+def memory_kb(pid: int) -> Dict[str, int]:
+    usage = {"Rss": 0, "Pss": 0}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in usage:
+                    usage[key] = int(value.split()[0])
+    except OSError:
+        # Exited between listing and reading.
+        pass
+    return usage
+
+
+def start_server(mode: str, workers: int, port: int, stub_port: int) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        "GROQ_API_KEY": "stub",
+        "GROQ_API_BASE": f"http://127.0.0.1:{stub_port}",
+        "SEMANTIC_CACHE_SIZE": "0",
+        "PII_PRELOAD": "1",
+    })
+    if mode == "uvicorn":
+        command = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+                   "--workers", str(workers), "--log-level", "warning"]
+    else:
+        command = [sys.executable, "-m", "app.serve", "--host", "127.0.0.1", "--port", str(port),
+                   "--workers", str(workers), "--log-level", "warning"]
+    return subprocess.Popen(command, env=env)
+
+
+async def exercise(base_url: str, n_requests: int) -> None:
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0) as client:
+        await asyncio.gather(*(
+            client.post("/chat", json={
+                "user_id": f"USR-{(i % 50) + 1:03d}",
+                "query": f"{QUERIES[i % len(QUERIES)]} ({i})",
+                "latitude": 19.10,
+                "longitude": 72.78,
+            })
+            for i in range(n_requests)
+        ))
+
+
+def measure(mode: str, workers: int, args) -> Dict[str, float]:
+    server = start_server(mode, workers, args.port, args.stub_port)
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_until_ready(base_url + "/", server)
+        # uvicorn --workers reports ready as soon as the first worker is; give the rest time.
+        time.sleep(args.settle)
+        asyncio.run(exercise(base_url, args.requests))
+
+        usage = [u for u in map(memory_kb, descendants(server.pid)) if u["Rss"]]
+        return {
+            "processes": len(usage),
+            "rss": sum(u["Rss"] for u in usage) / 1024,
+            "pss": sum(u["Pss"] for u in usage) / 1024,
+        }
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--modes", nargs="+", default=["uvicorn", "prefork"], choices=["uvicorn", "prefork"])
+    parser.add_argument("--requests", type=int, default=20, help="requests sent before measuring")
+    parser.add_argument("--settle", type=float, default=5.0, help="seconds to wait after the first worker is up")
+    parser.add_argument("--port", type=int, default=8020)
+    parser.add_argument("--stub-port", type=int, default=8021)
+    args = parser.parse_args()
+
+    stub = start_stub_llm(args.stub_port, delay=0.05)
+    try:
+        print(f"{'mode':>8} {'workers':>8} {'procs':>6} {'total RSS':>10} {'total PSS':>10} {'PSS/worker':>11}")
+        for mode in args.modes:
+            for workers in args.workers:
+                r = measure(mode, workers, args)
+                print(f"{mode:>8} {workers:>8} {r['processes']:>6} {r['rss']:>8.0f}MB {r['pss']:>8.0f}MB "
+                      f"{r['pss'] / workers:>9.0f}MB")
+    finally:
+        stub.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -22,6 +22,31 @@ function addMessage(content, isUser) {
     messageDiv.appendChild(contentDiv);
     chatHistory.appendChild(messageDiv);
     scrollToBottom();
+    return contentDiv;
+}
+
+async function readEvents(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            const data = rawEvent
+                .split('\n')
+                .filter((line) => line.startsWith('data: '))
+                .map((line) => line.slice(6))
+                .join('\n');
+            if (data) onEvent(JSON.parse(data));
+        }
+    }
 }
 
 let currentUserId = "GUEST";
@@ -58,14 +83,11 @@ async function sendMessage() {
     userInput.value = '';
     userInput.disabled = true;
 
-    const loadingDiv = document.createElement('div');
-    loadingDiv.className = 'message agent-message';
-    loadingDiv.innerHTML = '<div class="message-content">Typing...</div>';
-    chatHistory.appendChild(loadingDiv);
-    scrollToBottom();
+    const contentDiv = addMessage('', false);
+    contentDiv.textContent = 'Typing...';
 
     try {
-        const response = await fetch('http://127.0.0.1:8000/chat', {
+        const response = await fetch('http://127.0.0.1:8000/chat/stream', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -78,20 +100,27 @@ async function sendMessage() {
             }),
         });
 
-        const data = await response.json();
-
-        if (data.user_id && data.user_id !== currentUserId) {
-            currentUserId = data.user_id;
-            console.log("Logged in as:", currentUserId);
-        }
-
-        chatHistory.removeChild(loadingDiv);
-
-        addMessage(data.response, false);
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+
+        let answer = '';
+        await readEvents(response, (event) => {
+            if (event.type === 'token') {
+                answer += event.content;
+                contentDiv.innerHTML = marked.parse(answer);
+            } else if (event.type === 'done') {
+                contentDiv.innerHTML = marked.parse(event.response);
+                if (event.user_id && event.user_id !== currentUserId) {
+                    currentUserId = event.user_id;
+                    console.log("Logged in as:", currentUserId);
+                }
+            } else if (event.type === 'error') {
+                throw new Error(event.detail);
+            }
+            scrollToBottom();
+        });
 
     } catch (error) {
-        chatHistory.removeChild(loadingDiv);
-        addMessage("Sorry, something went wrong. Please try again.", false);
+        contentDiv.textContent = "Sorry, something went wrong. Please try again.";
         console.error('Error:', error);
     } finally {
         userInput.disabled = false;